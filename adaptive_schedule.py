@@ -0,0 +1,148 @@
+import os
+import json
+import math
+import logging
+from datetime import datetime
+from config import (
+    CHECK_INTERVAL_MINUTES, MIN_CHECK_INTERVAL_MINUTES, MAX_CHECK_INTERVAL_MINUTES, ADAPTIVE_STATE_FILE
+)
+
+HOURS_PER_WEEK = 168
+
+# החלקה: כל שעה בשבוע מתחילה כאילו נצפתה בה טיסה אחת בשבוע "דמיוני" - בלי קצב אפס ובלי קפיצות מנתון בודד
+PRIOR_ARRIVALS = 1.0
+PRIOR_WEEKS = 1.0
+
+def hour_of_week(moment):
+    """אינדקס השעה בשבוע (0 = שני 00:00 ... 167 = ראשון 23:00)"""
+    return moment.weekday() * 24 + moment.hour
+
+class AdaptiveSchedule:
+    """מרווח בדיקה לפי קצב הופעת הטיסות החדשות בכל שעה בשבוע.
+
+    אם טיסות מופיעות בקצב λ ובודקים כל T דקות, ההשהיה הממוצעת עד הזיהוי היא T/2.
+    במספר בדיקות שבועי קבוע (כמו במרווח הקבוע), סך ההשהיה מינימלי כש-T ∝ 1/√λ -
+    כלומר בדיקות צפופות בשעות העומס ודלילות בשעות השקטות, בגבולות המינימום והמקסימום.
+    """
+    def __init__(self, state_file=ADAPTIVE_STATE_FILE, base_minutes=CHECK_INTERVAL_MINUTES,
+                 min_minutes=MIN_CHECK_INTERVAL_MINUTES, max_minutes=MAX_CHECK_INTERVAL_MINUTES):
+        self.state_file = state_file
+        self.base_minutes = base_minutes
+        self.min_minutes = min(min_minutes, max_minutes)
+        self.max_minutes = max(min_minutes, max_minutes)
+        self.arrivals = [0] * HOURS_PER_WEEK
+        self.since = None
+        self.intervals = [float(base_minutes)] * HOURS_PER_WEEK
+        # השהיה שנמדדה בפועל בתהליך הנוכחי: חצי הפער בין הבדיקות, משוקלל בטיסות שזוהו
+        self.last_record = None
+        self.delay_sum = 0.0
+        self.delay_count = 0
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.state_file):
+            return
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+            if len(state.get('arrivals', [])) == HOURS_PER_WEEK:
+                self.arrivals = state['arrivals']
+                self.since = state.get('since')
+            self.recompute()
+        except Exception as e:
+            logging.error(f"שגיאה בטעינת פרופיל ההגעה: {e}")
+
+    def save(self):
+        temp_path = f"{self.state_file}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'since': self.since, 'arrivals': self.arrivals}, f)
+            os.replace(temp_path, self.state_file)
+        except Exception as e:
+            logging.error(f"שגיאה בשמירת פרופיל ההגעה: {e}")
+
+    def seed(self, arrival_times):
+        """בנייה ראשונית מהתצפיות השמורות (זמני ההופעה הראשונה של טיסות), כשאין עדיין פרופיל"""
+        if self.since is not None or not arrival_times:
+            return
+        moments = []
+        for value in arrival_times:
+            try:
+                moments.append(datetime.fromisoformat(value))
+            except (TypeError, ValueError):
+                continue
+        if not moments:
+            return
+        for moment in moments:
+            self.arrivals[hour_of_week(moment)] += 1
+        self.since = min(moments).isoformat()
+        self.recompute()
+        self.save()
+        logging.info(f"פרופיל ההגעה נבנה מ-{len(moments)} תצפיות שמורות")
+
+    def record(self, new_flights, when=None):
+        """רישום תוצאת בדיקה - הטיסות החדשות משויכות לשעה בשבוע שבה זוהו"""
+        when = when or datetime.now()
+        if self.since is None:
+            self.since = when.isoformat()
+        if new_flights:
+            self.arrivals[hour_of_week(when)] += new_flights
+            if self.last_record:
+                gap_minutes = (when - self.last_record).total_seconds() / 60
+                self.delay_sum += new_flights * gap_minutes / 2
+                self.delay_count += new_flights
+        self.last_record = when
+        self.recompute()
+        self.save()
+
+    def weeks_observed(self):
+        if self.since is None:
+            return 0.0
+        return max(0.0, (datetime.now() - datetime.fromisoformat(self.since)).total_seconds() / (7 * 86400))
+
+    def rates(self):
+        """קצב משוער (טיסות לשעה) לכל שעה בשבוע"""
+        weeks = self.weeks_observed() + PRIOR_WEEKS
+        return [(count + PRIOR_ARRIVALS) / weeks for count in self.arrivals]
+
+    def recompute(self):
+        """חישוב מרווח לכל שעה: T_i = בסיס × ממוצע(√λ) / √λ_i, חתוך לגבולות"""
+        roots = [math.sqrt(rate) for rate in self.rates()]
+        mean_root = sum(roots) / len(roots)
+        self.intervals = [min(self.max_minutes, max(self.min_minutes, self.base_minutes * mean_root / root))
+                          for root in roots]
+
+    def next_interval_seconds(self, moment=None):
+        """המרווח עד הבדיקה הבאה, לפי השעה בשבוע של הרגע הנוכחי"""
+        return self.intervals[hour_of_week(moment or datetime.now())] * 60
+
+    def expected_delay_minutes(self):
+        """השהיית הזיהוי הצפויה (ממוצע משוקלל בקצב) - בתזמון המותאם ובמרווח הקבוע"""
+        rates = self.rates()
+        total = sum(rates)
+        adaptive = sum(rate * interval / 2 for rate, interval in zip(rates, self.intervals)) / total
+        return adaptive, self.base_minutes / 2
+
+    def checks_per_week(self):
+        return sum(60 / interval for interval in self.intervals)
+
+    def report(self):
+        """סיכום לשורת לוג / סטטוס"""
+        adaptive, fixed = self.expected_delay_minutes()
+        now = datetime.now()
+        return {
+            'next_interval_minutes': round(self.intervals[hour_of_week(now)], 1),
+            'expected_delay_minutes': round(adaptive, 1),
+            'fixed_delay_minutes': round(fixed, 1),
+            'observed_delay_minutes': round(self.delay_sum / self.delay_count, 1) if self.delay_count else None,
+            'checks_per_week': round(self.checks_per_week()),
+            'fixed_checks_per_week': round(HOURS_PER_WEEK * 60 / self.base_minutes),
+            'weeks_observed': round(self.weeks_observed(), 1),
+            'busiest_hours': [self.describe_hour(h) for h in
+                              sorted(range(HOURS_PER_WEEK), key=lambda h: -self.arrivals[h])[:3] if self.arrivals[h]]
+        }
+
+    @staticmethod
+    def describe_hour(index):
+        day = ['שני', 'שלישי', 'רביעי', 'חמישי', 'שישי', 'שבת', 'ראשון'][index // 24]
+        return f"{day} {index % 24:02d}:00"
@@ -0,0 +1,130 @@
+import asyncio
+import random
+import logging
+import threading
+from config import CHECK_JITTER_SECONDS, SCHEDULE_OVERLAP_POLICY
+
+class AsyncScheduler:
+    """תזמון מחזורי בדיקה על לולאת asyncio.
+
+    הטיקים מחושבים מזמן מונוטוני מוחלט (בלי סחיפה), עם jitter אופציונלי לכל טיק.
+    המחזור עצמו (סריקה חוסמת) רץ ב-thread נפרד, כך שהלולאה נשארת פנויה למשימות אחרות.
+    טיק שמגיע בזמן שמחזור עדיין רץ מדולג (skip) או מאוחד להרצה אחת מיד בסיומו (coalesce).
+    """
+    def __init__(self, job, interval_seconds, jitter_seconds=CHECK_JITTER_SECONDS, overlap=SCHEDULE_OVERLAP_POLICY):
+        self.job = job
+        # מספר קבוע, או פונקציה שמחזירה את המרווח לטיק הבא (תזמון מותאם)
+        self.interval = interval_seconds
+        self.jitter = max(0.0, jitter_seconds)
+        self.overlap = overlap
+        self.loop = None
+        self.stop_event = None
+        self.current = None
+        self.thread = None
+        self.pending = False
+        self.skipped = 0
+
+    def run(self):
+        """הרצת הלולאה עד stop(); חוסם את ה-thread הקורא"""
+        asyncio.run(self.main())
+
+    async def main(self):
+        self.loop = asyncio.get_running_loop()
+        self.stop_event = asyncio.Event()
+        next_tick = self.loop.time()
+        try:
+            while not self.stop_event.is_set():
+                delay = max(0.0, next_tick + random.uniform(0, self.jitter) - self.loop.time())
+                try:
+                    await asyncio.wait_for(self.stop_event.wait(), timeout=delay)
+                    break
+                except asyncio.TimeoutError:
+                    pass
+                self.tick()
+
+                next_tick += self.next_interval()
+                now = self.loop.time()
+                if next_tick <= now:
+                    # מחזור ארוך או השהיה של התהליך - ממשיכים מהטיק הבא בעתיד בלי פרץ של הרצות
+                    interval = self.next_interval()
+                    next_tick += ((now - next_tick) // interval + 1) * interval
+        finally:
+            if self.current and not self.current.done():
+                # ה-thread של המחזור לא נעצר בכוח; הלולאה לא ממתינה לו, ומי שסוגר את המשאבים
+                # מבקש מהמחזור לעצור וממתין לו עם join()
+                self.current.cancel()
+                logging.info("המחזור שרץ בוטל בעקבות עצירת התזמון")
+
+    def next_interval(self):
+        return self.interval() if callable(self.interval) else self.interval
+
+    def tick(self):
+        """טיק: הפעלת מחזור, או דילוג/איחוד אם הקודם עדיין רץ"""
+        if self.current and not self.current.done():
+            if self.overlap == 'coalesce':
+                self.pending = True
+                logging.warning("המחזור הקודם עדיין רץ - הבדיקה תרוץ מיד בסיומו")
+            else:
+                self.skipped += 1
+                logging.warning(f"המחזור הקודם עדיין רץ - מדלג על הטיק ({self.skipped} דילוגים עד כה)")
+            return
+        self.start_cycle()
+
+    def start_cycle(self):
+        self.current = self.run_in_thread(self.job)
+        self.current.add_done_callback(self.cycle_done)
+
+    def cycle_done(self, future):
+        if future.cancelled():
+            return
+        if future.exception() is not None:
+            logging.error(f"שגיאה במחזור מתוזמן: {future.exception()}")
+        if self.pending and not self.stop_event.is_set():
+            self.pending = False
+            self.start_cycle()
+
+    def run_in_thread(self, func):
+        """הרצת פונקציה חוסמת ב-thread daemon; מחזיר future של הלולאה.
+
+        thread daemon ולא ThreadPoolExecutor - ה-executor ממתין ל-threads שלו ביציאה
+        מהתהליך, ואז SIGTERM היה ממתין לסוף הסריקה.
+        """
+        future = self.loop.create_future()
+
+        def resolve(result, error):
+            if future.done():
+                return
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+        def target():
+            result, error = None, None
+            try:
+                result = func()
+            except Exception as e:
+                error = e
+            try:
+                self.loop.call_soon_threadsafe(resolve, result, error)
+            except RuntimeError:
+                # הלולאה כבר נסגרה
+                pass
+
+        self.thread = threading.Thread(target=target, name='check-cycle', daemon=True)
+        self.thread.start()
+        return future
+
+    def join(self, timeout=None):
+        """המתנה לסיום המחזור שרץ (אחרי stop) לפני סגירת המשאבים שלו; מחזיר False אם עדיין רץ"""
+        if self.thread and self.thread.is_alive():
+            self.thread.join(timeout)
+        return not (self.thread and self.thread.is_alive())
+
+    def stop(self):
+        """עצירה מכל thread (גם מ-signal handler) - הלולאה מתעוררת מיד"""
+        if self.loop and self.stop_event:
+            try:
+                self.loop.call_soon_threadsafe(self.stop_event.set)
+            except RuntimeError:
+                pass
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מיקרו-בנצ'מרק למנוע החילוץ המשותף מול המימוש הקודם (תבנית עצלה לכל יעד)
+
+שימוש:
+  python benchmarks/bench_extraction.py --cards 2000 --repeat 5
+"""
+
+import os
+import re
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PREFERRED_DESTINATIONS
+from flight_extraction import extract_flight_tuples, find_destination, find_price, find_dates
+
+FILLER_WORDS = ['טיסה', 'הלוך ושוב', 'כולל כבודה', 'מקומות אחרונים', 'יציאה', 'חזרה', 'ארקיע', 'מבצע', 'לילות']
+
+def build_page_text(cards, priced_ratio=1.0, seed=7):
+    """טקסט עמוד סינתטי: כרטיסים עם יעד, תאריכים, מחיר ומילות מילוי.
+
+    priced_ratio קובע איזה חלק מהכרטיסים מכיל מחיר - בדף שהמחירים בו נטענים
+    ב-JavaScript היעדים מופיעים ללא מחיר, וזה המקרה שבו התבנית העצלה מתפוצצת.
+    """
+    rng = random.Random(seed)
+    parts = []
+    for _ in range(cards):
+        parts.append(rng.choice(PREFERRED_DESTINATIONS))
+        parts.append(' '.join(rng.choice(FILLER_WORDS) for _ in range(rng.randint(3, 12))))
+        parts.append(f'{rng.randint(1, 28)}/{rng.randint(1, 12)}/2024')
+        if rng.random() < priced_ratio:
+            parts.append(f'{rng.randint(100, 2500)} ₪')
+    return ' '.join(parts)
+
+def legacy_extract_flights_from_text(text):
+    """המימוש הקודם: תבנית עצלה חדשה לכל יעד, מעבר מלא על הטקסט לכל יעד"""
+    flights = []
+    for dest in PREFERRED_DESTINATIONS:
+        if dest in text:
+            pattern = f"{dest}.*?(\\d{{1,4}})\\s*(₪|שח)"
+            for match in re.finditer(pattern, text, re.IGNORECASE):
+                price = int(match.group(1))
+                if 100 <= price <= 3000:
+                    flights.append((dest, price))
+    return flights
+
+def legacy_extract_card(text):
+    """המימוש הקודם לחילוץ מכרטיס בודד - קומפילציה מחדש בכל קריאה"""
+    destination = next((d for d in PREFERRED_DESTINATIONS if d in text), None)
+    price = None
+    for pattern in [r'(\d{1,4})\s*₪', r'(\d{1,4})\s*שח', r'₪\s*(\d{1,4})', r'שח\s*(\d{1,4})',
+                    r'(\d{1,4})\s*שקל', r'מ\s*(\d{1,4})', r'החל\s*מ\s*(\d{1,4})']:
+        match = re.search(pattern, text)
+        if match:
+            price = int(match.group(1))
+            break
+    dates = []
+    for pattern in [r'(\d{1,2}[./]\d{1,2}[./]\d{2,4})', r'(\d{1,2}\s*[בב]\w+\s*\d{4})',
+                    r'(ינואר|פברואר|מרץ|אפריל|מאי|יוני|יולי|אוגוסט|ספטמבר|אוקטובר|נובמבר|דצמבר)']:
+        dates.extend(re.findall(pattern, text))
+    return destination, price, dates
+
+def shared_extract_card(text):
+    """חילוץ מכרטיס בודד עם התבניות המקומפלות המשותפות"""
+    return find_destination(text), find_price(text), find_dates(text)
+
+def timed(func, arg, repeat):
+    """הזמן הטוב ביותר מתוך repeat הרצות"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(arg)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description="מיקרו-בנצ'מרק למנוע החילוץ")
+    parser.add_argument('--cards', type=int, default=2000, help='מספר כרטיסים בטקסט הסינתטי')
+    parser.add_argument('--repeat', type=int, default=5, help='מספר חזרות לכל מדידה')
+    args = parser.parse_args()
+
+    scenarios = [
+        ('כל הכרטיסים עם מחיר', 1.0),
+        ('מחצית הכרטיסים עם מחיר', 0.5),
+        ('מחירים נטענים ב-JS (ללא מחירים)', 0.0)
+    ]
+    for name, priced_ratio in scenarios:
+        text = build_page_text(args.cards, priced_ratio)
+        legacy_time, legacy_result = timed(legacy_extract_flights_from_text, text, args.repeat)
+        shared_time, shared_result = timed(extract_flight_tuples, text, args.repeat)
+        print(f"{name} ({len(text):,} תווים) - קודם: {legacy_time * 1000:.1f}ms ({len(legacy_result)} התאמות), "
+              f"משותף: {shared_time * 1000:.1f}ms ({len(shared_result)} התאמות), "
+              f"פי {legacy_time / shared_time:.1f}")
+
+    text = build_page_text(args.cards)
+    card_texts = [text[i:i + 120] for i in range(0, len(text), 120)]
+    legacy_time, _ = timed(lambda texts: [legacy_extract_card(t) for t in texts], card_texts, args.repeat)
+    shared_time, _ = timed(lambda texts: [shared_extract_card(t) for t in texts], card_texts, args.repeat)
+    print(f"{len(card_texts)} כרטיסים בודדים - קודם: {legacy_time * 1000:.1f}ms, משותף: {shared_time * 1000:.1f}ms, "
+          f"פי {legacy_time / shared_time:.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+בנצ'מרק לפרסור ה-HTML של הסקרפר הפשוט: המסלול הישן (select + get_text) מול מעבר יחיד על העץ
+
+שימוש:
+  python benchmarks/bench_html_parsing.py                       # עמוד סינתטי
+  python benchmarks/bench_html_parsing.py page1.html page2.html # עמודים שמורים
+"""
+
+import os
+import sys
+import time
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from html_blocks import available_backends, parse_text_blocks
+from simple_scraper import SimpleFlightScraper
+from synthetic import build_synthetic_page
+
+def timed(func, repeat):
+    """הזמן הטוב ביותר מתוך repeat הרצות"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def bench_page(name, content, repeat):
+    """מדידת כל מסלולי הפרסור על עמוד אחד"""
+    scraper = SimpleFlightScraper()
+    print(f"\n{name} ({len(content) / 1024:.0f}KB)")
+
+    legacy_time, legacy_flights = timed(lambda: scraper.parse_flights_legacy(content), repeat)
+    print(f"  legacy (bs4 select):  {legacy_time * 1000:8.1f}ms  {len(legacy_flights)} טיסות")
+
+    for backend in available_backends():
+        def run():
+            blocks = parse_text_blocks(content, backend)
+            return scraper.extract_flights_from_blocks(blocks)
+        blocks_time, flights = timed(run, repeat)
+        unique = scraper.remove_duplicates(flights)
+        print(f"  blocks ({backend}):{' ' * (13 - len(backend))}{blocks_time * 1000:8.1f}ms  "
+              f"{len(unique)} טיסות  (פי {legacy_time / blocks_time:.1f})")
+
+def main():
+    parser = argparse.ArgumentParser(description="בנצ'מרק לפרסור HTML בסקרפר הפשוט")
+    parser.add_argument('pages', nargs='*', help='קבצי HTML שמורים')
+    parser.add_argument('--cards', type=int, default=300, help='מספר כרטיסים בעמוד הסינתטי')
+    parser.add_argument('--depth', type=int, default=6, help='עומק הקינון של כל כרטיס')
+    parser.add_argument('--repeat', type=int, default=3, help='מספר חזרות לכל מדידה')
+    args = parser.parse_args()
+
+    if args.pages:
+        for path in args.pages:
+            with open(path, 'rb') as f:
+                bench_page(os.path.basename(path), f.read(), args.repeat)
+    else:
+        bench_page(f'עמוד סינתטי ({args.cards} כרטיסים, עומק {args.depth})',
+                   build_synthetic_page(args.cards, args.depth), args.repeat)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,203 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+חבילת בנצ'מרקים לא מקוונת לכל שלבי החילוץ: עמודים שמורים (fixtures) ועמודים סינתטיים.
+לכל שלב נמדדים זמן, תפוקה ושיא זיכרון, והתוצאות נכתבות ל-JSON להשוואה בין גרסאות.
+
+שימוש:
+  python benchmarks/bench_suite.py                                  # fixtures + 100/1000/5000 כרטיסים
+  python benchmarks/bench_suite.py --sizes 200 2000 --repeat 5
+  python benchmarks/bench_suite.py --baseline benchmarks/results/before.json
+  python benchmarks/bench_suite.py --record                         # שמירת עמוד האתר החי כ-fixture
+"""
+
+import os
+import sys
+import json
+import time
+import platform
+import argparse
+import tracemalloc
+from datetime import datetime
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+from config import TUSTUS_URL
+from html_blocks import parse_text_blocks, subtree_text
+from flight_scraper import FlightScraper, FLIGHT_SELECTORS
+from simple_scraper import SimpleFlightScraper
+from flight_monitor import filter_relevant_flights
+from flight_dedup import NearDuplicateIndex
+from synthetic import build_synthetic_page
+
+FIXTURES_DIR = os.path.join(BENCH_DIR, 'fixtures')
+RESULTS_DIR = os.path.join(BENCH_DIR, 'results')
+
+# מחלקות כרטיס: הסלקטורים המדויקים של הסקרפר, ובמקום [class*=...] - שמות הכרטיסים הנפוצים
+CARD_CLASSES = {s.lstrip('.') for s in FLIGHT_SELECTORS if s.startswith('.')} | {'flight-card', 'deal-card'}
+
+class CardElement:
+    """תחליף ל-WebElement - הסקרפר קורא רק את .text"""
+    def __init__(self, text):
+        self.text = text
+
+def card_texts(content):
+    """טקסט הכרטיסים כפי ש-Chrome היה מחזיר אותו: הבלוק החיצוני ביותר עם מחלקת כרטיס"""
+    blocks = parse_text_blocks(content)
+    texts = []
+    inside = [False] * len(blocks)
+    for block in blocks:
+        if block.parent >= 0 and inside[block.parent]:
+            inside[block.index] = True
+            continue
+        if CARD_CLASSES.intersection(block.classes.split()):
+            inside[block.index] = True
+            texts.append(subtree_text(blocks, block.index))
+    return texts
+
+def measure(func, repeat):
+    """הזמן הטוב ביותר מתוך repeat הרצות, ושיא הזיכרון בהרצה נפרדת תחת tracemalloc"""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return best, peak, result
+
+def bench_page(content, repeat, scrapers):
+    """מדידת כל השלבים על עמוד אחד; מחזיר מילון שלב -> מדדים"""
+    simple_scraper, browser_scraper = scrapers
+    cards = card_texts(content)
+    blocks = parse_text_blocks(content)
+    page_text = ' '.join(block.text for block in blocks if block.text)
+    stages = [
+        ('simple.parse_blocks', len(content), lambda: parse_text_blocks(content)),
+        ('simple.extract_blocks', len(blocks), lambda: simple_scraper.extract_flights_from_blocks(blocks)),
+        ('simple.parse_flights', len(content), lambda: simple_scraper.parse_flights(content)),
+        ('simple.parse_flights_legacy', len(content), lambda: simple_scraper.parse_flights_legacy(content)),
+        ('simple.extract_flights_from_text', len(page_text), lambda: simple_scraper.extract_flights_from_text(page_text)),
+        ('simple.extract_flight_info', len(cards), lambda: [simple_scraper.extract_flight_info(t) for t in cards]),
+        ('browser.extract_flight_data', len(cards),
+         lambda: [browser_scraper.extract_flight_data(CardElement(t)) for t in cards]),
+    ]
+
+    results = {}
+    flights = []
+    for name, items, func in stages:
+        seconds, peak, output = measure(func, repeat)
+        results[name] = stage_result(seconds, peak, items)
+        if name == 'browser.extract_flight_data':
+            flights = [f for f in output if f]
+
+    # האיחוד והסינון רצים על הטיסות שחולצו מהכרטיסים
+    seconds, peak, _ = measure(lambda: list(NearDuplicateIndex().iter_unique(flights)), repeat)
+    results['dedup.near_duplicates'] = stage_result(seconds, peak, len(flights))
+    seconds, peak, _ = measure(lambda: filter_relevant_flights(flights), repeat)
+    results['monitor.filter_relevant_flights'] = stage_result(seconds, peak, len(flights))
+    return {'bytes': len(content), 'cards': len(cards), 'stages': results}
+
+def stage_result(seconds, peak, items):
+    """מדדי שלב: זמן, תפוקה (פריטים לשנייה - בתים, בלוקים או כרטיסים) ושיא זיכרון"""
+    return {
+        'seconds': round(seconds, 6),
+        'items': items,
+        'items_per_second': round(items / seconds, 1) if seconds else None,
+        'peak_kb': round(peak / 1024, 1)
+    }
+
+def load_pages(sizes, depth):
+    """כל ה-fixtures השמורים ועמודים סינתטיים בגדלים המבוקשים"""
+    pages = []
+    if os.path.isdir(FIXTURES_DIR):
+        for name in sorted(os.listdir(FIXTURES_DIR)):
+            if name.endswith('.html'):
+                with open(os.path.join(FIXTURES_DIR, name), 'rb') as f:
+                    pages.append((f'fixture:{name}', f.read()))
+    for cards in sizes:
+        pages.append((f'synthetic:{cards}', build_synthetic_page(cards, depth)))
+    return pages
+
+def record_fixture():
+    """שמירת עמוד האתר החי כ-fixture (הפעולה המקוונת היחידה בחבילה)"""
+    scraper = SimpleFlightScraper()
+    response = scraper.session.get(TUSTUS_URL, timeout=30)
+    response.raise_for_status()
+    os.makedirs(FIXTURES_DIR, exist_ok=True)
+    path = os.path.join(FIXTURES_DIR, f'tustus_home_{datetime.now():%Y%m%d}.html')
+    with open(path, 'wb') as f:
+        f.write(response.content)
+    print(f"נשמר: {path} ({len(response.content) / 1024:.0f}KB)")
+
+def compare(results, baseline, threshold):
+    """השוואה לתוצאות בסיס - שלבים שהאטו מעבר לסף מוחזרים כרגרסיות"""
+    regressions = []
+    for page, page_results in results['pages'].items():
+        base_stages = baseline.get('pages', {}).get(page, {}).get('stages', {})
+        for stage, metrics in page_results['stages'].items():
+            base = base_stages.get(stage)
+            if not base or not base.get('seconds'):
+                continue
+            ratio = metrics['seconds'] / base['seconds']
+            if ratio > 1 + threshold:
+                regressions.append((page, stage, base['seconds'], metrics['seconds'], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="חבילת בנצ'מרקים לחילוץ הטיסות")
+    parser.add_argument('--sizes', type=int, nargs='*', default=[100, 1000, 5000], help='מספרי כרטיסים לעמודים סינתטיים')
+    parser.add_argument('--depth', type=int, default=6, help='עומק הקינון של כל כרטיס')
+    parser.add_argument('--repeat', type=int, default=3, help='מספר חזרות לכל מדידה')
+    parser.add_argument('--output', help='קובץ התוצאות (ברירת מחדל: benchmarks/results/<זמן>.json)')
+    parser.add_argument('--baseline', help='קובץ תוצאות קודם להשוואה')
+    parser.add_argument('--threshold', type=float, default=0.2, help='האטה יחסית שנחשבת רגרסיה')
+    parser.add_argument('--record', action='store_true', help='שמירת עמוד האתר החי כ-fixture ויציאה')
+    args = parser.parse_args()
+
+    if args.record:
+        record_fixture()
+        return 0
+
+    # הסקרפרים נבנים פעם אחת ללא דפדפן וללא רשת
+    scrapers = (SimpleFlightScraper(http_cache={}), FlightScraper(driver=object()))
+    results = {
+        'created_at': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'pages': {}
+    }
+
+    for name, content in load_pages(args.sizes, args.depth):
+        page = bench_page(content, args.repeat, scrapers)
+        results['pages'][name] = page
+        print(f"\n{name} ({page['bytes'] / 1024:.0f}KB, {page['cards']} כרטיסים)")
+        for stage, metrics in page['stages'].items():
+            print(f"  {stage:<36}{metrics['seconds'] * 1000:10.2f}ms  {metrics['items_per_second'] or 0:>14,.0f}/s"
+                  f"  {metrics['peak_kb']:>10,.0f}KB")
+
+    output = args.output or os.path.join(RESULTS_DIR, f'{datetime.now():%Y%m%d_%H%M%S}.json')
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, ensure_ascii=False, indent=2)
+    print(f"\nהתוצאות נשמרו: {output}")
+
+    if args.baseline:
+        with open(args.baseline, 'r', encoding='utf-8') as f:
+            regressions = compare(results, json.load(f), args.threshold)
+        for page, stage, before, after, ratio in regressions:
+            print(f"רגרסיה: {page} / {stage}: {before * 1000:.2f}ms -> {after * 1000:.2f}ms (פי {ratio:.2f})")
+        if regressions:
+            return 1
+        print("אין רגרסיות ביחס לבסיס")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מחולל עמודי TusTus סינתטיים לבנצ'מרקים - כרטיסי דילים בעברית בכל כמות ועומק קינון
+"""
+
+import os
+import sys
+import random
+from datetime import date, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import PREFERRED_DESTINATIONS
+
+FILLER_PHRASES = ['טיסת רגע אחרון', 'הלוך ושוב', 'כולל כבודה', 'מקומות אחרונים', 'ארקיע', 'מבצע', '3 לילות']
+
+def build_synthetic_page(cards, depth=6, seed=11, priced_ratio=1.0):
+    """עמוד HTML סינתטי עם כרטיסי דילים עטופים בכמה רמות קינון.
+
+    התאריכים יחסיים להיום, כך שסינון הטיסות הרלוונטיות עובר על כל הנתיב.
+    """
+    rng = random.Random(seed)
+    today = date.today()
+    rows = []
+    for i in range(cards):
+        dest = rng.choice(PREFERRED_DESTINATIONS)
+        departure = today + timedelta(days=rng.randint(0, 20))
+        back = departure + timedelta(days=rng.randint(2, 7))
+        price = (f'<div class="price"><span>{rng.randint(100, 2500)}</span> ₪</div>'
+                 if rng.random() < priced_ratio else '<div class="price">בקרוב</div>')
+        card = (f'<div class="deal-card" data-id="{i}"><h3 class="dest">{dest}</h3>'
+                f'<span class="dates">{departure:%d/%m/%Y} - {back:%d/%m/%Y}</span>{price}'
+                f'<p>{" ".join(rng.sample(FILLER_PHRASES, 3))}</p>'
+                f'<a class="more" href="/Arkia/Deal/{i}">לפרטים</a></div>')
+        for level in range(depth):
+            card = f'<div class="wrap-{level}">{card}</div>'
+        rows.append(card)
+    return (f'<html><head><title>TusTus</title><style>.deal-card{{margin:0}}</style>'
+            f'<script>var config = {{"deals": {cards}}};</script></head>'
+            f'<body><nav>טיסות | חבילות | צור קשר</nav><main>{"".join(rows)}</main>'
+            f'<footer>כל הזכויות שמורות</footer></body></html>').encode('utf-8')
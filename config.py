@@ -55,6 +55,127 @@ LOG_FILE = 'flight_monitor.log'
 # הגדרות ספציפיות לאתר TusTus
 # מאחר שהמחירים קבועים והטיסות לימים הקרובים
 FOCUS_ON_NEW_FLIGHTS_ONLY = True  # התמקד רק בטיסות חדשות
-IGNORE_PRICE_CHANGES = True  # התעלם משינויי מחירים
+IGNORE_PRICE_CHANGES = os.getenv('IGNORE_PRICE_CHANGES', 'false').lower() == 'true'  # התעלם משינויי מחירים
 MAX_FLIGHT_AGE_HOURS = 72  # טיסות רק עד 3 ימים
-MIN_DAYS_ADVANCE = 1  # טיסות החל ממחר
\ No newline at end of file
+MIN_DAYS_ADVANCE = 1  # טיסות החל ממחר
+
+# הגדרות מאגר דפדפנים - שמירת Chrome חם בין מחזורי בדיקה
+DRIVER_POOL_SIZE = int(os.getenv('DRIVER_POOL_SIZE', '1'))  # מספר סשנים חמים שנשמרים
+DRIVER_MAX_USES = int(os.getenv('DRIVER_MAX_USES', '20'))  # מיחזור סשן אחרי מספר שימושים
+DRIVER_PREWARM = os.getenv('DRIVER_PREWARM', 'true').lower() == 'true'  # חימום סשן לקראת הבדיקה הבאה
+
+
+# אופן חילוץ הכרטיסים מהדף: script = קריאה אחת לדפדפן שמחזירה JSON, elements = אלמנט אחר אלמנט
+SCRAPER_EXTRACTION_MODE = os.getenv('SCRAPER_EXTRACTION_MODE', 'script')
+
+# המתנה אדפטיבית לטעינת הדף - חוזרת ברגע שהכרטיסים בדף וה-DOM שקט
+PAGE_READY_TIMEOUT_SECONDS = float(os.getenv('PAGE_READY_TIMEOUT_SECONDS', '15'))  # תקרת המתנה
+PAGE_READY_QUIET_MS = int(os.getenv('PAGE_READY_QUIET_MS', '500'))  # חלון שקט ללא שינויים ב-DOM
+
+# חסימת משאבים כבדים בזמן סריקה עם Chrome
+RESOURCE_BLOCKING_ENABLED = os.getenv('RESOURCE_BLOCKING_ENABLED', 'true').lower() == 'true'
+# סוגים אפשריים: image, font, stylesheet, media (חסימת stylesheet עלולה לחשוף טקסט מוסתר)
+BLOCKED_RESOURCE_TYPES = [t.strip() for t in os.getenv('BLOCKED_RESOURCE_TYPES', 'image,font,media').split(',') if t.strip()]
+BLOCKED_DOMAINS = [d.strip() for d in os.getenv(
+    'BLOCKED_DOMAINS',
+    'google-analytics.com,googletagmanager.com,doubleclick.net,facebook.net,connect.facebook.com,hotjar.com,clarity.ms'
+).split(',') if d.strip()]
+ALLOWED_DOMAINS = [d.strip() for d in os.getenv('ALLOWED_DOMAINS', '').split(',') if d.strip()]  # גובר על BLOCKED_DOMAINS
+
+# מסלול מהיר: גילוי ה-XHR של האתר וקריאה ישירה אליו, Chrome רק כשהמסלול המהיר נכשל
+API_FAST_PATH_ENABLED = os.getenv('API_FAST_PATH_ENABLED', 'true').lower() == 'true'
+API_DISCOVERY_ENABLED = os.getenv('API_DISCOVERY_ENABLED', 'true').lower() == 'true'
+API_ENDPOINTS_FILE = 'api_endpoints.json'
+API_REQUEST_TIMEOUT = int(os.getenv('API_REQUEST_TIMEOUT', '10'))
+
+# סדר סלקטורים נלמד - סטטיסטיקה נשמרת לדיסק, והסלקטור המנצח האחרון נבדק ראשון
+SELECTOR_STATS_FILE = 'selector_stats.json'
+SELECTOR_DEMOTE_AFTER = int(os.getenv('SELECTOR_DEMOTE_AFTER', '5'))  # כישלונות רצופים עד הורדה לסוף התור
+
+# בקשות מותנות ומטמון תוכן לסקרפר הפשוט - דילוג על פרסור כשהדף לא השתנה
+HTTP_CACHE_ENABLED = os.getenv('HTTP_CACHE_ENABLED', 'true').lower() == 'true'
+HTTP_CACHE_FILE = 'http_cache.json'
+
+# פרסור HTML בסקרפר הפשוט: blocks = מעבר יחיד על העץ, legacy = select לכל סלקטור
+SIMPLE_PARSER_MODE = os.getenv('SIMPLE_PARSER_MODE', 'blocks')
+HTML_PARSER_BACKEND = os.getenv('HTML_PARSER_BACKEND', 'auto')  # auto / selectolax / lxml / bs4
+
+# סריקה בשכבות: tiered = API ואז HTTP פשוט ו-Chrome רק כשצריך, race = זול ו-Chrome במקביל, browser = Chrome בלבד
+SCRAPE_STRATEGY = os.getenv('SCRAPE_STRATEGY', 'tiered')
+MAX_DIVERGENT_CYCLES = int(os.getenv('MAX_DIVERGENT_CYCLES', '3'))  # מחזורים רצופים של סטייה עד אימות עם Chrome
+DIVERGENCE_THRESHOLD = float(os.getenv('DIVERGENCE_THRESHOLD', '0.5'))  # דמיון מינימלי לתוצאת הדפדפן האחרונה
+BROWSER_BASELINE_EVERY_CYCLES = int(os.getenv('BROWSER_BASELINE_EVERY_CYCLES', '24'))  # סריקת Chrome לבסיס ההשוואה (0 - רק במחזור הראשון)
+
+# פרופילי חילוץ למקורות הסריקה: טווח מחירים סביר ומצב פרסור
+EXTRACTION_PROFILES = {
+    'default': {'price_range': (100, 3000), 'parser_mode': SIMPLE_PARSER_MODE},
+    'airline': {'price_range': (50, 5000), 'parser_mode': 'blocks'},
+    'legacy': {'price_range': (100, 3000), 'parser_mode': 'legacy'}
+}
+
+# מקורות לסריקה מקבילית - פורמט: url|profile מופרדים בפסיקים (ברירת מחדל: עמוד ארקיע)
+SCRAPE_SOURCES = []
+for _source in os.getenv('SCRAPE_SOURCES', f'{TUSTUS_URL}|default').split(','):
+    if _source.strip():
+        _url, _, _profile = _source.strip().partition('|')
+        SCRAPE_SOURCES.append({'url': _url.strip(), 'profile': _profile.strip() or 'default'})
+MAX_CONCURRENT_SOURCES = int(os.getenv('MAX_CONCURRENT_SOURCES', '8'))  # תקרת סריקות במקביל
+MAX_CONNECTIONS_PER_HOST = int(os.getenv('MAX_CONNECTIONS_PER_HOST', '2'))  # בקשות במקביל לאותו שרת
+SOURCE_TIMEOUT_SECONDS = float(os.getenv('SOURCE_TIMEOUT_SECONDS', '30'))  # תקרת זמן לכל מקור
+
+# סריקת עומק של דפי הפרטים (תאריכי יציאה/חזרה מדויקים ומקומות) - סשני Chrome במקביל
+DETAIL_CRAWL_ENABLED = os.getenv('DETAIL_CRAWL_ENABLED', 'false').lower() == 'true'
+DETAIL_WORKERS = int(os.getenv('DETAIL_WORKERS', '3'))  # מספר דפדפנים חמים מינימלי
+DETAIL_MAX_WORKERS = int(os.getenv('DETAIL_MAX_WORKERS', '8'))  # תקרת דפדפנים במקביל - דף לכל קישור עד התקרה
+DETAIL_PAGE_TIMEOUT_SECONDS = float(os.getenv('DETAIL_PAGE_TIMEOUT_SECONDS', '20'))  # תקרת טעינה לכל דף
+DETAIL_CACHE_TTL_MINUTES = float(os.getenv('DETAIL_CACHE_TTL_MINUTES', '60'))  # אחרי כמה זמן דף פרטים נטען מחדש
+
+# אינדקס חתימות הטיסות מהבדיקה האחרונה (יומן הוספות/הסרות) - שורד הפעלה מחדש
+SIGNATURE_INDEX_FILE = 'flight_signatures.log'
+
+# אחסון נתוני הטיסות: sqlite (מצב WAL, כתיבת שינויים בלבד), journal (יומן JSON-lines) או json (הקובץ המלא בכל בדיקה)
+STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sqlite')
+SQLITE_DB_FILE = 'flights.db'
+STORAGE_RETENTION_DAYS = int(os.getenv('STORAGE_RETENTION_DAYS', '30'))  # ימי שמירה לטיסות שנעלמו ולהרצות
+
+# יומן תצפיות (STORAGE_BACKEND=journal) - שורה לכל בדיקה, ודחיסה לתמונת מצב כל JOURNAL_COMPACT_EVERY בדיקות
+JOURNAL_FILE = 'flights_journal.jsonl'
+SNAPSHOT_FILE = 'flights_snapshot.json'
+JOURNAL_COMPACT_EVERY = int(os.getenv('JOURNAL_COMPACT_EVERY', '100'))
+
+# היסטוריית מחירים (יומן שינויים בלבד) והתראה על ירידת מחיר מעל הסף
+PRICE_HISTORY_FILE = 'price_history.log'
+PRICE_DROP_THRESHOLD_PERCENT = float(os.getenv('PRICE_DROP_THRESHOLD_PERCENT', '5'))  # ירידה מינימלית באחוזים
+
+# איחוד כרטיסים כמעט זהים (אותו יעד ומחיר, טקסט דומה) לפני ההשוואה וההתראה
+DEDUP_SIMILARITY_THRESHOLD = float(os.getenv('DEDUP_SIMILARITY_THRESHOLD', '0.85'))  # דמיון Jaccard מינימלי
+DEDUP_SHINGLE_SIZE = 5  # אורך רצף התווים להשוואה
+
+# מדידת זמנים לכל שלב במחזור - שורת JSON אחת לכל בדיקה, וקובץ הפלט של main.py --profile
+TRACE_ENABLED = os.getenv('TRACE_ENABLED', 'true').lower() == 'true'
+TRACE_FILE = os.getenv('TRACE_FILE', 'cycle_trace.jsonl')
+PROFILE_FILE = 'check_cycle.pstats'
+
+# מדדי Prometheus של התהליך הרציף (מונים והיסטוגרמות), מוגשים ב-http://METRICS_HOST:METRICS_PORT/metrics
+METRICS_ENABLED = os.getenv('METRICS_ENABLED', 'true').lower() == 'true'
+METRICS_HOST = os.getenv('METRICS_HOST', '127.0.0.1')
+METRICS_PORT = int(os.getenv('METRICS_PORT', '9108'))
+
+# תזמון הבדיקות: פיזור אקראי לכל טיק (שניות), ומה עושים בטיק שמגיע כשהבדיקה הקודמת עדיין רצה - skip או coalesce
+CHECK_JITTER_SECONDS = float(os.getenv('CHECK_JITTER_SECONDS', '0'))
+SCHEDULE_OVERLAP_POLICY = os.getenv('SCHEDULE_OVERLAP_POLICY', 'skip')
+SHUTDOWN_TIMEOUT_SECONDS = 30  # המתנה בסיום התהליך למחזור שעדיין רץ, לפני סגירת הדפדפן והמסד
+
+# תזמון מותאם (SCHEDULE_MODE=adaptive): המרווח נקבע לפי קצב הופעת הטיסות בכל שעה בשבוע, בין המינימום למקסימום
+SCHEDULE_MODE = os.getenv('SCHEDULE_MODE', 'fixed')
+MIN_CHECK_INTERVAL_MINUTES = float(os.getenv('MIN_CHECK_INTERVAL_MINUTES', '15'))
+MAX_CHECK_INTERVAL_MINUTES = float(os.getenv('MAX_CHECK_INTERVAL_MINUTES', '180'))
+ADAPTIVE_STATE_FILE = 'arrival_profile.json'
+
+# תור התראות עמיד (SQLite) שנשלח ברקע - ניסיון חוזר בהמתנה שמכפילה את עצמה, עד תקרה ומספר ניסיונות מרבי
+OUTBOX_DB_FILE = 'notifications.db'
+OUTBOX_RETRY_BASE_SECONDS = float(os.getenv('OUTBOX_RETRY_BASE_SECONDS', '30'))
+OUTBOX_RETRY_MAX_SECONDS = float(os.getenv('OUTBOX_RETRY_MAX_SECONDS', '3600'))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv('OUTBOX_MAX_ATTEMPTS', '10'))
+OUTBOX_RETENTION_DAYS = 30  # התראות שנשלחו נמחקות מהתור אחרי
+SMTP_TIMEOUT_SECONDS = float(os.getenv('SMTP_TIMEOUT_SECONDS', '60'))
\ No newline at end of file
@@ -0,0 +1,89 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from driver_pool import DriverPool
+from flight_extraction import find_detail_fields
+from config import DETAIL_WORKERS, DETAIL_MAX_WORKERS, DETAIL_PAGE_TIMEOUT_SECONDS, DETAIL_CACHE_TTL_MINUTES
+
+class DetailCrawler:
+    """סריקה מקבילית של דפי הפרטים של הדילים - תאריכים מדויקים ומקומות פנויים"""
+    def __init__(self, workers=DETAIL_WORKERS, max_workers=DETAIL_MAX_WORKERS, page_timeout=DETAIL_PAGE_TIMEOUT_SECONDS):
+        self.workers = max(1, workers)
+        # דף לכל קישור עד התקרה - הסבב כולו נמשך בערך טעינת דף אחת
+        self.max_workers = max(self.workers, max_workers)
+        self.page_timeout = page_timeout
+        # מאגר נפרד מזה של הסריקה הראשית - הסשנים נשארים חמים בין מחזורים (המאגר גדל לפי מספר הקישורים)
+        self.driver_pool = DriverPool(size=self.workers)
+        self.executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='detail')
+        # פרטים שכבר נסרקו, לפי קישור: (שדות, זמן הסריקה) - נטענים שוב רק אחרי ה-TTL, כי המקומות משתנים
+        self.details_cache = {}
+        self.cache_ttl = DETAIL_CACHE_TTL_MINUTES * 60
+
+    def fetch_details(self, link):
+        """טעינת דף פרטים אחד בסשן מהמאגר וחילוץ השדות מהטקסט שלו"""
+        session = None
+        failed = False
+        try:
+            session = self.driver_pool.acquire()
+            driver = session.driver
+            driver.set_page_load_timeout(self.page_timeout)
+            driver.get(link)
+            WebDriverWait(driver, self.page_timeout).until(EC.presence_of_element_located((By.TAG_NAME, 'body')))
+            text = driver.execute_script("return document.body.innerText || ''")
+            return find_detail_fields(text)
+        except Exception as e:
+            failed = True
+            logging.warning(f"שגיאה בסריקת דף פרטים {link}: {e}")
+            return None
+        finally:
+            if session:
+                self.driver_pool.release(session, failed=failed)
+
+    def enrich(self, flights):
+        """הוספת שדות מדפי הפרטים לטיסות שיש להן קישור; כל הדפים נטענים במקביל"""
+        start = time.perf_counter()
+        links = {f.link for f in flights if f.link}
+        # ניקוי קישורים שכבר לא מופיעים באתר ורשומות שפגו
+        fresh_since = time.time() - self.cache_ttl
+        self.details_cache = {link: entry for link, entry in self.details_cache.items()
+                              if link in links and entry[1] >= fresh_since}
+
+        pending = [link for link in links if link not in self.details_cache]
+        if pending:
+            parallel = min(len(pending), self.max_workers)
+            # סשנים חמים לכל הדפים שנטענים במקביל, גם למחזור הבא
+            self.driver_pool.size = max(self.driver_pool.size, parallel)
+            futures = {self.executor.submit(self.fetch_details, link): link for link in pending}
+            # תקרת זמן לכל הסבב: דף אחד לכל worker, ועוד סבב לכל עודף דפים מעבר לתקרה
+            rounds = -(-len(pending) // parallel)
+            done, not_done = wait(futures, timeout=self.page_timeout * rounds + 5)
+            for future in done:
+                try:
+                    details = future.result()
+                except Exception as e:
+                    # שלב אופציונלי - כשלון בדף (או בהפעלת Chrome) לא מפיל את המחזור
+                    logging.warning(f"שגיאה בסריקת דף פרטים {futures[future]}: {e}")
+                    continue
+                if details is not None:
+                    self.details_cache[futures[future]] = (details, time.time())
+            if not_done:
+                logging.warning(f"{len(not_done)} דפי פרטים לא הסתיימו בזמן - ינוסו שוב במחזור הבא")
+
+        enriched = 0
+        for flight in flights:
+            details = self.details_cache.get(flight.link, (None, 0))[0]
+            if details:
+                flight.update(details)
+                enriched += 1
+
+        logging.info(f"דפי פרטים: {len(pending)} נסרקו, {enriched}/{len(flights)} טיסות הועשרו "
+                     f"תוך {time.perf_counter() - start:.2f} שניות")
+        return flights
+
+    def close(self):
+        """סגירת ה-workers וסשני הדפדפן שלהם"""
+        self.executor.shutdown(wait=False)
+        self.driver_pool.close()
@@ -0,0 +1,127 @@
+import threading
+import time
+import logging
+from flight_scraper import create_chrome_driver
+from config import DRIVER_POOL_SIZE, DRIVER_MAX_USES
+
+class PooledDriver:
+    """סשן Chrome בודד במאגר, עם מונה שימושים ונתוני זמן הפעלה"""
+    def __init__(self, driver):
+        self.driver = driver
+        self.uses = 0
+        self.created_at = time.time()
+        self.failed = False
+        self.was_warm = False
+        self.acquire_seconds = 0.0
+
+class DriverPool:
+    """מאגר סשנים חמים של Chrome שנשמרים בין מחזורי ניטור"""
+    def __init__(self, size=DRIVER_POOL_SIZE, max_uses=DRIVER_MAX_USES, driver_factory=create_chrome_driver):
+        self.size = max(1, size)
+        self.max_uses = max_uses
+        self.driver_factory = driver_factory
+        self.idle = []
+        self.lock = threading.Lock()
+        self.prewarm_thread = None
+        self.closed = False
+        self.stats = {'created': 0, 'reused': 0, 'recycled': 0, 'health_failures': 0}
+
+    def start_session(self) -> PooledDriver:
+        """הפעלת סשן Chrome חדש (cold start)"""
+        start = time.perf_counter()
+        session = PooledDriver(self.driver_factory())
+        with self.lock:
+            self.stats['created'] += 1
+        logging.info(f"סשן Chrome חדש הופעל תוך {time.perf_counter() - start:.2f} שניות")
+        return session
+
+    def is_healthy(self, session: PooledDriver) -> bool:
+        """בדיקת תקינות סשן - סבב הלוך-חזור אחד מול הדפדפן"""
+        try:
+            return session.driver.execute_script("return 1") == 1
+        except Exception as e:
+            logging.warning(f"סשן Chrome לא תקין, ממחזר: {e}")
+            return False
+
+    def quit_session(self, session: PooledDriver):
+        """סגירת סשן ללא זריקת שגיאות"""
+        try:
+            session.driver.quit()
+        except Exception as e:
+            logging.warning(f"שגיאה בסגירת סשן Chrome: {e}")
+
+    def acquire(self) -> PooledDriver:
+        """השאלת סשן מהמאגר - סשן חם אם קיים ותקין, אחרת סשן חדש"""
+        start = time.perf_counter()
+        while True:
+            with self.lock:
+                session = self.idle.pop() if self.idle else None
+            if session is None:
+                session = self.start_session()
+                session.was_warm = False
+                break
+            if self.is_healthy(session):
+                with self.lock:
+                    self.stats['reused'] += 1
+                session.was_warm = True
+                break
+            with self.lock:
+                self.stats['health_failures'] += 1
+            self.quit_session(session)
+
+        session.failed = False
+        session.acquire_seconds = time.perf_counter() - start
+        return session
+
+    def release(self, session: PooledDriver, failed: bool = False):
+        """החזרת סשן למאגר, או מיחזור שלו אחרי שגיאה / מכסת שימושים"""
+        session.uses += 1
+        failed = failed or session.failed
+        with self.lock:
+            keep = not self.closed and not failed and session.uses < self.max_uses and len(self.idle) < self.size
+            if keep:
+                self.idle.append(session)
+            else:
+                self.stats['recycled'] += 1
+
+        if not keep:
+            reason = 'שגיאה' if failed else f'{session.uses} שימושים'
+            logging.info(f"ממחזר סשן Chrome ({reason})")
+            self.quit_session(session)
+
+    def prewarm(self):
+        """השלמת המאגר לסשנים חמים לקראת הבדיקה הבאה"""
+        while True:
+            with self.lock:
+                if self.closed or len(self.idle) >= self.size:
+                    return
+            try:
+                session = self.start_session()
+            except Exception as e:
+                logging.error(f"שגיאה בחימום סשן Chrome: {e}")
+                return
+            with self.lock:
+                keep = not self.closed and len(self.idle) < self.size
+                if keep:
+                    self.idle.append(session)
+            if not keep:
+                self.quit_session(session)
+                return
+
+    def prewarm_async(self):
+        """חימום המאגר ברקע, בלי לעכב את הלולאה הראשית"""
+        if self.prewarm_thread and self.prewarm_thread.is_alive():
+            return
+        self.prewarm_thread = threading.Thread(target=self.prewarm, name='driver-prewarm', daemon=True)
+        self.prewarm_thread.start()
+
+    def close(self):
+        """סגירת כל הסשנים במאגר"""
+        with self.lock:
+            self.closed = True
+            sessions = self.idle
+            self.idle = []
+        for session in sessions:
+            self.quit_session(session)
+        if sessions:
+            logging.info(f"מאגר הדפדפנים נסגר ({len(sessions)} סשנים)")
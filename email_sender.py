@@ -9,8 +9,10 @@ import logging
 from typing import List, Dict
 from config import (
     EMAIL_SMTP_SERVER, EMAIL_SMTP_PORT, EMAIL_USERNAME, 
-    EMAIL_PASSWORD, MAILING_LIST, TUSTUS_URL, IGNORE_PRICE_CHANGES
+    EMAIL_PASSWORD, MAILING_LIST, TUSTUS_URL, IGNORE_PRICE_CHANGES, SMTP_TIMEOUT_SECONDS
 )
+from flight_model import Flight
+import tracing
 
 # הגדרת לוגים
 logging.basicConfig(
@@ -33,7 +35,7 @@ class EmailSender:
         if not self.username or not self.password:
             logging.warning("לא הוגדרו נתוני מייל - שליחת מיילים לא תעבוד")
     
-    def create_flights_html(self, flights: List[Dict], title: str) -> str:
+    def create_flights_html(self, flights: List[Flight], title: str) -> str:
         """יצירת HTML לטיסות חדשות - מותאם לטיסות רגע אחרון"""
         if not flights:
             return ""
@@ -46,14 +48,20 @@ class EmailSender:
             <div style="display: grid; gap: 15px;">
         """
         
-        for flight in flights:
-            destination = flight.get('destination', 'לא זמין')
-            price = flight.get('price', 'מחיר קבוע')
-            dates = flight.get('dates', [])
-            full_text = flight.get('full_text', '')[:200] + '...' if len(flight.get('full_text', '')) > 200 else flight.get('full_text', '')
+        for flight in map(Flight.coerce, flights):
+            destination = flight.destination or 'לא זמין'
+            price = flight.price
+            dates = flight.dates
+            full_text = flight.full_text[:200] + '...' if len(flight.full_text) > 200 else flight.full_text
             
-            # עיצוב תאריכים
-            if dates:
+            # עיצוב תאריכים - תאריכים מדויקים מדף הפרטים אם נסרק
+            if flight.departure_date:
+                dates_display = f"📅 יציאה: {flight.departure_date}"
+                if flight.return_date:
+                    dates_display += f" | חזרה: {flight.return_date}"
+                if flight.seats:
+                    dates_display += f" | 💺 {flight.seats} מקומות"
+            elif dates:
                 dates_str = ', '.join(dates)
                 dates_display = f"📅 תאריכי יציאה: {dates_str}"
             else:
@@ -100,7 +108,63 @@ class EmailSender:
         html += "</div></div>"
         return html
     
-    def create_email_html(self, new_flights: List[Dict], price_changes: List[Dict], stats: Dict) -> str:
+    def create_price_changes_html(self, price_changes: List[Dict], title: str) -> str:
+        """יצירת HTML לירידות מחיר - מחיר קודם, מחיר חדש ואחוז הירידה"""
+        if not price_changes:
+            return ""
+        
+        html = f"""
+        <div style="margin: 20px 0;">
+            <h2 style="color: #c62828; border-bottom: 2px solid #c62828; padding-bottom: 10px;">
+                {title}
+            </h2>
+            <div style="display: grid; gap: 15px;">
+        """
+        
+        for change in price_changes:
+            flight = Flight.coerce(change['flight'])
+            dates_display = f"📅 תאריכי יציאה: {', '.join(flight.dates)}" if flight.dates else "📅 תאריכים יפורסמו בקרוב"
+            link_display = f'<a href="{flight.link}" style="color: #667eea;">לפרטי הדיל</a>' if flight.link else ''
+            
+            html += f"""
+                <div style="
+                    border: 1px solid #ddd; 
+                    border-radius: 8px; 
+                    padding: 15px; 
+                    background: linear-gradient(135deg, #fff8f8 0%, #fdecea 100%);
+                    box-shadow: 0 2px 4px rgba(0,0,0,0.1);
+                ">
+                    <div style="display: flex; justify-content: space-between; align-items: center; margin-bottom: 10px;">
+                        <h3 style="color: #495057; margin: 0; font-size: 18px;">
+                            ✈️ {flight.destination}
+                        </h3>
+                        <span style="
+                            background: #c62828; 
+                            color: white; 
+                            padding: 5px 15px; 
+                            border-radius: 20px; 
+                            font-weight: bold;
+                            font-size: 16px;
+                        ">
+                            📉 {change['drop_percent']:.0f}%-
+                        </span>
+                    </div>
+                    <div style="color: #6c757d; margin-bottom: 8px;">
+                        {dates_display}
+                    </div>
+                    <div style="color: #6c757d; margin-bottom: 8px;">
+                        💰 מחיר: <s>{change['old_price']}₪</s> ← <strong style="color: #2e7d32;">{change['new_price']}₪</strong>
+                    </div>
+                    <div style="color: #6c757d; font-size: 14px;">
+                        {link_display}
+                    </div>
+                </div>
+            """
+        
+        html += "</div></div>"
+        return html
+    
+    def create_email_html(self, new_flights: List[Flight], price_changes: List[Dict], stats: Dict) -> str:
         """יצירת תבנית HTML למייל - מותאמת לטיסות רגע אחרון"""
         current_time = datetime.now().strftime("%d/%m/%Y %H:%M")
         
@@ -148,6 +212,7 @@ class EmailSender:
         """
         
         # סיכום מהיר
+        price_note = 'טיסות רגע אחרון - מחירים קבועים' if IGNORE_PRICE_CHANGES else 'טיסות רגע אחרון - כולל מעקב ירידות מחיר'
         summary = f"""
                     <div style="
                         background: #e3f2fd; 
@@ -164,6 +229,12 @@ class EmailSender:
                                 </div>
                                 <div style="color: #666; font-size: 16px;">טיסות רגע אחרון חדשות</div>
                             </div>
+                            <div style="text-align: center;">
+                                <div style="font-size: 32px; font-weight: bold; color: #c62828;">
+                                    {len(price_changes)}
+                                </div>
+                                <div style="color: #666; font-size: 16px;">ירידות מחיר</div>
+                            </div>
                             <div style="text-align: center;">
                                 <div style="font-size: 24px; font-weight: bold; color: #4caf50;">
                                     {stats.get('total_flights_tracked', 0)}
@@ -172,7 +243,7 @@ class EmailSender:
                             </div>
                         </div>
                         <div style="margin-top: 15px; padding: 10px; background: #fff3cd; border-radius: 5px;">
-                            <div style="color: #856404; font-weight: bold;">⚡ טיסות רגע אחרון - מחירים קבועים</div>
+                            <div style="color: #856404; font-weight: bold;">⚡ {price_note}</div>
                             <div style="color: #856404; font-size: 14px;">המערכת מתמקדת בזיהוי טיסות חדשות לימים הקרובים</div>
                         </div>
                     </div>
@@ -184,8 +255,12 @@ class EmailSender:
         if new_flights:
             html += self.create_flights_html(new_flights, "🆕 טיסות רגע אחרון שנוספו")
         
+        # הוספת ירידות מחיר
+        if price_changes:
+            html += self.create_price_changes_html(price_changes, "📉 ירידות מחיר")
+        
         # אם אין עדכונים
-        if not new_flights:
+        if not new_flights and not price_changes:
             html += """
                     <div style="
                         text-align: center; 
@@ -231,37 +306,54 @@ class EmailSender:
         
         return html
     
-    def send_update_email(self, new_flights: List[Dict], price_changes: List[Dict], stats: Dict) -> bool:
-        """שליחת מייל עדכון - מותאם לטיסות רגע אחרון"""
+    def configuration_error(self):
+        """תיאור הבעיה אם אי אפשר לשלוח מיילים בכלל (לא כדאי לנסות שוב), או None"""
         if not self.mailing_list:
-            logging.warning("רשימת תפוצה ריקה")
-            return False
-        
+            return "רשימת תפוצה ריקה"
         if not self.username or not self.password:
-            logging.error("נתוני מייל לא הוגדרו")
+            return "נתוני מייל לא הוגדרו"
+        return None
+    
+    def send_update_email(self, new_flights: List[Flight], price_changes: List[Dict], stats: Dict,
+                          message_id: str = None) -> bool:
+        """שליחת מייל עדכון - מותאם לטיסות רגע אחרון (message_id קבוע מאפשר לזהות שליחה חוזרת)"""
+        error = self.configuration_error()
+        if error:
+            logging.error(error)
             return False
         
         try:
             # קביעת נושא המייל - התמקדות בטיסות חדשות
             if new_flights:
                 if len(new_flights) == 1:
-                    dest = new_flights[0].get('destination', 'יעד לא ידוע')
+                    dest = new_flights[0].destination or 'יעד לא ידוע'
                     subject = f"🆕 טיסת רגע אחרון חדשה ל{dest}!"
                 else:
                     subject = f"🆕 {len(new_flights)} טיסות רגע אחרון חדשות!"
+                if price_changes:
+                    subject += f" (+{len(price_changes)} ירידות מחיר)"
+            elif price_changes:
+                if len(price_changes) == 1:
+                    change = price_changes[0]
+                    subject = f"📉 ירידת מחיר ל{change['destination']}: {change['old_price']}₪ ← {change['new_price']}₪"
+                else:
+                    subject = f"📉 {len(price_changes)} ירידות מחיר בטיסות רגע אחרון!"
             else:
-                # אם אין טיסות חדשות, לא שולחים מייל
-                logging.info("אין טיסות חדשות לשליחה")
+                # אם אין טיסות חדשות או ירידות מחיר, לא שולחים מייל
+                logging.info("אין טיסות חדשות או ירידות מחיר לשליחה")
                 return True
             
             # יצירת HTML
-            html_content = self.create_email_html(new_flights, price_changes, stats)
+            with tracing.span('email.render'):
+                html_content = self.create_email_html(new_flights, price_changes, stats)
             
             # הגדרת המייל
             msg = MIMEMultipart('alternative')
             msg['Subject'] = subject
             msg['From'] = self.username
             msg['To'] = ', '.join(self.mailing_list)
+            if message_id:
+                msg['Message-ID'] = message_id
             
             # הוספת תוכן HTML
             html_part = MIMEText(html_content, 'html', 'utf-8')
@@ -269,7 +361,8 @@ class EmailSender:
             
             # שליחת המייל
             context = ssl.create_default_context()
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
+            with tracing.span('email.smtp'), smtplib.SMTP(self.smtp_server, self.smtp_port,
+                                                                 timeout=SMTP_TIMEOUT_SECONDS) as server:
                 server.starttls(context=context)
                 server.login(self.username, self.password)
                 server.send_message(msg)
@@ -284,20 +377,20 @@ class EmailSender:
     def test_email(self) -> bool:
         """שליחת מייל בדיקה - מותאם לטיסות רגע אחרון"""
         test_flights = [
-            {
-                'destination': 'ברלין',
-                'price': 'מחיר קבוע',
-                'dates': ['15/08/2024', '16/08/2024'],
-                'full_text': 'טיסת רגע אחרון לברלין! מקומות אחרונים זמינים לימים הקרובים.',
-                'scraped_at': datetime.now().isoformat()
-            },
-            {
-                'destination': 'פריז',
-                'price': 'מחיר קבוע',
-                'dates': ['17/08/2024'],
-                'full_text': 'הזדמנות אחרונה לטיסה לפריז! יציאה מחר.',
-                'scraped_at': datetime.now().isoformat()
-            }
+            Flight(
+                'ברלין',
+                'מחיר קבוע',
+                ['15/08/2024', '16/08/2024'],
+                'טיסת רגע אחרון לברלין! מקומות אחרונים זמינים לימים הקרובים.',
+                datetime.now().isoformat()
+            ),
+            Flight(
+                'פריז',
+                'מחיר קבוע',
+                ['17/08/2024'],
+                'הזדמנות אחרונה לטיסה לפריז! יציאה מחר.',
+                datetime.now().isoformat()
+            )
         ]
         
         test_stats = {
@@ -0,0 +1,85 @@
+import logging
+from flight_identity import normalize_text
+from config import DEDUP_SIMILARITY_THRESHOLD, DEDUP_SHINGLE_SIZE
+
+def shingles(text, size=DEDUP_SHINGLE_SIZE):
+    """קבוצת רצפי התווים (shingles) של הטקסט המנורמל"""
+    text = normalize_text(text)
+    if len(text) <= size:
+        return {text}
+    return {text[i:i + size] for i in range(len(text) - size + 1)}
+
+def jaccard(a, b):
+    """דמיון Jaccard בין שתי קבוצות"""
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def collapse_contained(flights, containers):
+    """השארת הרשומה הספציפית ביותר כשכרטיסים מקוננים זה בזה.
+
+    containers[i] הוא האינדקס של הכרטיס העוטף הקרוב של כרטיס i (או -1). כרטיס שאחד
+    מצאצאיו הניב טיסה הוא מיכל - הטקסט שלו מערבב כמה כרטיסים, ולכן הוא נזרק.
+    """
+    wrappers = set()
+    for index, flight in enumerate(flights):
+        if flight is None:
+            continue
+        parent = containers[index]
+        while 0 <= parent < len(flights) and parent not in wrappers:
+            wrappers.add(parent)
+            parent = containers[parent]
+    return [flight for index, flight in enumerate(flights) if flight is not None and index not in wrappers]
+
+class NearDuplicateIndex:
+    """טיסות שכבר נראו, לפי יעד ומחיר, לזיהוי כרטיסים כמעט זהים (טקסט שונה מעט, אותו דיל).
+
+    ההשוואה היא Jaccard מדויק על shingles רק בתוך אותו דלי - הדליים קטנים, כך שאין צורך בקירוב.
+    """
+    def __init__(self, threshold=DEDUP_SIMILARITY_THRESHOLD):
+        self.threshold = threshold
+        self.buckets = {}
+        self.dropped = 0
+
+    def __len__(self):
+        return sum(len(bucket) for bucket in self.buckets.values())
+
+    def find(self, flight):
+        """הטיסה הכמעט-זהה שכבר נמצאת באינדקס, או None"""
+        bucket = self.buckets.get((flight.destination, flight.price))
+        if not bucket:
+            return None
+        text_shingles = shingles(flight.full_text)
+        for other_shingles, other in bucket:
+            if jaccard(text_shingles, other_shingles) >= self.threshold:
+                return other
+        return None
+
+    def add(self, flight):
+        self.buckets.setdefault((flight.destination, flight.price), []).append((shingles(flight.full_text), flight))
+
+    def iter_unique(self, flights):
+        """הטיסות בלי כפילויות כמעט-זהות; מכל קבוצה נשמרת הרשומה הספציפית ביותר (הטקסט המנורמל
+        הקצר ביותר - המיכל החיצוני מכיל גם את הטקסט של אחיו).
+
+        כרטיס ספציפי יותר יכול להגיע אחרי שהקבוצה כבר נראתה, ולכן הקבוצות נאספות עד סוף הזרם
+        ורק אז יוצאות, בסדר ההופעה הראשונה - רשומה שיצאה לא משתנה אחרי שהניטור בדק אותה.
+        """
+        groups = []
+        best = {}
+        for flight in flights:
+            first = self.find(flight)
+            if first is None:
+                self.add(flight)
+                groups.append(flight)
+                best[id(flight)] = flight
+                continue
+            self.dropped += 1
+            # הכרטיס מצטרף לקבוצה גם לצורך ההשוואה לכרטיסים הבאים
+            self.buckets[(flight.destination, flight.price)].append((shingles(flight.full_text), first))
+            if len(normalize_text(flight.full_text)) < len(normalize_text(best[id(first)].full_text)):
+                best[id(first)] = flight
+        for first in groups:
+            yield best[id(first)]
+        if self.dropped:
+            logging.info(f"אוחדו {self.dropped} כרטיסים כמעט זהים")
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+מנוע חילוץ משותף ליעדים, מחירים ותאריכים - כל התבניות מקומפלות פעם אחת בטעינת המודול
+"""
+
+import re
+from collections import namedtuple
+from config import PREFERRED_DESTINATIONS
+
+# מילות מפתח נוספות לערים (נבדקות אחרי היעדים המועדפים)
+FALLBACK_CITY_KEYWORDS = ['ברלין', 'פריז', 'לונדון', 'רומא', 'מדריד', 'אמסטרדם', 'פראג', 'ויאנה', 'ברצלונה', 'מילאנו', 'ניס', 'ליסבון']
+
+# עדיפות יעד = מיקומו ברשימה; היעד הראשון ברשימה שמופיע בטקסט הוא שנבחר
+DESTINATION_PRIORITY = {}
+for _dest in PREFERRED_DESTINATIONS + FALLBACK_CITY_KEYWORDS:
+    DESTINATION_PRIORITY.setdefault(_dest, len(DESTINATION_PRIORITY))
+
+# ביטוי אחד לכל היעדים - הארוכים קודם כדי ש"ניו יורק" לא ייחתך
+DESTINATION_ALTERNATION = '|'.join(re.escape(d) for d in sorted(DESTINATION_PRIORITY, key=len, reverse=True))
+DESTINATION_PATTERN = re.compile(DESTINATION_ALTERNATION)
+
+HEBREW_MONTHS = 'ינואר|פברואר|מרץ|אפריל|מאי|יוני|יולי|אוגוסט|ספטמבר|אוקטובר|נובמבר|דצמבר'
+
+# תבניות מחיר לפי סדר עדיפות - התבנית הראשונה שמתאימה קובעת
+PRICE_PATTERNS = [re.compile(p) for p in (
+    r'(\d{1,4})\s*₪',
+    r'(\d{1,4})\s*שח',
+    r'₪\s*(\d{1,4})',
+    r'שח\s*(\d{1,4})',
+    r'(\d{1,4})\s*שקל',
+    r'מ\s*(\d{1,4})',
+    r'החל\s*מ\s*(\d{1,4})'
+)]
+# תבניות מחיר מחמירות (עם סימן מטבע בלבד)
+STRICT_PRICE_PATTERNS = PRICE_PATTERNS[:4]
+
+# תבניות תאריך
+NUMERIC_DATE_PATTERN = re.compile(r'(\d{1,2}[./]\d{1,2}[./]\d{2,4})')
+HEBREW_DAY_DATE_PATTERN = re.compile(r'(\d{1,2}\s*[בב]\w+\s*\d{4})')
+MONTH_NAME_PATTERN = re.compile(f'({HEBREW_MONTHS})')
+DATE_PATTERNS = [NUMERIC_DATE_PATTERN, HEBREW_DAY_DATE_PATTERN, MONTH_NAME_PATTERN]
+SIMPLE_DATE_PATTERNS = [NUMERIC_DATE_PATTERN, MONTH_NAME_PATTERN]
+
+# אסימוני מחיר (עם סימן מטבע) ותאריך לסריקה בתוך מקטעי טקסט
+PRICE_TOKEN_PATTERN = re.compile(r'(\d{1,4})\s*(?:₪|שח)')
+DATE_TOKEN_PATTERN = re.compile(r'\d{1,2}[./]\d{1,2}[./]\d{2,4}|' + HEBREW_MONTHS)
+
+# שדות מדף הפרטים של דיל: תאריך יציאה, תאריך חזרה ומקומות פנויים
+DEPARTURE_DATE_PATTERN = re.compile(r'(?:יציאה|המראה|הלוך)[^\d]{0,20}(\d{1,2}[./]\d{1,2}[./]\d{2,4})')
+RETURN_DATE_PATTERN = re.compile(r'(?:חזרה|חזור)[^\d]{0,20}(\d{1,2}[./]\d{1,2}[./]\d{2,4})')
+SEATS_PATTERN = re.compile(r'(?:נותרו|נשארו)\s*(\d{1,3})|(\d{1,3})\s*(?:מקומות|מושבים|כרטיסים)')
+
+ExtractedFlight = namedtuple('ExtractedFlight', ['destination', 'price', 'dates', 'start', 'end'])
+
+def find_destination(text):
+    """היעד בעל העדיפות הגבוהה ביותר שמופיע בטקסט"""
+    found = set(DESTINATION_PATTERN.findall(text))
+    if not found:
+        return None
+    return min(found, key=DESTINATION_PRIORITY.__getitem__)
+
+def find_price(text, patterns=PRICE_PATTERNS, price_range=None):
+    """המחיר הראשון לפי סדר התבניות; עם price_range מדלגים על מחירים מחוץ לטווח"""
+    for pattern in patterns:
+        match = pattern.search(text)
+        if not match:
+            continue
+        price = int(match.group(1))
+        if price_range and not price_range[0] <= price <= price_range[1]:
+            continue
+        return price
+    return None
+
+def find_dates(text, patterns=DATE_PATTERNS):
+    """כל התאריכים בטקסט, לפי סדר התבניות"""
+    dates = []
+    for pattern in patterns:
+        dates.extend(pattern.findall(text))
+    return dates
+
+def extract_flight_tuples(text, price_range=(100, 3000)):
+    """חילוץ כל צירופי (יעד, מחיר, תאריכים) במעבר לינארי על הטקסט.
+
+    הטקסט מחולק למקטעים לפי מופעי היעדים, וכל מקטע נסרק פעם אחת למחיר ולתאריכים.
+    כל יעד מקבל את המחיר הראשון בטווח שמופיע אחריו; יעדים רצופים ללא מחיר ביניהם
+    חולקים את אותו מחיר, והתאריכים עד היעד הבא מצורפים לקבוצה.
+    """
+    flights = []
+    dest_matches = list(DESTINATION_PATTERN.finditer(text))
+    pending = []
+
+    for index, dest_match in enumerate(dest_matches):
+        pending.append(dest_match)
+        segment_start = dest_match.end()
+        segment_end = dest_matches[index + 1].start() if index + 1 < len(dest_matches) else len(text)
+
+        price_match = None
+        for candidate in PRICE_TOKEN_PATTERN.finditer(text, segment_start, segment_end):
+            if price_range[0] <= int(candidate.group(1)) <= price_range[1]:
+                price_match = candidate
+                break
+        if not price_match:
+            continue
+
+        dates = DATE_TOKEN_PATTERN.findall(text, pending[0].end(), segment_end)
+        price = int(price_match.group(1))
+        for match in pending:
+            flights.append(ExtractedFlight(match.group(), price, dates, match.start(), price_match.end()))
+        pending = []
+
+    return flights
+
+def find_detail_fields(text):
+    """תאריכי יציאה וחזרה ומספר מקומות מטקסט דף הפרטים; שדה שלא נמצא לא מוחזר"""
+    fields = {}
+    departure = DEPARTURE_DATE_PATTERN.search(text)
+    return_date = RETURN_DATE_PATTERN.search(text)
+    # בלי תוויות - התאריך המספרי הראשון הוא היציאה והשני החזרה
+    numeric_dates = NUMERIC_DATE_PATTERN.findall(text)
+    if departure:
+        fields['departure_date'] = departure.group(1)
+    elif numeric_dates:
+        fields['departure_date'] = numeric_dates[0]
+    if return_date:
+        fields['return_date'] = return_date.group(1)
+    elif len(numeric_dates) > 1 and numeric_dates[1] != fields.get('departure_date'):
+        fields['return_date'] = numeric_dates[1]
+    seats = SEATS_PATTERN.search(text)
+    if seats:
+        fields['seats'] = int(seats.group(1) or seats.group(2))
+    return fields
@@ -0,0 +1,127 @@
+import os
+import re
+import json
+import hashlib
+import logging
+import unicodedata
+from config import SIGNATURE_INDEX_FILE, DATA_FILE
+
+# תווים שמשתנים בין סריקות של אותו כרטיס ואינם חלק מהתוכן (מפרידים, סימני כיווניות)
+NOISE_PATTERN = re.compile(r'[\u200e\u200f\u202a-\u202e|•·,:;]+')
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+def normalize_text(text):
+    """נרמול טקסט לחתימה - צורה יוניקוד אחידה, ללא רעש ורווחים כפולים"""
+    text = unicodedata.normalize('NFKC', text or '')
+    text = NOISE_PATTERN.sub(' ', text)
+    return WHITESPACE_PATTERN.sub(' ', text).strip().lower()
+
+def flight_signature(flight):
+    """חתימה דטרמיניסטית לטיסה - זהה בין הרצות ובין תהליכים (בניגוד ל-hash() של Python)"""
+    dates = flight.get('dates') or []
+    parts = [
+        normalize_text(flight.get('destination', '')),
+        '_'.join(sorted(normalize_text(d) for d in dates)) if dates else 'no_dates',
+        normalize_text(flight.get('full_text', ''))
+    ]
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+def has_price_identity(flight):
+    """לטיסה בלי תאריכים ובלי קישור אין מפתח יציב - המפתח היה היעד בלבד, משותף לכל הדילים אליו"""
+    return bool(flight.get('dates') or flight.get('link'))
+
+def price_identity(flight):
+    """מפתח יציב למעקב מחירים - יעד, תאריכים וקישור הדיל, בלי המחיר ובלי הטקסט שמכיל אותו"""
+    dates = flight.get('dates') or []
+    parts = [
+        normalize_text(flight.get('destination', '')),
+        '_'.join(sorted(normalize_text(d) for d in dates)) if dates else 'no_dates',
+        flight.get('link') or ''
+    ]
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+class SignatureIndex:
+    """אינדקס חתימות של הטיסות מהבדיקה האחרונה, נשמר לדיסק כיומן הוספות/הסרות.
+
+    כל עדכון מוסיף לסוף הקובץ רק את ההפרשים ("+חתימה" / "-חתימה"), והטעינה משחזרת
+    את הסט מהיומן. כשהיומן ארוך בהרבה מהסט הוא נדחס לקובץ חדש.
+    """
+    def __init__(self, path=SIGNATURE_INDEX_FILE):
+        self.path = path
+        self.signatures = set()
+        self.log_lines = 0
+        self.load()
+
+    def __contains__(self, signature):
+        return signature in self.signatures
+
+    def __len__(self):
+        return len(self.signatures)
+
+    def load(self):
+        """שחזור הסט מהיומן"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    line = line.strip()
+                    if not line:
+                        continue
+                    self.log_lines += 1
+                    if line[0] == '+':
+                        self.signatures.add(line[1:])
+                    elif line[0] == '-':
+                        self.signatures.discard(line[1:])
+            logging.info(f"נטען אינדקס חתימות: {len(self.signatures)} טיסות")
+        except Exception as e:
+            logging.error(f"שגיאה בטעינת אינדקס החתימות: {e}")
+
+    def replace(self, signatures):
+        """החלפת הסט בחתימות הבדיקה הנוכחית - רק ההפרשים נכתבים ליומן"""
+        signatures = set(signatures)
+        added = signatures - self.signatures
+        removed = self.signatures - signatures
+        self.signatures = signatures
+        if not added and not removed:
+            return
+        try:
+            with open(self.path, 'a', encoding='utf-8') as f:
+                f.writelines(f"+{s}\n" for s in added)
+                f.writelines(f"-{s}\n" for s in removed)
+            self.log_lines += len(added) + len(removed)
+        except Exception as e:
+            logging.error(f"שגיאה בעדכון אינדקס החתימות: {e}")
+            return
+        if self.log_lines > 4 * len(self.signatures) + 1000:
+            self.compact()
+
+    def compact(self):
+        """כתיבת היומן מחדש כרשימת הוספות בלבד, בהחלפה אטומית"""
+        temp_path = f"{self.path}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                f.writelines(f"+{s}\n" for s in sorted(self.signatures))
+            os.replace(temp_path, self.path)
+            self.log_lines = len(self.signatures)
+        except Exception as e:
+            logging.error(f"שגיאה בדחיסת אינדקס החתימות: {e}")
+
+    def migrate_from_data_file(self, data_file=DATA_FILE):
+        """יצירת האינדקס מקובץ הנתונים הקיים, בהרצה הראשונה אחרי השדרוג.
+
+        החתימות הישנות תלויות ב-hash() של התהליך שיצר אותן ולא ניתנות לשחזור,
+        ולכן הן מחושבות מחדש מהטיסות השמורות בשיטה הדטרמיניסטית.
+        """
+        if os.path.exists(self.path) or not os.path.exists(data_file):
+            return False
+        try:
+            with open(data_file, 'r', encoding='utf-8') as f:
+                flights = json.load(f).get('flights', [])
+        except Exception as e:
+            logging.error(f"שגיאה בהמרת {data_file} לאינדקס חתימות: {e}")
+            return False
+        self.signatures = {flight_signature(flight) for flight in flights}
+        self.compact()
+        logging.info(f"אינדקס החתימות נוצר מ-{data_file}: {len(self.signatures)} טיסות")
+        return True
@@ -0,0 +1,129 @@
+import re
+import sys
+from datetime import date, timedelta
+from functools import lru_cache
+from flight_extraction import HEBREW_MONTHS
+
+HEBREW_MONTH_NUMBERS = {name: number for number, name in enumerate(HEBREW_MONTHS.split('|'), 1)}
+
+# "12/11/2026", "12.11.26", "12-11-2026"
+NUMERIC_DATE_PATTERN = re.compile(r'^(\d{1,2})[./-](\d{1,2})[./-](\d{4}|\d{2})$')
+# "12 בנובמבר 2026", "12 נובמבר", "נובמבר"
+HEBREW_DATE_PATTERN = re.compile(rf'^(?:(\d{{1,2}})\s*-?ב?-?\s*)?({HEBREW_MONTHS})(?:\s*(\d{{4}}))?$')
+
+def month_end(year, month):
+    """היום האחרון בחודש"""
+    return (date(year + month // 12, month % 12 + 1, 1) - timedelta(days=1))
+
+@lru_cache(maxsize=4096)
+def cached_date_range(text, today):
+    """פרסור טקסט תאריך לטווח (התחלה, סוף), עם מטמון - כל מחרוזת מפוענחת פעם אחת ביום"""
+    text = text.strip()
+    try:
+        match = NUMERIC_DATE_PATTERN.match(text)
+        if match:
+            day, month, year = (int(g) for g in match.groups())
+            if year < 100:
+                year += 2000
+            parsed = date(year, month, day)
+            return parsed, parsed
+
+        match = HEBREW_DATE_PATTERN.match(text)
+        if match:
+            day, month, year = match.group(1), HEBREW_MONTH_NUMBERS[match.group(2)], match.group(3)
+            # בלי שנה - החודש הקרוב (חודש שעבר לפני יותר מחודש שייך לשנה הבאה)
+            year = int(year) if year else today.year
+            if not match.group(3) and month_end(year, month) < today - timedelta(days=31):
+                year += 1
+            if day:
+                parsed = date(year, month, int(day))
+                return parsed, parsed
+            # שם חודש בלבד - כל החודש
+            return date(year, month, 1), month_end(year, month)
+    except ValueError:
+        # תאריך לא קיים (31/02)
+        return None
+    return None
+
+def parse_date_range(text):
+    """טווח התאריכים שהטקסט מתאר, או None"""
+    return cached_date_range(text, date.today()) if text else None
+
+def parse_flight_date(text):
+    """תאריך מדויק מטקסט (פורמט מספרי או יום וחודש עברי), או None"""
+    date_range = parse_date_range(text)
+    if date_range and date_range[0] == date_range[1]:
+        return date_range[0]
+    return None
+
+class Flight:
+    """רשומת טיסה אחת לאורך כל הצינור - מהסריקה, דרך הניטור ועד המייל.
+
+    התאריכים מפוענחים פעם אחת ביצירה (date_ranges), ושם היעד עובר intern כי
+    אותם יעדים חוזרים באלפי רשומות. get ו-[] נשמרו לתאימות עם קוד שעבד עם מילונים.
+    """
+    __slots__ = ('destination', 'price', 'dates', 'full_text', 'scraped_at', 'url', 'method', 'link',
+                 'departure_date', 'return_date', 'seats', 'detected_at', 'date_ranges')
+    FIELDS = __slots__[:-1]
+    OPTIONAL_FIELDS = ('method', 'link', 'departure_date', 'return_date', 'seats', 'detected_at')
+
+    def __init__(self, destination, price, dates=None, full_text='', scraped_at=None, url=None, method=None,
+                 link=None, departure_date=None, return_date=None, seats=None, detected_at=None):
+        self.destination = sys.intern(destination) if destination else destination
+        self.price = price
+        self.dates = tuple(dates or ())
+        self.full_text = full_text or ''
+        self.scraped_at = scraped_at
+        self.url = url
+        self.method = method
+        self.link = link
+        self.departure_date = departure_date
+        self.return_date = return_date
+        self.seats = seats
+        self.detected_at = detected_at
+        self.date_ranges = tuple(r for r in map(parse_date_range, self.dates) if r)
+
+    @classmethod
+    def from_dict(cls, data):
+        """בנייה מהפורמט השמור (מילון)"""
+        return cls(**{field: data[field] for field in cls.FIELDS if field in data})
+
+    @classmethod
+    def coerce(cls, flight):
+        """Flight כמו שהוא, או בנייה ממילון"""
+        return flight if isinstance(flight, cls) else cls.from_dict(flight)
+
+    def to_dict(self):
+        """הפורמט השמור - שדות אופציונליים נכתבים רק כשיש להם ערך"""
+        data = {
+            'destination': self.destination,
+            'price': self.price,
+            'dates': list(self.dates),
+            'full_text': self.full_text,
+            'scraped_at': self.scraped_at,
+            'url': self.url
+        }
+        for field in self.OPTIONAL_FIELDS:
+            value = getattr(self, field)
+            if value is not None:
+                data[field] = value
+        return data
+
+    def update(self, fields):
+        """עדכון שדות (למשל מדף הפרטים); שדות לא מוכרים נדחים"""
+        for field, value in fields.items():
+            if field not in self.FIELDS or field == 'dates':
+                raise KeyError(field)
+            setattr(self, field, value)
+
+    def get(self, field, default=None):
+        value = getattr(self, field, None) if field in self.FIELDS else None
+        return default if value is None else value
+
+    def __getitem__(self, field):
+        if field not in self.FIELDS:
+            raise KeyError(field)
+        return getattr(self, field)
+
+    def __repr__(self):
+        return f"Flight({self.destination!r}, {self.price!r}, dates={list(self.dates)!r})"
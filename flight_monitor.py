@@ -1,35 +1,56 @@
 import json
 import os
+import time
+import sqlite3
 import logging
-from datetime import datetime, timedelta
-from typing import List, Dict, Set
-from flight_scraper import FlightScraper
-from simple_scraper import SimpleFlightScraper
-from config import DATA_FILE, FOCUS_ON_NEW_FLIGHTS_ONLY, IGNORE_PRICE_CHANGES, MAX_FLIGHT_AGE_HOURS
+import threading
+from datetime import datetime, date, timedelta
+from typing import List, Dict, Tuple
+from scrape_orchestrator import ScrapeOrchestrator
+from detail_crawler import DetailCrawler
+from flight_identity import SignatureIndex, flight_signature, price_identity, has_price_identity
+from flight_model import Flight, parse_flight_date, parse_date_range
+from price_history import PriceHistory
+from flight_dedup import NearDuplicateIndex
+import tracing
+from config import (
+    DATA_FILE, FOCUS_ON_NEW_FLIGHTS_ONLY, IGNORE_PRICE_CHANGES, MAX_FLIGHT_AGE_HOURS, DETAIL_CRAWL_ENABLED,
+    STORAGE_BACKEND, SQLITE_DB_FILE, STORAGE_RETENTION_DAYS, JOURNAL_FILE, SNAPSHOT_FILE, JOURNAL_COMPACT_EVERY
+)
 
-class FlightMonitor:
-    def __init__(self):
-        self.data_file = DATA_FILE
-        self.previous_flights = self.load_previous_flights()
-        
-    def load_previous_flights(self) -> Dict:
+def stable_flight_json(flight: Dict) -> str:
+    """ייצוג הטיסה לשמירה - בלי חותמות הזמן של המחזור, כדי שטיסה שלא השתנתה לא תיכתב שוב"""
+    return json.dumps({k: v for k, v in flight.items() if k not in ('scraped_at', 'detected_at')},
+                      ensure_ascii=False, sort_keys=True)
+
+class JsonFlightStore:
+    """אחסון בקובץ JSON אחד - תמונת המצב האחרונה נכתבת מחדש בכל בדיקה"""
+    def __init__(self, data_file=DATA_FILE):
+        self.data_file = data_file
+
+    def load(self) -> Dict:
         """טעינת נתוני טיסות קודמים מקובץ"""
         if os.path.exists(self.data_file):
             try:
                 with open(self.data_file, 'r', encoding='utf-8') as f:
                     data = json.load(f)
-                    logging.info(f"נטענו נתוני {len(data.get('flights', []))} טיסות קודמות")
+                    data['flights'] = [Flight.from_dict(flight) for flight in data.get('flights', [])]
+                    logging.info(f"נטענו נתוני {len(data['flights'])} טיסות קודמות")
                     return data
             except Exception as e:
                 logging.error(f"שגיאה בטעינת נתונים קודמים: {e}")
         
         return {'flights': [], 'last_check': None}
-    
-    def save_flights_data(self, flights: List[Dict], new_flights: List[Dict]):
+
+    def arrival_times(self) -> List[str]:
+        """הקובץ שומר רק את הבדיקה האחרונה - אין היסטוריית הופעות"""
+        return []
+
+    def save(self, flights: List[Flight], new_flights: List[Flight], timings: Dict = None):
         """שמירת נתוני טיסות לקובץ"""
         data = {
-            'flights': flights,
-            'new_flights': new_flights,
+            'flights': [flight.to_dict() for flight in flights],
+            'new_flights': [flight.to_dict() for flight in new_flights],
             'last_check': datetime.now().isoformat(),
             'total_flights_found': len(flights),
             'new_flights_count': len(new_flights)
@@ -41,149 +62,596 @@ class FlightMonitor:
             logging.info(f"נשמרו נתוני {len(flights)} טיסות לקובץ")
         except Exception as e:
             logging.error(f"שגיאה בשמירת נתונים: {e}")
+
+    def close(self):
+        """אין משאבים פתוחים בין שמירות"""
+        pass
+
+class SQLiteFlightStore:
+    """אחסון ב-SQLite (מצב WAL) - בכל בדיקה נכתבות רק הטיסות שהשתנו, בטרנזקציה אחת.
+
+    טיסה פעילה היא טיסה שהופיעה בבדיקה האחרונה; last_seen שלה נקבע רק כשהיא נעלמת,
+    כך שטיסה שממשיכה להופיע לא נכתבת שוב בכל מחזור.
+    """
+    SCHEMA = '''
+        CREATE TABLE IF NOT EXISTS flights (
+            signature TEXT PRIMARY KEY,
+            destination TEXT,
+            price INTEGER,
+            dates TEXT,
+            data TEXT NOT NULL
+        );
+        CREATE INDEX IF NOT EXISTS idx_flights_destination ON flights(destination);
+        CREATE TABLE IF NOT EXISTS observations (
+            signature TEXT PRIMARY KEY REFERENCES flights(signature) ON DELETE CASCADE,
+            first_seen TEXT NOT NULL,
+            last_seen TEXT,
+            active INTEGER NOT NULL DEFAULT 1
+        );
+        CREATE INDEX IF NOT EXISTS idx_observations_active ON observations(active);
+        CREATE INDEX IF NOT EXISTS idx_observations_last_seen ON observations(last_seen);
+        CREATE TABLE IF NOT EXISTS check_runs (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            checked_at TEXT NOT NULL,
+            total_flights INTEGER NOT NULL,
+            new_flights INTEGER NOT NULL,
+            changed_flights INTEGER NOT NULL,
+            tier TEXT,
+            total_seconds REAL
+        );
+        CREATE INDEX IF NOT EXISTS idx_check_runs_checked_at ON check_runs(checked_at);
+    '''
+
+    def __init__(self, db_file=SQLITE_DB_FILE, retention_days=STORAGE_RETENTION_DAYS, data_file=DATA_FILE):
+        self.db_file = db_file
+        self.retention_days = retention_days
+        # הבדיקות רצות ב-thread של המתזמן - חיבור אחד משותף לכל ה-threads, מוגן בנעילה
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute('PRAGMA foreign_keys=ON')
+        self.conn.executescript(self.SCHEMA)
+        # הטיסות הפעילות בזיכרון (חתימה -> JSON) לזיהוי שינויים בלי לקרוא את הטבלה
+        self.active = dict(self.read_active())
+        self.import_json(data_file)
+
+    def read_active(self):
+        """שורות (חתימה, JSON) של הטיסות הפעילות, לפי סדר ההופעה הראשונה"""
+        return self.conn.execute(
+            'SELECT f.signature, f.data FROM flights f JOIN observations o ON o.signature = f.signature '
+            'WHERE o.active = 1 ORDER BY o.first_seen'
+        ).fetchall()
+
+    def load(self) -> Dict:
+        """הטיסות הפעילות וזמן הבדיקה האחרונה"""
+        try:
+            with self.lock:
+                rows = self.read_active()
+                last_run = self.conn.execute('SELECT checked_at FROM check_runs ORDER BY id DESC LIMIT 1').fetchone()
+        except Exception as e:
+            logging.error(f"שגיאה בטעינת נתונים קודמים: {e}")
+            return {'flights': [], 'last_check': None}
+        self.active = {signature: data for signature, data in rows}
+        logging.info(f"נטענו נתוני {len(rows)} טיסות קודמות")
+        return {'flights': [Flight.from_dict(json.loads(data)) for _, data in rows],
+                'last_check': last_run[0] if last_run else None}
+
+    def arrival_times(self) -> List[str]:
+        """זמני ההופעה הראשונה של טיסות, בלי הבדיקה הראשונה (ייבוא או הרצה ראשונה - הכל נראה בה חדש)"""
+        try:
+            with self.lock:
+                return [row[0] for row in self.conn.execute(
+                    'SELECT first_seen FROM observations WHERE first_seen > (SELECT MIN(checked_at) FROM check_runs)')]
+        except Exception as e:
+            logging.error(f"שגיאה בקריאת זמני ההופעה: {e}")
+            return []
+
+    def import_json(self, data_file):
+        """ייבוא קובץ ה-JSON הקיים למסד ריק, בהרצה הראשונה אחרי המעבר ל-SQLite"""
+        if not data_file or not os.path.exists(data_file):
+            return
+        if self.conn.execute('SELECT 1 FROM check_runs LIMIT 1').fetchone():
+            return
+        try:
+            with open(data_file, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception as e:
+            logging.error(f"שגיאה בייבוא {data_file}: {e}")
+            return
+        checked_at = data.get('last_check') or datetime.now().isoformat()
+        self.write_cycle(data.get('flights', []), [], checked_at, {'tier': 'import'})
+        logging.info(f"יובאו {len(data.get('flights', []))} טיסות מ-{data_file} ל-{self.db_file}")
+
+    def save(self, flights: List[Flight], new_flights: List[Flight], timings: Dict = None):
+        """שמירת תוצאות הבדיקה - רק טיסות חדשות, שהשתנו או שנעלמו נכתבות"""
+        try:
+            flights = [flight.to_dict() for flight in flights]
+            changed = self.write_cycle(flights, new_flights, datetime.now().isoformat(), timings or {})
+            logging.info(f"נשמרו נתוני {len(flights)} טיסות ({changed} שינויים) ל-{self.db_file}")
+        except Exception as e:
+            logging.error(f"שגיאה בשמירת נתונים: {e}")
+
+    def write_cycle(self, flights, new_flights, checked_at, timings):
+        """כתיבת מחזור אחד בטרנזקציה אחת; מחזיר את מספר השורות שהשתנו"""
+        with self.lock:
+            return self.write_cycle_locked(flights, new_flights, checked_at, timings)
+
+    def write_cycle_locked(self, flights, new_flights, checked_at, timings):
+        current = {}
+        for flight in flights:
+            current.setdefault(flight_signature(flight), flight)
+
+        changed = {}
+        for signature, flight in current.items():
+            data = stable_flight_json(flight)
+            if self.active.get(signature) != data:
+                changed[signature] = data
+        upserts = [(current[s].get('destination'), current[s].get('price'),
+                    json.dumps(current[s].get('dates') or [], ensure_ascii=False), data, s)
+                   for s, data in changed.items()]
+        appeared = [s for s in current if s not in self.active]
+        disappeared = [s for s in self.active if s not in current]
+        cutoff = (datetime.now() - timedelta(days=self.retention_days)).isoformat()
+
+        with self.conn:
+            # upsert כ-UPDATE ואז INSERT OR IGNORE (ON CONFLICT דורש SQLite 3.24)
+            self.conn.executemany(
+                'UPDATE flights SET destination = ?, price = ?, dates = ?, data = ? WHERE signature = ?', upserts)
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO flights (destination, price, dates, data, signature) VALUES (?, ?, ?, ?, ?)',
+                upserts)
+            self.conn.executemany(
+                'UPDATE observations SET active = 1, last_seen = NULL WHERE signature = ?',
+                [(s,) for s in appeared])
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO observations (signature, first_seen, active) VALUES (?, ?, 1)',
+                [(s, checked_at) for s in appeared])
+            self.conn.executemany(
+                'UPDATE observations SET active = 0, last_seen = ? WHERE signature = ?',
+                [(checked_at, s) for s in disappeared])
+            self.conn.execute(
+                'INSERT INTO check_runs (checked_at, total_flights, new_flights, changed_flights, tier, total_seconds) '
+                'VALUES (?, ?, ?, ?, ?, ?)',
+                (checked_at, len(current), len(new_flights), len(upserts) + len(disappeared),
+                 timings.get('tier'), timings.get('total_seconds')))
+
+            # מדיניות שמירה - טיסות שנעלמו והרצות ישנות נמחקות
+            if self.retention_days > 0:
+                self.conn.execute('DELETE FROM flights WHERE signature IN (SELECT signature FROM observations '
+                                  'WHERE active = 0 AND last_seen < ?)', (cutoff,))
+                self.conn.execute('DELETE FROM check_runs WHERE checked_at < ?', (cutoff,))
+
+        self.active.update(changed)
+        for signature in disappeared:
+            del self.active[signature]
+        return len(upserts) + len(disappeared)
+
+    def close(self):
+        """סגירת החיבור למסד"""
+        with self.lock:
+            self.conn.close()
+
+class JournalFlightStore:
+    """אחסון ביומן JSON-lines שרק מוסיפים לו - שורה קצרה אחת לכל בדיקה, עם fsync.
+
+    הדחיסה מקפלת את היומן לתמונת מצב ברקע: היומן הנוכחי מועבר הצידה ומתחיל יומן חדש,
+    ותמונת המצב נכתבת לקובץ זמני ומוחלפת אטומית. בטעינה נקראת תמונת המצב ורק הזנב.
+    """
+    def __init__(self, journal_file=JOURNAL_FILE, snapshot_file=SNAPSHOT_FILE,
+                 compact_every=JOURNAL_COMPACT_EVERY, data_file=DATA_FILE):
+        self.journal_file = journal_file
+        self.snapshot_file = snapshot_file
+        self.compacting_file = f"{journal_file}.compacting"
+        self.compact_every = compact_every
+        self.lock = threading.Lock()
+        self.compaction_thread = None
+        # מצב נוכחי: חתימה -> טיסה, וייצוג יציב להשוואה
+        self.active = {}
+        self.stable = {}
+        self.last_check = None
+        self.entries = 0
+        self.recover(data_file)
+
+    def recover(self, data_file):
+        """שחזור: תמונת המצב, יומן שדחיסתו לא הסתיימה, ואז זנב היומן"""
+        snapshot = self.read_json(self.snapshot_file)
+        if snapshot is None and not os.path.exists(self.journal_file):
+            # הרצה ראשונה - ייבוא קובץ ה-JSON הקיים כתמונת מצב
+            snapshot = self.read_json(data_file)
+            if snapshot:
+                snapshot = {'flights': {flight_signature(f): f for f in snapshot.get('flights', [])},
+                            'last_check': snapshot.get('last_check')}
+                self.write_snapshot(snapshot)
+                logging.info(f"יובאו {len(snapshot['flights'])} טיסות מ-{data_file} ליומן")
+        if snapshot:
+            self.active = snapshot.get('flights', {})
+            self.last_check = snapshot.get('last_check')
+        self.stable = {signature: stable_flight_json(f) for signature, f in self.active.items()}
+
+        # הפעלה חוזרת של יומן שהדחיסה שלו נקטעה היא בטוחה - כל רשומה קובעת ערך סופי
+        if os.path.exists(self.compacting_file):
+            self.replay(self.compacting_file)
+        self.entries = self.replay(self.journal_file)
+        if os.path.exists(self.compacting_file):
+            self.compact(background=False)
+
+    @staticmethod
+    def read_json(path):
+        """קריאת קובץ JSON, או None אם אינו קיים או פגום"""
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except Exception as e:
+            logging.error(f"שגיאה בקריאת {path}: {e}")
+            return None
+
+    def replay(self, path) -> int:
+        """החלת רשומות היומן על המצב; שורה אחרונה קטועה (קריסה באמצע כתיבה) נחתכת מהקובץ"""
+        if not os.path.exists(path):
+            return 0
+        with open(path, 'rb') as f:
+            data = f.read()
+        *lines, tail = data.split(b'\n')
+        count = 0
+        for line in lines:
+            try:
+                entry = json.loads(line.decode('utf-8'))
+            except ValueError:
+                logging.warning(f"שורה פגומה ביומן {path} - מדלג")
+                continue
+            self.apply(entry)
+            count += 1
+        if tail:
+            # בלי החיתוך הרשומה הבאה הייתה נצמדת לשורה הקטועה
+            logging.warning(f"רשומה קטועה בסוף היומן {path} - נחתכת")
+            with open(path, 'r+b') as f:
+                f.truncate(len(data) - len(tail))
+        return count
+
+    def apply(self, entry: Dict):
+        """החלת רשומת מחזור אחת: טיסות שנוספו/השתנו וטיסות שנעלמו"""
+        for signature, flight in entry.get('upsert', {}).items():
+            self.active[signature] = flight
+            self.stable[signature] = stable_flight_json(flight)
+        for signature in entry.get('remove', []):
+            self.active.pop(signature, None)
+            self.stable.pop(signature, None)
+        self.last_check = entry.get('checked_at', self.last_check)
+
+    def arrival_times(self) -> List[str]:
+        """היומן נדחס לתמונת מצב בלי זמני הופעה - הפרופיל נלמד מהבדיקות עצמן"""
+        return []
+
+    def load(self) -> Dict:
+        """הטיסות מהבדיקה האחרונה"""
+        logging.info(f"נטענו נתוני {len(self.active)} טיסות קודמות")
+        return {'flights': [Flight.from_dict(flight) for flight in self.active.values()], 'last_check': self.last_check}
+
+    def save(self, flights: List[Flight], new_flights: List[Flight], timings: Dict = None):
+        """הוספת שורת מחזור ליומן - רק ההפרשים מהמחזור הקודם"""
+        current = {}
+        for flight in flights:
+            current.setdefault(flight_signature(flight), flight.to_dict())
+        upsert = {s: f for s, f in current.items() if self.stable.get(s) != stable_flight_json(f)}
+        remove = [s for s in self.active if s not in current]
+        entry = {
+            'checked_at': datetime.now().isoformat(),
+            'total': len(current),
+            'new': len(new_flights),
+            'tier': (timings or {}).get('tier'),
+            'upsert': upsert,
+            'remove': remove
+        }
+
+        try:
+            line = json.dumps(entry, ensure_ascii=False, separators=(',', ':')) + '\n'
+            with self.lock:
+                with open(self.journal_file, 'a', encoding='utf-8') as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self.apply(entry)
+                self.entries += 1
+            logging.info(f"נשמרו נתוני {len(current)} טיסות ({len(upsert) + len(remove)} שינויים) ליומן")
+        except Exception as e:
+            logging.error(f"שגיאה בשמירת נתונים: {e}")
+            return
+
+        if self.entries >= self.compact_every:
+            self.compact()
+
+    def compact(self, background=True):
+        """קיפול היומן לתמונת מצב; ברירת המחדל - ב-thread ברקע"""
+        if self.compaction_thread and self.compaction_thread.is_alive():
+            return
+        with self.lock:
+            # היומן הנוכחי מועבר הצידה; רשומות חדשות נכתבות ליומן חדש
+            if os.path.exists(self.journal_file) and not os.path.exists(self.compacting_file):
+                os.replace(self.journal_file, self.compacting_file)
+            snapshot = {'flights': dict(self.active), 'last_check': self.last_check}
+            self.entries = 0
+        if background:
+            self.compaction_thread = threading.Thread(
+                target=self.write_snapshot, args=(snapshot,), name='journal-compaction', daemon=True)
+            self.compaction_thread.start()
+        else:
+            self.write_snapshot(snapshot)
+
+    def write_snapshot(self, snapshot: Dict):
+        """כתיבת תמונת המצב בהחלפה אטומית, ורק אחריה מחיקת היומן שקופל"""
+        temp_path = f"{self.snapshot_file}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(snapshot, f, ensure_ascii=False, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_file)
+            if os.path.exists(self.compacting_file):
+                os.remove(self.compacting_file)
+            logging.info(f"היומן נדחס לתמונת מצב ({len(snapshot['flights'])} טיסות)")
+        except Exception as e:
+            logging.error(f"שגיאה בדחיסת היומן: {e}")
+
+    def close(self):
+        """המתנה לדחיסה שרצה ברקע"""
+        if self.compaction_thread:
+            self.compaction_thread.join()
+
+def create_flight_store():
+    """בחירת מנגנון האחסון לפי STORAGE_BACKEND"""
+    if STORAGE_BACKEND == 'sqlite':
+        return SQLiteFlightStore()
+    if STORAGE_BACKEND == 'journal':
+        return JournalFlightStore()
+    return JsonFlightStore()
+
+def filter_relevant_flights(flights: List[Flight]) -> List[Flight]:
+    """סינון טיסות רלוונטיות - מותאם לטיסות רגע אחרון (בלי מצב - לא דורש אחסון או סריקה)"""
+    return [flight for flight in flights if is_relevant_flight(flight)]
+
+def is_relevant_flight(flight: Flight) -> bool:
+    """בדיקת רלוונטיות של טיסה בודדת"""
+    # בדיקה שיש יעד
+    if not flight.destination:
+        return False
+    
+    # בדיקת תוקף (טיסות לימים הקרובים בלבד)
+    scraped_at = flight.scraped_at
+    if scraped_at:
+        try:
+            scraped_time = datetime.fromisoformat(scraped_at)
+            if datetime.now() - scraped_time > timedelta(hours=MAX_FLIGHT_AGE_HOURS):
+                return False
+        except:
+            pass
     
-    def create_flight_signature(self, flight: Dict) -> str:
-        """יצירת חתימה ייחודית לטיסה על בסיס יעד ותאריכי יציאה"""
-        destination = flight.get('destination', '')
-        dates = flight.get('dates', [])
+    # תאריכים מדויקים מדף הפרטים (אם נסרק) קודמים לתאריכים מהכרטיס
+    exact_range = exact_date_range(flight)
+    if exact_range:
+        return check_date_validity([exact_range])
+    
+    # סינון טיסות שכבר עברו או רק להיום
+    if flight.dates:
+        # התאריכים פוענחו כבר ביצירת הטיסה - רק בדיקת הטווח
+        return check_date_validity(flight.date_ranges)
+    
+    return True
+
+def exact_date_range(flight: Flight):
+    """טווח היציאה-חזרה מדף הפרטים, או None אם לא נסרק"""
+    departure = parse_date_range(flight.departure_date)
+    if not departure:
+        return None
+    return_range = parse_date_range(flight.return_date) or departure
+    return departure[0], max(departure[1], return_range[1])
+
+def check_date_validity(date_ranges: List[Tuple[date, date]]) -> bool:
+    """בדיקה שהתאריכים נמצאים בטווח הרלוונטי לטיסות רגע אחרון"""
+    today = datetime.now().date()
+    max_date = today + timedelta(days=14)  # טיסות עד 14 ימים קדימה
+    
+    # טווח (למשל חודש בלי יום) רלוונטי אם הוא חופף לחלון
+    return any(start <= max_date and end >= today for start, end in date_ranges)
+
+class FlightMonitor:
+    def __init__(self, driver_pool=None):
+        self.data_file = DATA_FILE
+        self.store = create_flight_store()
+        self.orchestrator = ScrapeOrchestrator(driver_pool=driver_pool)
+        self.detail_crawler = DetailCrawler() if DETAIL_CRAWL_ENABLED else None
+        self.previous_flights = self.load_previous_flights()
+        self.signature_index = SignatureIndex()
+        self.signature_index.migrate_from_data_file(self.data_file)
+        self.price_history = PriceHistory()
+        # בקשת עצירה מה-thread הראשי - הבדיקה שרצה מפסיקה בלי לשמור תוצאות חלקיות
+        self.stop_requested = threading.Event()
         
-        # יצירת חתימה על בסיס יעד ותאריכים (לא מחיר כי הוא קבוע)
-        dates_str = '_'.join(sorted(dates)) if dates else 'no_dates'
-        return f"{destination}_{dates_str}_{hash(flight.get('full_text', ''))}"
+    def request_stop(self):
+        """בקשה מהבדיקה הנוכחית להפסיק (בסיום התהליך)"""
+        self.stop_requested.set()
     
-    def find_new_flights(self, current_flights: List[Dict]) -> List[Dict]:
-        """זיהוי טיסות חדשות - זה הפוקוס העיקרי של המערכת"""
-        # יצירת סט של חתימות טיסות קודמות
-        previous_signatures = set()
+    def load_previous_flights(self) -> Dict:
+        """טעינת נתוני טיסות קודמים מהאחסון"""
+        return self.store.load()
+    
+    def save_flights_data(self, flights: List[Flight], new_flights: List[Flight], timings: Dict = None):
+        """שמירת נתוני טיסות באחסון"""
+        self.store.save(flights, new_flights, timings)
+    
+    def create_flight_signature(self, flight: Flight) -> str:
+        """יצירת חתימה ייחודית לטיסה על בסיס יעד, תאריכים וטקסט מנורמל (זהה בין הרצות)"""
+        return flight_signature(flight)
+    
+    def previous_signatures(self) -> SignatureIndex:
+        """החתימות של הטיסות מהבדיקה הקודמת - מהאינדקס השמור, בלי לעבור על קובץ הנתונים"""
+        return self.signature_index
+    
+    def previous_near_duplicates(self) -> NearDuplicateIndex:
+        """הטיסות מהבדיקה הקודמת, לזיהוי כרטיס שרק הניסוח שלו השתנה"""
+        index = NearDuplicateIndex()
         for flight in self.previous_flights.get('flights', []):
-            signature = self.create_flight_signature(flight)
-            previous_signatures.add(signature)
-        
-        # חיפוש טיסות חדשות
-        new_flights = []
-        for flight in current_flights:
-            signature = self.create_flight_signature(flight)
-            if signature not in previous_signatures:
-                new_flights.append(flight)
-                logging.info(f"טיסה חדשה נמצאה: {flight['destination']} - {flight.get('dates', 'ללא תאריכים')}")
-        
-        return new_flights
+            index.add(flight)
+        return index
+    
+    def previous_price_identities(self) -> set:
+        """מפתחות המחיר (יעד, תאריכים וקישור) של הטיסות מהבדיקה הקודמת"""
+        return {price_identity(flight) for flight in self.previous_flights.get('flights', [])
+                if has_price_identity(flight)}
+    
+    def is_new_flight(self, flight: Flight, previous_signatures, previous_near=None, previous_identities=None) -> bool:
+        """בדיקת טיסה בודדת מול חתימות הבדיקה הקודמת"""
+        if self.create_flight_signature(flight) in previous_signatures:
+            return False
+        # אותה טיסה שרק המחיר שלה השתנה (החתימה כוללת את הטקסט עם המחיר) - שינוי מחיר, לא טיסה חדשה
+        if previous_identities and has_price_identity(flight) and price_identity(flight) in previous_identities:
+            return False
+        if previous_near is not None and previous_near.find(flight) is not None:
+            logging.info(f"טיסה ל{flight.destination} כמעט זהה לטיסה מהבדיקה הקודמת - לא נחשבת חדשה")
+            return False
+        logging.info(f"טיסה חדשה נמצאה: {flight.destination} - {list(flight.dates) or 'ללא תאריכים'}")
+        return True
+    
+    def find_new_flights(self, current_flights: List[Flight]) -> List[Flight]:
+        """זיהוי טיסות חדשות - זה הפוקוס העיקרי של המערכת"""
+        previous_signatures = self.previous_signatures()
+        previous_near = self.previous_near_duplicates()
+        previous_identities = self.previous_price_identities()
+        return [flight for flight in current_flights
+                if self.is_new_flight(flight, previous_signatures, previous_near, previous_identities)]
     
-    def find_price_changes(self, current_flights: List[Dict]) -> List[Dict]:
-        """זיהוי שינויי מחירים - מושבת כי המחירים קבועים"""
+    def find_price_changes(self, current_flights: List[Flight]) -> List[Dict]:
+        """זיהוי ירידות מחיר מול המחיר האחרון הידוע של כל טיסה"""
         if IGNORE_PRICE_CHANGES:
-            logging.info("מעקב שינויי מחירים מושבת (מחירים קבועים באתר)")
+            logging.info("מעקב שינויי מחירים מושבת (IGNORE_PRICE_CHANGES)")
             return []
         
-        # הקוד הישן נשאר כאן למקרה שיהיה צורך עתידי
-        price_changes = []
-        return price_changes
+        return self.price_history.update(current_flights)
     
-    def filter_relevant_flights(self, flights: List[Dict]) -> List[Dict]:
+    def filter_relevant_flights(self, flights: List[Flight]) -> List[Flight]:
         """סינון טיסות רלוונטיות - מותאם לטיסות רגע אחרון"""
-        relevant_flights = []
-        
-        for flight in flights:
-            # בדיקה שיש יעד
-            if not flight.get('destination'):
-                continue
-            
-            # בדיקת תוקף (טיסות לימים הקרובים בלבד)
-            scraped_at = flight.get('scraped_at')
-            if scraped_at:
-                try:
-                    scraped_time = datetime.fromisoformat(scraped_at)
-                    if datetime.now() - scraped_time > timedelta(hours=MAX_FLIGHT_AGE_HOURS):
-                        continue
-                except:
-                    pass
-            
-            # סינון טיסות שכבר עברו או רק להיום
-            dates = flight.get('dates', [])
-            if dates:
-                # ניסיון לפרסר תאריכים ולוודא שהם בטווח הרלוונטי
-                is_valid_date_range = self.check_date_validity(dates)
-                if not is_valid_date_range:
-                    continue
-            
-            relevant_flights.append(flight)
-        
-        return relevant_flights
+        return filter_relevant_flights(flights)
     
-    def check_date_validity(self, dates: List[str]) -> bool:
-        """בדיקה שהתאריכים נמצאים בטווח הרלוונטי לטיסות רגע אחרון"""
-        try:
-            today = datetime.now().date()
-            max_date = today + timedelta(days=14)  # טיסות עד 14 ימים קדימה
-            
-            for date_str in dates:
-                # ניסיון לפרסר תאריכים בפורמטים שונים
-                parsed_date = self.parse_date(date_str)
-                if parsed_date and today <= parsed_date <= max_date:
-                    return True
-            
-            return False
-        except:
-            # אם לא ניתן לפרסר, נשאיר את הטיסה
-            return True
+    def is_relevant_flight(self, flight: Flight) -> bool:
+        """בדיקת רלוונטיות של טיסה בודדת"""
+        return is_relevant_flight(flight)
     
-    def parse_date(self, date_str: str) -> datetime.date:
-        """ניסיון לפרסר תאריך מסטרינג"""
-        try:
-            # פורמטים נפוצים
-            formats = [
-                '%d/%m/%Y', '%d.%m.%Y', '%d-%m-%Y',
-                '%d/%m/%y', '%d.%m.%y', '%d-%m-%y'
-            ]
-            
-            for fmt in formats:
-                try:
-                    return datetime.strptime(date_str.strip(), fmt).date()
-                except:
-                    continue
-            
-            return None
-        except:
-            return None
+    def exact_date_range(self, flight: Flight):
+        return exact_date_range(flight)
+    
+    def check_date_validity(self, date_ranges: List[Tuple[date, date]]) -> bool:
+        return check_date_validity(date_ranges)
+    
+    def parse_date(self, date_str: str) -> date:
+        """ניסיון לפרסר תאריך מסטרינג (פורמט מספרי או יום וחודש בעברית)"""
+        return parse_flight_date(date_str)
     
     def check_for_updates(self) -> Dict:
         """בדיקה עיקרית לעדכונים - מותאמת לטיסות רגע אחרון"""
         logging.info("מתחיל בדיקת עדכונים לטיסות רגע אחרון")
 
-        scraper = FlightScraper()
+        cycle_start = time.perf_counter()
+        with tracing.cycle('check'):
+            return self.run_check(cycle_start)
+    
+    def run_check(self, cycle_start: float) -> Dict:
+        """גוף הבדיקה - כל שלב נמדד כ-span במחזור הפעיל"""
         try:
-            # סריקת טיסות נוכחיות
-            current_flights = scraper.scrape_flights()
+            # סריקה כזרם - כל טיסה מסוננת ומושווית לבדיקה הקודמת ברגע שהיא מגיעה
+            with tracing.span('monitor.load_previous'):
+                previous_signatures = self.previous_signatures()
+                previous_near = self.previous_near_duplicates()
+                previous_identities = self.previous_price_identities()
+            # בלי בדיקה קודמת כל הטיסות נראות חדשות
+            first_run = len(previous_signatures) == 0
+            relevant_flights = []
+            new_flights = []
+            first_new_seconds = None
+            filter_seconds = 0.0
+            stream_start = time.perf_counter()
+            for flight in self.orchestrator.iter_flights():
+                if self.stop_requested.is_set():
+                    break
+                filter_start = time.perf_counter()
+                # סינון טיסות רלוונטיות
+                if not self.is_relevant_flight(flight):
+                    filter_seconds += time.perf_counter() - filter_start
+                    continue
+                relevant_flights.append(flight)
 
-            # סינון טיסות רלוונטיות
-            relevant_flights = self.filter_relevant_flights(current_flights)
+                # זיהוי טיסות חדשות (הפוקוס העיקרי)
+                if self.is_new_flight(flight, previous_signatures, previous_near, previous_identities):
+                    flight.detected_at = datetime.now().isoformat()
+                    new_flights.append(flight)
+                    if first_new_seconds is None:
+                        first_new_seconds = round(time.perf_counter() - cycle_start, 3)
+                filter_seconds += time.perf_counter() - filter_start
+            # הסינון וההשוואה רצים לסירוגין עם הסריקה - נרשמים כסכום
+            tracing.add_span('monitor.scrape_stream', stream_start, time.perf_counter() - stream_start - filter_seconds)
+            tracing.add_span('monitor.filter_and_diff', stream_start, filter_seconds)
+            if self.stop_requested.is_set():
+                # סריקה חלקית הייתה מסמנת טיסות כאילו נעלמו - לא שומרים ולא משווים
+                raise RuntimeError("הבדיקה הופסקה בעקבות סיום התהליך")
+            timings = self.orchestrator.last_timings
+            timings['first_new_seconds'] = first_new_seconds
 
-            # זיהוי טיסות חדשות (הפוקוס העיקרי)
-            new_flights = self.find_new_flights(relevant_flights)
+            # סריקת עומק של דפי הפרטים (אופציונלי)
+            if self.detail_crawler:
+                detail_start = time.perf_counter()
+                with tracing.span('monitor.detail_pages'):
+                    self.detail_crawler.enrich(relevant_flights)
+                    # התאריכים המדויקים עשויים להוציא טיסה מחלון הימים הקרובים - סינון חוזר
+                    enriched_count = len(relevant_flights)
+                    relevant_flights = [f for f in relevant_flights if self.is_relevant_flight(f)]
+                    new_flights = [f for f in new_flights if self.is_relevant_flight(f)]
+                    if len(relevant_flights) < enriched_count:
+                        logging.info(f"{enriched_count - len(relevant_flights)} טיסות סוננו לפי התאריכים מדף הפרטים")
+                timings['detail_seconds'] = round(time.perf_counter() - detail_start, 3)
 
-            # שינויי מחירים (מושבת)
+            # ירידות מחיר (אלא אם IGNORE_PRICE_CHANGES)
             price_changes = []
             if not IGNORE_PRICE_CHANGES:
-                price_changes = self.find_price_changes(relevant_flights)
+                with tracing.span('monitor.price_changes'):
+                    price_changes = self.find_price_changes(relevant_flights)
 
             # שמירת נתונים
-            self.save_flights_data(relevant_flights, new_flights)
+            with tracing.span('monitor.save'):
+                self.save_flights_data(relevant_flights, new_flights, timings)
 
-            # עדכון נתונים פנימיים
+            # עדכון נתונים פנימיים - לאינדקס נכתבים רק ההפרשים
+            with tracing.span('monitor.signature_index'):
+                self.signature_index.replace(self.create_flight_signature(f) for f in relevant_flights)
             self.previous_flights = {
                 'flights': relevant_flights,
                 'last_check': datetime.now().isoformat()
             }
 
+            timings['total_seconds'] = round(time.perf_counter() - cycle_start, 3)
             result = {
                 'total_flights': len(relevant_flights),
                 'new_flights': new_flights,
                 'price_changes': price_changes,
                 'check_time': datetime.now().isoformat(),
-                'focus_message': 'התמקדות בטיסות חדשות לימים הקרובים' if FOCUS_ON_NEW_FLIGHTS_ONLY else ''
+                'focus_message': 'התמקדות בטיסות חדשות לימים הקרובים' if FOCUS_ON_NEW_FLIGHTS_ONLY else '',
+                'first_run': first_run,
+                'timings': timings
             }
 
-            logging.info(f"בדיקה הושלמה: {len(relevant_flights)} טיסות, {len(new_flights)} חדשות")
+            if timings['tier'] == 'browser':
+                start_kind = 'חם' if timings['warm_start'] else 'קר'
+                logging.info(f"זמני מחזור: הפעלת דפדפן ({start_kind}) {timings['startup_seconds']:.2f} שניות, "
+                             f"סריקה {timings['scrape_seconds']:.2f} שניות, סה\"כ {timings['total_seconds']:.2f} שניות")
+            else:
+                logging.info(f"זמני מחזור: שכבת {timings['tier']} {timings['tier_seconds']:.2f} שניות, "
+                             f"סה\"כ {timings['total_seconds']:.2f} שניות")
+            if first_new_seconds is not None:
+                logging.info(f"טיסה חדשה ראשונה זוהתה אחרי {first_new_seconds:.2f} שניות")
+            tracing.annotate(tier=timings.get('tier'), flights=len(relevant_flights), new_flights=len(new_flights),
+                             price_changes=len(price_changes))
+            logging.info(f"בדיקה הושלמה: {len(relevant_flights)} טיסות, {len(new_flights)} חדשות, "
+                         f"{len(price_changes)} ירידות מחיר")
             return result
 
         except Exception as e:
@@ -195,9 +663,13 @@ class FlightMonitor:
                 'error': str(e),
                 'check_time': datetime.now().isoformat()
             }
-        finally:
-            if scraper:
-                scraper.close()
+    
+    def close(self):
+        """שחרור ה-threads וסשני הדפדפן של הסריקה"""
+        self.orchestrator.close()
+        self.store.close()
+        if self.detail_crawler:
+            self.detail_crawler.close()
     
     def get_statistics(self) -> Dict:
         """קבלת סטטיסטיקות"""
@@ -212,7 +684,7 @@ class FlightMonitor:
         
         flights = self.previous_flights.get('flights', [])
         if flights:
-            destinations = [f.get('destination') for f in flights if f.get('destination')]
+            destinations = [f.destination for f in flights if f.destination]
             stats['destinations_found'] = set(destinations)
         
         return stats
@@ -244,8 +716,8 @@ def test_monitor():
     if result['new_flights']:
         print("\n🆕 טיסות חדשות שנמצאו:")
         for flight in result['new_flights']:
-            dates_str = ', '.join(flight.get('dates', [])) if flight.get('dates') else 'ללא תאריכים'
-            print(f"✈️ {flight['destination']} - {dates_str}")
+            dates_str = ', '.join(flight.dates) if flight.dates else 'ללא תאריכים'
+            print(f"✈️ {flight.destination} - {dates_str}")
     else:
         print("\n😴 לא נמצאו טיסות חדשות")
 
@@ -7,9 +7,25 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 import time
 import json
+import os
+import re
+import base64
 import logging
+from collections import Counter
 from datetime import datetime
-from config import TUSTUS_URL, PREFERRED_DESTINATIONS, EXCLUDED_DESTINATIONS
+from requests.adapters import HTTPAdapter
+from resource_blocker import create_resource_blocker
+from selector_cache import SelectorCache
+from flight_extraction import find_destination, find_price, find_dates
+from flight_model import Flight
+from flight_dedup import collapse_contained
+import tracing
+import metrics
+from config import (
+    TUSTUS_URL, PREFERRED_DESTINATIONS, EXCLUDED_DESTINATIONS, SCRAPER_EXTRACTION_MODE,
+    PAGE_READY_TIMEOUT_SECONDS, PAGE_READY_QUIET_MS, API_DISCOVERY_ENABLED, API_ENDPOINTS_FILE,
+    API_REQUEST_TIMEOUT
+)
 
 # הגדרת לוגים
 logging.basicConfig(
@@ -21,30 +37,140 @@ logging.basicConfig(
     ]
 )
 
+# סלקטורים נפוצים לכרטיסי טיסה, לפי סדר עדיפות
+FLIGHT_SELECTORS = [
+    ".flight-item",
+    ".flight",
+    ".trip",
+    ".offer",
+    ".deal",
+    "[class*='flight']",
+    "[class*='trip']",
+    "[class*='offer']",
+    ".card",
+    ".product"
+]
+
+# חיפוש כללי לפי מילות מפתח כשאף סלקטור לא תפס
+FALLBACK_XPATH = "//*[contains(text(), '₪') or contains(text(), 'שח') or contains(text(), 'טיסה') or contains(text(), 'יעד')]"
+MAX_FALLBACK_ELEMENTS = 20
+
+# סקריפט שרץ בדפדפן: עובר על הסלקטורים ומחזיר את כל הכרטיסים כ-JSON בסבב אחד
+EXTRACT_CARDS_SCRIPT = """
+var selectors = arguments[0], xpath = arguments[1], limit = arguments[2];
+var nodes = [], matched = null, attempts = [];
+for (var i = 0; i < selectors.length; i++) {
+    var found;
+    try { found = document.querySelectorAll(selectors[i]); } catch (e) { continue; }
+    attempts.push([selectors[i], found.length]);
+    if (found.length) { nodes = Array.prototype.slice.call(found); matched = selectors[i]; break; }
+}
+if (!nodes.length) {
+    var snapshot = document.evaluate(xpath, document, null, XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+    for (var j = 0; j < snapshot.snapshotLength && j < limit; j++) { nodes.push(snapshot.snapshotItem(j)); }
+    matched = nodes.length ? 'xpath' : null;
+}
+var positions = new Map();
+nodes.forEach(function (node, i) { positions.set(node, i); });
+var cards = nodes.map(function (node) {
+    var link = node.closest('a[href]') || node.querySelector('a[href]');
+    var container = -1;
+    for (var parent = node.parentElement; parent; parent = parent.parentElement) {
+        if (positions.has(parent)) { container = positions.get(parent); break; }
+    }
+    return {
+        text: (node.innerText || node.textContent || '').trim(),
+        href: link ? link.href : null,
+        className: typeof node.className === 'string' ? node.className : null,
+        id: node.id || null,
+        container: container
+    };
+});
+return JSON.stringify({selector: matched, attempts: attempts, cards: cards});
+"""
+
+# ההמתנה הקבועה הישנה - משמשת כגיבוי ולחישוב הזמן שנחסך
+LEGACY_FIXED_WAIT_SECONDS = 5
+
+# סקריפט אסינכרוני: חוזר ברגע שיש כרטיסים בדף וה-DOM שקט למשך חלון קצר, או בתקרת הזמן
+WAIT_FOR_READY_SCRIPT = """
+var selectors = arguments[0], quietMs = arguments[1], timeoutMs = arguments[2];
+var done = arguments[arguments.length - 1];
+var start = performance.now(), lastMutation = start;
+function cardsPresent() {
+    for (var i = 0; i < selectors.length; i++) {
+        try { if (document.querySelector(selectors[i])) { return true; } } catch (e) {}
+    }
+    var body = document.body;
+    return !!body && (body.innerText || '').indexOf('₪') >= 0;
+}
+var observer = new MutationObserver(function () { lastMutation = performance.now(); });
+observer.observe(document.documentElement, {childList: true, subtree: true, characterData: true});
+(function poll() {
+    var now = performance.now(), present = cardsPresent();
+    var quiet = now - lastMutation >= quietMs;
+    if ((present && quiet) || now - start >= timeoutMs) {
+        observer.disconnect();
+        done({ready: present && quiet, cards: present, waited_ms: now - start});
+        return;
+    }
+    setTimeout(poll, 50);
+})();
+"""
+
+def create_chrome_driver():
+    """יצירת WebDriver חדש של Chrome במצב headless"""
+    chrome_options = Options()
+    chrome_options.add_argument('--headless')
+    chrome_options.add_argument('--no-sandbox')
+    chrome_options.add_argument('--disable-dev-shm-usage')
+    chrome_options.add_argument('--disable-gpu')
+    chrome_options.add_argument('--window-size=1920,1080')
+    chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
+    chrome_options.add_argument('--disable-blink-features=AutomationControlled')
+    chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
+    chrome_options.add_experimental_option('useAutomationExtension', False)
+
+    # לוג ביצועים עם אירועי רשת בלבד - לסטטיסטיקת חסימת המשאבים
+    chrome_options.set_capability('goog:loggingPrefs', {'performance': 'ALL'})
+    chrome_options.add_experimental_option('perfLoggingPrefs', {'enableNetwork': True, 'enablePage': False})
+
+    # Selenium Manager will locate/download the correct driver automatically
+    driver = webdriver.Chrome(options=chrome_options)
+
+    # Post-init stealth tweak
+    driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+
+    # דומיין הרשת של DevTools נדרש לקריאת גופי תשובות XHR בזמן גילוי ה-API
+    try:
+        driver.execute_cdp_cmd('Network.enable', {})
+    except Exception as e:
+        logging.warning(f"לא ניתן להפעיל את דומיין הרשת של DevTools: {e}")
+
+    # חסימת תמונות, פונטים, וידאו ואנליטיקס - לא נחוצים לקריאת יעדים ומחירים
+    resource_blocker = create_resource_blocker()
+    if resource_blocker:
+        resource_blocker.apply(driver)
+    return driver
+
 class FlightScraper:
-    def __init__(self):
-        self.driver = None
-        self.setup_driver()
+    def __init__(self, driver=None):
+        # דרייבר חיצוני (למשל ממאגר הסשנים) לא נסגר על ידי הסקרפר
+        self.driver = driver
+        self.owns_driver = driver is None
+        self.last_error = None
+        self.last_ready_seconds = None
+        self.last_network_stats = None
+        self.resource_blocker = create_resource_blocker()
+        self.selector_cache = SelectorCache()
+        self.last_selector = None
+        if self.driver is None:
+            self.setup_driver()
     
     def setup_driver(self):
         """הגדרת WebDriver עם Chrome"""
         try:
-            chrome_options = Options()
-            chrome_options.add_argument('--headless')
-            chrome_options.add_argument('--no-sandbox')
-            chrome_options.add_argument('--disable-dev-shm-usage')
-            chrome_options.add_argument('--disable-gpu')
-            chrome_options.add_argument('--window-size=1920,1080')
-            chrome_options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36')
-            chrome_options.add_argument('--disable-blink-features=AutomationControlled')
-            chrome_options.add_experimental_option("excludeSwitches", ["enable-automation"])
-            chrome_options.add_experimental_option('useAutomationExtension', False)
-
-            # Selenium Manager will locate/download the correct driver automatically
-            self.driver = webdriver.Chrome(options=chrome_options)
-
-            # Post-init stealth tweak
-            self.driver.execute_script("Object.defineProperty(navigator, 'webdriver', {get: () => undefined})")
+            self.driver = create_chrome_driver()
             logging.info("WebDriver הוגדר בהצלחה")
         except Exception as e:
             logging.error(f"שגיאה בהגדרת WebDriver: {e}")
@@ -52,69 +178,208 @@ class FlightScraper:
     
     def scrape_flights(self):
         """סריקת טיסות מהאתר"""
+        with tracing.span('browser.scrape_flights'):
+            flights = list(self.iter_flights())
+        return [] if self.last_error else flights
+    
+    def iter_flights(self):
+        """סריקת טיסות מהאתר כזרם - כל טיסה מוחזרת מיד כשהכרטיס שלה חולץ"""
+        self.last_error = None
         try:
             logging.info(f"מתחיל סריקה של {TUSTUS_URL}")
-            self.driver.get(TUSTUS_URL)
             
-            # המתנה לטעינת הדף
-            wait = WebDriverWait(self.driver, 20)
-            wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
+            # ריקון אירועי רשת שנצברו משימוש קודם בסשן
+            self.read_network_events()
+            load_start = time.perf_counter()
+            with tracing.span('browser.get'):
+                self.driver.get(TUSTUS_URL)
+                
+                # המתנה לטעינת הדף
+                wait = WebDriverWait(self.driver, 20)
+                wait.until(EC.presence_of_element_located((By.TAG_NAME, "body")))
             
-            # המתנה נוספת לטעינת תוכן דינמי
-            time.sleep(5)
+            # המתנה אדפטיבית לטעינת תוכן דינמי (במקום 5 שניות קבועות)
+            with tracing.span('browser.wait_ready'):
+                self.wait_for_page_ready()
+            metrics.PAGE_LOAD_SECONDS.observe(time.perf_counter() - load_start)
             
             # חיפוש אלמנטים של טיסות
-            flights = []
+            found = 0
+            extract_start = time.perf_counter()
             
-            # ניסיון לזהות טיסות על פי מבנים נפוצים
-            flight_elements = self.find_flight_elements()
+            if SCRAPER_EXTRACTION_MODE == 'script':
+                # סבב אחד מול הדפדפן - כל הכרטיסים חוזרים כ-JSON
+                with tracing.span('browser.extract'):
+                    cards = self.extract_cards()
+                    flights = [self.build_flight_data(card.get('text', ''), card) for card in cards]
+                    # סלקטורים רחבים תופסים גם מיכלים - נשארת רק הרשומה הפנימית
+                    flights = collapse_contained(flights, [card.get('container', -1) for card in cards])
+                for flight_data in flights:
+                    if self.is_relevant_destination(flight_data.destination):
+                        found += 1
+                        yield flight_data
+            else:
+                # ניסיון לזהות טיסות על פי מבנים נפוצים
+                with tracing.span('browser.find_elements'):
+                    flight_elements = self.find_flight_elements()
+                
+                for element in flight_elements:
+                    # מדידה ידנית - ה-span לא יכול לעטוף yield
+                    element_start = time.perf_counter()
+                    flight_data = self.extract_flight_data(element)
+                    tracing.add_span('browser.extract', element_start, time.perf_counter() - element_start)
+                    if flight_data and self.is_relevant_destination(flight_data.destination):
+                        found += 1
+                        yield flight_data
             
-            for element in flight_elements:
-                flight_data = self.extract_flight_data(element)
-                if flight_data and self.is_relevant_destination(flight_data.get('destination', '')):
-                    flights.append(flight_data)
+            # עדכון סטטיסטיקת הסלקטורים - המנצח ייבדק ראשון בפעם הבאה
+            self.selector_cache.record_result(self.last_selector, found)
             
-            logging.info(f"נמצאו {len(flights)} טיסות רלוונטיות")
-            return flights
+            logging.info(f"חילוץ נתונים ({SCRAPER_EXTRACTION_MODE}) הושלם תוך {time.perf_counter() - extract_start:.2f} שניות")
+            
+            # דיווח על בקשות ובתים שנחסכו בזכות חסימת המשאבים
+            with tracing.span('browser.network_events'):
+                network_events = self.read_network_events()
+            if self.resource_blocker and network_events:
+                self.last_network_stats = self.resource_blocker.summarize(network_events)
+                self.resource_blocker.log_summary(self.last_network_stats)
+            
+            # גילוי ה-XHR שמביא את נתוני הטיסות, לשימוש במסלול המהיר בבדיקות הבאות
+            if API_DISCOVERY_ENABLED and network_events:
+                self.discover_api_endpoints(network_events)
+            logging.info(f"נמצאו {found} טיסות רלוונטיות")
             
         except Exception as e:
             logging.error(f"שגיאה בסריקת טיסות: {e}")
+            self.last_error = e
+    
+    def read_network_events(self):
+        """קריאת אירועי הרשת מלוג הביצועים של Chrome (הקריאה מרוקנת את הלוג)"""
+        try:
+            entries = self.driver.get_log('performance')
+        except Exception:
             return []
+        
+        events = []
+        for entry in entries:
+            try:
+                events.append(json.loads(entry['message'])['message'])
+            except (KeyError, ValueError):
+                continue
+        return events
+    
+    def discover_api_endpoints(self, events):
+        """זיהוי תשובות XHR/Fetch שמכילות נתוני טיסות ושמירת ה-endpoints לקובץ"""
+        requests_by_id = {}
+        endpoints = []
+        
+        for event in events:
+            method = event.get('method')
+            params = event.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                requests_by_id[params.get('requestId')] = params.get('request', {})
+            elif method == 'Network.responseReceived' and params.get('type') in ('XHR', 'Fetch'):
+                response = params.get('response', {})
+                if 'json' not in response.get('mimeType', ''):
+                    continue
+                request = requests_by_id.get(params.get('requestId'))
+                if not request:
+                    continue
+                
+                data = self.read_response_json(params.get('requestId'))
+                schema = find_flight_schema(data) if data is not None else None
+                if schema:
+                    endpoints.append(build_endpoint_record(request, schema))
+        
+        if endpoints:
+            save_api_endpoints(endpoints)
+            logging.info(f"זוהו {len(endpoints)} endpoints של נתוני טיסות: {', '.join(e['url'] for e in endpoints)}")
+        return endpoints
+    
+    def read_response_json(self, request_id):
+        """קריאת גוף תשובה מ-DevTools ופענוח שלו כ-JSON"""
+        try:
+            body = self.driver.execute_cdp_cmd('Network.getResponseBody', {'requestId': request_id})
+            content = body.get('body', '')
+            if body.get('base64Encoded'):
+                content = base64.b64decode(content).decode('utf-8', errors='replace')
+            return json.loads(content)
+        except Exception:
+            return None
+    
+    def wait_for_page_ready(self):
+        """המתנה עד שכרטיסי הטיסה בדף וה-DOM שקט, עם תקרת זמן מוגדרת"""
+        start = time.perf_counter()
+        try:
+            self.driver.set_script_timeout(PAGE_READY_TIMEOUT_SECONDS + 5)
+            status = self.driver.execute_async_script(
+                WAIT_FOR_READY_SCRIPT, self.selector_cache.ordered(FLIGHT_SELECTORS), PAGE_READY_QUIET_MS, PAGE_READY_TIMEOUT_SECONDS * 1000
+            ) or {}
+        except Exception as e:
+            logging.warning(f"זיהוי מוכנות הדף נכשל, ממתין {LEGACY_FIXED_WAIT_SECONDS} שניות: {e}")
+            time.sleep(LEGACY_FIXED_WAIT_SECONDS)
+            self.last_ready_seconds = time.perf_counter() - start
+            return False
+        
+        self.last_ready_seconds = time.perf_counter() - start
+        saved = LEGACY_FIXED_WAIT_SECONDS - self.last_ready_seconds
+        if status.get('ready'):
+            logging.info(f"הדף מוכן אחרי {self.last_ready_seconds:.2f} שניות "
+                         f"({saved:+.2f} שניות לעומת המתנה קבועה של {LEGACY_FIXED_WAIT_SECONDS} שניות)")
+        else:
+            reason = 'ה-DOM לא התייצב' if status.get('cards') else 'לא נמצאו כרטיסים'
+            logging.warning(f"תקרת ההמתנה ({PAGE_READY_TIMEOUT_SECONDS} שניות) הושגה - {reason}")
+        return bool(status.get('ready'))
+    
+    def extract_cards(self):
+        """חילוץ טקסט ומאפיינים של כל כרטיסי הטיסה בקריאת execute_script אחת"""
+        try:
+            payload = json.loads(self.driver.execute_script(
+                EXTRACT_CARDS_SCRIPT, self.selector_cache.ordered(FLIGHT_SELECTORS), FALLBACK_XPATH, MAX_FALLBACK_ELEMENTS
+            ) or '{}')
+        except Exception as e:
+            logging.warning(f"שגיאה בחילוץ כרטיסים בסקריפט, חוזר לחילוץ לפי אלמנטים: {e}")
+            return [{'text': element.text} for element in self.find_flight_elements()]
+        
+        # כרטיסים ריקים נשארים ברשימה - container מפנה למיקום המקורי
+        cards = payload.get('cards', [])
+        count = sum(1 for card in cards if card.get('text'))
+        selector = payload.get('selector')
+        self.last_selector = selector
+        self.selector_cache.record_attempts(payload.get('attempts', []))
+        if selector == 'xpath':
+            logging.info(f"נמצאו {count} אלמנטים כלליים")
+        elif selector:
+            logging.info(f"נמצאו {count} אלמנטים עם סלקטור {selector}")
+        return cards
     
     def find_flight_elements(self):
         """חיפוש אלמנטים של טיסות בדף"""
         flight_elements = []
+        attempts = []
+        self.last_selector = None
         
-        # ניסיון מספר סלקטורים נפוצים
-        selectors = [
-            ".flight-item",
-            ".flight",
-            ".trip",
-            ".offer",
-            ".deal",
-            "[class*='flight']",
-            "[class*='trip']",
-            "[class*='offer']",
-            ".card",
-            ".product"
-        ]
-        
-        for selector in selectors:
+        # ניסיון מספר סלקטורים נפוצים - לפי הסדר שנלמד מסריקות קודמות
+        for selector in self.selector_cache.ordered(FLIGHT_SELECTORS):
             try:
                 elements = self.driver.find_elements(By.CSS_SELECTOR, selector)
+                attempts.append((selector, len(elements)))
                 if elements:
                     logging.info(f"נמצאו {len(elements)} אלמנטים עם סלקטור {selector}")
                     flight_elements.extend(elements)
+                    self.last_selector = selector
                     break
             except:
                 continue
+        self.selector_cache.record_attempts(attempts)
         
         # אם לא נמצאו אלמנטים ספציפיים, נחפש אלמנטים כלליים
         if not flight_elements:
             try:
                 # חיפוש אלמנטים שמכילים מילות מפתח
-                all_elements = self.driver.find_elements(By.XPATH, "//*[contains(text(), '₪') or contains(text(), 'שח') or contains(text(), 'טיסה') or contains(text(), 'יעד')]")
-                flight_elements = all_elements[:20]  # מגבילים למקסימום 20 אלמנטים
+                all_elements = self.driver.find_elements(By.XPATH, FALLBACK_XPATH)
+                flight_elements = all_elements[:MAX_FALLBACK_ELEMENTS]  # מגבילים למקסימום 20 אלמנטים
+                self.last_selector = 'xpath' if flight_elements else None
                 logging.info(f"נמצאו {len(flight_elements)} אלמנטים כלליים")
             except:
                 pass
@@ -124,7 +389,16 @@ class FlightScraper:
     def extract_flight_data(self, element):
         """חילוץ נתונים מאלמנט טיסה"""
         try:
-            text = element.text.strip()
+            return self.build_flight_data(element.text, element)
+        except Exception as e:
+            logging.warning(f"שגיאה בחילוץ נתונים מאלמנט: {e}")
+        
+        return None
+    
+    def build_flight_data(self, text, element=None):
+        """בניית רשומת טיסה מטקסט הכרטיס (element יכול להיות WebElement או מילון מהסקריפט)"""
+        try:
+            text = (text or '').strip()
             if not text:
                 return None
             
@@ -142,14 +416,9 @@ class FlightScraper:
             dates = self.extract_dates(text, element)
             
             if destination and price:
-                return {
-                    'destination': destination,
-                    'price': price,
-                    'dates': dates,
-                    'full_text': text,
-                    'scraped_at': datetime.now().isoformat(),
-                    'url': TUSTUS_URL
-                }
+                # קישור לדף הדיל, כשהחילוץ בסקריפט החזיר אותו
+                link = element.get('href') if isinstance(element, dict) else None
+                return Flight(destination, price, dates, text, datetime.now().isoformat(), TUSTUS_URL, link=link)
         except Exception as e:
             logging.warning(f"שגיאה בחילוץ נתונים מאלמנט: {e}")
         
@@ -157,60 +426,15 @@ class FlightScraper:
     
     def extract_destination(self, text, element):
         """חילוץ יעד מהטקסט"""
-        # חיפוש יעדים מהרשימה המועדפת
-        for dest in PREFERRED_DESTINATIONS:
-            if dest in text:
-                return dest
-        
-        # חיפוש מילות מפתח נוספות לערים
-        cities_keywords = ['ברלין', 'פריז', 'לונדון', 'רומא', 'מדריד', 'אמסטרדם', 'פראג', 'ויאנה', 'ברצלונה', 'מילאנו', 'ניס', 'ליסבון']
-        for city in cities_keywords:
-            if city in text:
-                return city
-        
-        return None
+        return find_destination(text)
     
     def extract_price(self, text, element):
         """חילוץ מחיר מהטקסט"""
-        import re
-        
-        # חיפוש מחירים בפורמטים שונים
-        price_patterns = [
-            r'(\d{1,4})\s*₪',
-            r'(\d{1,4})\s*שח',
-            r'₪\s*(\d{1,4})',
-            r'שח\s*(\d{1,4})',
-            r'(\d{1,4})\s*שקל',
-            r'מ\s*(\d{1,4})',
-            r'החל\s*מ\s*(\d{1,4})'
-        ]
-        
-        for pattern in price_patterns:
-            match = re.search(pattern, text)
-            if match:
-                try:
-                    return int(match.group(1))
-                except:
-                    continue
-        
-        return None
+        return find_price(text)
     
     def extract_dates(self, text, element):
         """חילוץ תאריכים מהטקסט"""
-        import re
-        
-        # חיפוש תאריכים בפורמטים שונים
-        date_patterns = [
-            r'(\d{1,2}[./]\d{1,2}[./]\d{2,4})',
-            r'(\d{1,2}\s*[בב]\w+\s*\d{4})',
-            r'(ינואר|פברואר|מרץ|אפריל|מאי|יוני|יולי|אוגוסט|ספטמבר|אוקטובר|נובמבר|דצמבר)'
-        ]
-        
-        dates = []
-        for pattern in date_patterns:
-            matches = re.findall(pattern, text)
-            dates.extend(matches)
-        
+        dates = find_dates(text)
         return dates if dates else None
     
     def is_relevant_destination(self, destination):
@@ -223,11 +447,218 @@ class FlightScraper:
         return destination in PREFERRED_DESTINATIONS
     
     def close(self):
-        """סגירת WebDriver"""
-        if self.driver:
+        """סגירת WebDriver (רק אם הסקרפר יצר אותו בעצמו)"""
+        if self.driver and self.owns_driver:
             self.driver.quit()
             logging.info("WebDriver נסגר")
 
+# גילוי ושימוש ב-API של האתר (המסלול המהיר)
+
+PRICE_KEY_HINTS = ('price', 'cost', 'amount', 'מחיר')
+DATE_VALUE_PATTERN = re.compile(r'^(\d{4}-\d{2}-\d{2})|^(\d{1,2}[./]\d{1,2}[./]\d{2,4})')
+REPLAYED_HEADERS = ('accept', 'content-type', 'x-requested-with')
+
+def flatten_record(record, prefix='', depth=0):
+    """שיטוח רשומת JSON למפתחות עם נקודות (עד עומק 3)"""
+    flat = {}
+    for key, value in record.items():
+        name = f'{prefix}{key}'
+        if isinstance(value, dict) and depth < 3:
+            flat.update(flatten_record(value, f'{name}.', depth + 1))
+        else:
+            flat[name] = value
+    return flat
+
+def iter_record_lists(data, path=()):
+    """מעבר על כל רשימות הרשומות (list of dict) בתוך מבנה JSON"""
+    if isinstance(data, list):
+        if data and all(isinstance(item, dict) for item in data[:20]):
+            yield list(path), data
+    elif isinstance(data, dict):
+        for key, value in data.items():
+            yield from iter_record_lists(value, path + (key,))
+
+def records_at_path(data, path):
+    """שליפת רשימת הרשומות לפי הנתיב שנשמר בזמן הגילוי"""
+    for key in path:
+        if not isinstance(data, dict) or key not in data:
+            return None
+        data = data[key]
+    return data if isinstance(data, list) else None
+
+def is_price_value(value):
+    """בדיקה אם ערך נראה כמו מחיר"""
+    if isinstance(value, bool):
+        return False
+    if isinstance(value, str) and value.strip().isdigit():
+        value = int(value.strip())
+    return isinstance(value, (int, float)) and 50 <= value <= 20000
+
+def infer_record_fields(records):
+    """זיהוי שדות היעד, המחיר והתאריכים ברשימת רשומות"""
+    sample = [flatten_record(r) for r in records[:50] if isinstance(r, dict)]
+    dest_hits, price_hits, date_hits = Counter(), Counter(), Counter()
+    
+    for record in sample:
+        for key, value in record.items():
+            if isinstance(value, str):
+                if find_destination(value):
+                    dest_hits[key] += 1
+                if DATE_VALUE_PATTERN.match(value.strip()):
+                    date_hits[key] += 1
+            if is_price_value(value):
+                price_hits[key] += 1
+    
+    if not dest_hits or not price_hits:
+        return None
+    
+    # שדה מחיר: עדיפות לשם שמרמז על מחיר, אחרת השדה הנפוץ ביותר
+    min_hits = max(1, len(sample) // 2)
+    price_keys = [k for k, n in price_hits.most_common() if n >= min_hits]
+    hinted = [k for k in price_keys if any(h in k.lower() for h in PRICE_KEY_HINTS)]
+    if not price_keys:
+        return None
+    
+    return {
+        'destination': dest_hits.most_common(1)[0][0],
+        'price': (hinted or price_keys)[0],
+        'dates': sorted(k for k, n in date_hits.items() if n >= min_hits)[:2]
+    }
+
+def find_flight_schema(data):
+    """איתור רשימת הטיסות בתשובת JSON ומיפוי השדות שלה"""
+    best = None
+    for path, records in iter_record_lists(data):
+        fields = infer_record_fields(records)
+        if not fields:
+            continue
+        score = sum(1 for r in records if find_destination(str(flatten_record(r).get(fields['destination'], ''))))
+        if not best or score > best[0]:
+            best = (score, {'records_path': path, 'fields': fields})
+    return best[1] if best else None
+
+def build_endpoint_record(request, schema):
+    """רשומת endpoint לשמירה - כתובת, שיטה, גוף, כותרות ומיפוי שדות"""
+    headers = {k: v for k, v in request.get('headers', {}).items() if k.lower() in REPLAYED_HEADERS}
+    return {
+        'url': request.get('url'),
+        'method': request.get('method', 'GET'),
+        'post_data': request.get('postData'),
+        'headers': headers,
+        'records_path': schema['records_path'],
+        'fields': schema['fields'],
+        'discovered_at': datetime.now().isoformat()
+    }
+
+def save_api_endpoints(endpoints):
+    """שמירת ה-endpoints שזוהו לקובץ"""
+    try:
+        with open(API_ENDPOINTS_FILE, 'w', encoding='utf-8') as f:
+            json.dump({'endpoints': endpoints}, f, ensure_ascii=False, indent=2)
+    except Exception as e:
+        logging.error(f"שגיאה בשמירת endpoints: {e}")
+
+def load_api_endpoints():
+    """טעינת ה-endpoints שזוהו בסריקות קודמות"""
+    if not os.path.exists(API_ENDPOINTS_FILE):
+        return []
+    try:
+        with open(API_ENDPOINTS_FILE, 'r', encoding='utf-8') as f:
+            return json.load(f).get('endpoints', [])
+    except Exception as e:
+        logging.error(f"שגיאה בטעינת endpoints: {e}")
+        return []
+
+def format_api_date(value):
+    """המרת תאריך ISO מה-API לפורמט dd/mm/YYYY שבו משתמש שאר המערכת"""
+    text = str(value).strip()
+    match = DATE_VALUE_PATTERN.match(text)
+    if match and match.group(1):
+        return datetime.strptime(match.group(1), '%Y-%m-%d').strftime('%d/%m/%Y')
+    return text
+
+class ApiFlightClient:
+    """המסלול המהיר: קריאה ישירה ל-endpoints שזוהו, עם session של requests עם pooling"""
+    def __init__(self):
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=8)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+        self.session.headers.update({
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
+            'Accept': 'application/json, text/plain, */*',
+            'Accept-Language': 'he-IL,he;q=0.8,en-US;q=0.5,en;q=0.3',
+            'Referer': TUSTUS_URL
+        })
+    
+    def fetch_flights(self):
+        """שליפת טיסות מה-API; מחזיר None אם אין endpoints או שהתשובה לא עברה אימות סכמה"""
+        endpoints = load_api_endpoints()
+        if not endpoints:
+            return None
+        
+        flights = []
+        for endpoint in endpoints:
+            endpoint_flights = self.fetch_endpoint(endpoint)
+            if endpoint_flights is None:
+                return None
+            flights.extend(endpoint_flights)
+        
+        logging.info(f"נמצאו {len(flights)} טיסות רלוונטיות (API ישיר)")
+        return flights
+    
+    def fetch_endpoint(self, endpoint):
+        """קריאה ל-endpoint בודד ופרסור הרשומות לפי מיפוי השדות"""
+        try:
+            response = self.session.request(
+                endpoint.get('method', 'GET'), endpoint['url'],
+                data=endpoint.get('post_data'), headers=endpoint.get('headers'),
+                timeout=API_REQUEST_TIMEOUT
+            )
+            response.raise_for_status()
+            data = response.json()
+        except Exception as e:
+            logging.warning(f"קריאה ל-API נכשלה ({endpoint.get('url')}): {e}")
+            return None
+        
+        records = records_at_path(data, endpoint.get('records_path', []))
+        fields = endpoint.get('fields', {})
+        if not self.validate_records(records, fields):
+            logging.warning(f"תשובת ה-API לא עברה אימות סכמה ({endpoint.get('url')})")
+            return None
+        
+        flights = []
+        for record in records:
+            flight = self.build_flight(flatten_record(record), fields)
+            if flight:
+                flights.append(flight)
+        return flights
+    
+    def validate_records(self, records, fields):
+        """אימות סכמה: רשימה לא ריקה, ושדות היעד והמחיר קיימים ברוב הרשומות"""
+        if not records or not fields.get('destination') or not fields.get('price'):
+            return False
+        flat = [flatten_record(r) for r in records if isinstance(r, dict)]
+        if len(flat) != len(records):
+            return False
+        with_fields = sum(1 for r in flat if fields['destination'] in r and fields['price'] in r)
+        return with_fields * 2 >= len(flat)
+    
+    def build_flight(self, record, fields):
+        """בניית רשומת טיסה מרשומת API משוטחת"""
+        destination = find_destination(str(record.get(fields['destination'], '')))
+        if not destination or destination in EXCLUDED_DESTINATIONS:
+            return None
+        
+        price = record.get(fields['price'])
+        if not is_price_value(price):
+            return None
+        
+        dates = [format_api_date(record[k]) for k in fields.get('dates', []) if record.get(k)]
+        full_text = ' | '.join(str(v) for v in record.values() if isinstance(v, (str, int, float)) and str(v).strip())
+        return Flight(destination, int(float(price)), dates, full_text[:500], datetime.now().isoformat(),
+                      TUSTUS_URL, method='api')
+
 def test_scraper():
     """פונקציה לבדיקת הסקרפר"""
     scraper = FlightScraper()
@@ -235,9 +666,9 @@ def test_scraper():
         flights = scraper.scrape_flights()
         print(f"נמצאו {len(flights)} טיסות:")
         for flight in flights:
-            print(f"- {flight['destination']}: {flight['price']}₪")
-            print(f"  תאריכים: {flight['dates']}")
-            print(f"  טקסט מלא: {flight['full_text'][:100]}...")
+            print(f"- {flight.destination}: {flight.price}₪")
+            print(f"  תאריכים: {list(flight.dates)}")
+            print(f"  טקסט מלא: {flight.full_text[:100]}...")
             print("-" * 50)
     finally:
         scraper.close()
@@ -0,0 +1,205 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+"""
+פרסור HTML במעבר יחיד לבלוקי טקסט ברמת העלים, עם קשרי ההכלה ביניהם.
+משתמש ב-selectolax או lxml כשהם מותקנים, ובגיבוי ב-BeautifulSoup.
+"""
+
+import logging
+from config import HTML_PARSER_BACKEND
+
+# תגיות שהטקסט שלהן לא מוצג למשתמש
+SKIPPED_TAGS = {'script', 'style', 'noscript', 'template', 'svg', 'head', 'iframe'}
+
+class TextBlock:
+    """הטקסט הישיר של אלמנט אחד (ללא טקסט של צאצאיו) ומיקומו בעץ.
+
+    segments[k] הוא הטקסט שמופיע לפני הילד ה-k (והאחרון - אחרי הילד האחרון),
+    כך שאפשר לשחזר את טקסט תת-העץ בסדר המסמך.
+    """
+    __slots__ = ('index', 'parent', 'tag', 'classes', 'text', 'segments', 'href', 'children')
+
+    def __init__(self, index, parent, tag, classes, segments, href=None):
+        self.index = index
+        self.parent = parent
+        self.tag = tag
+        self.classes = classes
+        self.segments = segments
+        self.text = ' '.join(s for s in segments if s)
+        self.href = href
+        self.children = []
+
+def join_text(parts):
+    """איחוד קטעי טקסט ישירים של אלמנט"""
+    return ' '.join(p.strip() for p in parts if p and p.strip())
+
+def decode_content(content):
+    """המרת גוף התשובה למחרוזת - lxml ו-selectolax לא מזהים קידוד עברית מבתים גולמיים"""
+    if isinstance(content, bytes):
+        try:
+            return content.decode('utf-8')
+        except UnicodeDecodeError:
+            return content.decode('windows-1255', errors='replace')
+    return content
+
+def available_backends():
+    """מנועי הפרסור המותקנים, לפי סדר עדיפות"""
+    backends = []
+    try:
+        import selectolax.lexbor  # noqa: F401
+        backends.append('selectolax')
+    except ImportError:
+        pass
+    try:
+        import lxml.html  # noqa: F401
+        backends.append('lxml')
+    except ImportError:
+        pass
+    backends.append('bs4')
+    return backends
+
+def resolve_backend(backend=None):
+    """בחירת מנוע פרסור - המוגדר אם הוא מותקן, אחרת המהיר ביותר שזמין"""
+    backend = backend or HTML_PARSER_BACKEND
+    backends = available_backends()
+    if backend in backends:
+        return backend
+    if backend != 'auto':
+        logging.warning(f"מנוע הפרסור {backend} לא מותקן, משתמש ב-{backends[0]}")
+    return backends[0]
+
+def add_block(blocks, parent, tag, classes, segments, href):
+    """הוספת בלוק לרשימה ורישומו כילד של ההורה"""
+    block = TextBlock(len(blocks), parent, tag, classes, segments, href)
+    blocks.append(block)
+    if parent >= 0:
+        blocks[parent].children.append(block.index)
+    return block.index
+
+def parse_with_lxml(content):
+    """מעבר יחיד על עץ lxml"""
+    from lxml import html as lxml_html
+
+    blocks = []
+    root = lxml_html.document_fromstring(decode_content(content))
+    stack = [(root, -1)]
+    while stack:
+        element, parent = stack.pop()
+        # הטקסט הישיר: הטקסט שלפני הילד הראשון וה-tail של כל ילד (tail של הערה או
+        # תגית מדולגת מצטרף למקטע הנוכחי)
+        segments = [[element.text]]
+        children = []
+        for child in element:
+            if isinstance(child.tag, str) and child.tag not in SKIPPED_TAGS:
+                children.append(child)
+                segments.append([])
+            segments[-1].append(child.tail)
+        index = add_block(blocks, parent, element.tag, element.get('class', ''),
+                          [join_text(seg) for seg in segments], element.get('href'))
+        for child in reversed(children):
+            stack.append((child, index))
+    return blocks
+
+def parse_with_selectolax(content):
+    """מעבר יחיד על עץ selectolax (מנוע lexbor)"""
+    from selectolax.lexbor import LexborHTMLParser
+
+    blocks = []
+    root = LexborHTMLParser(decode_content(content)).root
+    if root is None:
+        return blocks
+    stack = [(root, -1)]
+    while stack:
+        node, parent = stack.pop()
+        segments = [[]]
+        children = []
+        for child in node.iter(include_text=True):
+            if child.tag == '-text':
+                segments[-1].append(child.text_content)
+            elif not child.tag.startswith('-') and child.tag not in SKIPPED_TAGS:
+                children.append(child)
+                segments.append([])
+        index = add_block(blocks, parent, node.tag, node.attributes.get('class') or '',
+                          [join_text(seg) for seg in segments], node.attributes.get('href'))
+        for child in reversed(children):
+            stack.append((child, index))
+    return blocks
+
+def parse_with_bs4(content):
+    """מעבר יחיד על עץ BeautifulSoup (גיבוי כשאין מנוע מהיר)"""
+    from bs4 import BeautifulSoup, Comment, NavigableString, Tag
+
+    blocks = []
+    soup = BeautifulSoup(content, 'html.parser')
+    stack = [(soup, -1)]
+    while stack:
+        element, parent = stack.pop()
+        segments = [[]]
+        children = []
+        for child in element.children:
+            if isinstance(child, Tag):
+                if child.name not in SKIPPED_TAGS:
+                    children.append(child)
+                    segments.append([])
+            elif isinstance(child, NavigableString) and not isinstance(child, Comment):
+                segments[-1].append(str(child))
+        classes = ' '.join(element.get('class', [])) if element is not soup else ''
+        href = element.get('href') if element is not soup else None
+        index = add_block(blocks, parent, element.name, classes, [join_text(seg) for seg in segments], href)
+        for child in reversed(children):
+            stack.append((child, index))
+    return blocks
+
+PARSERS = {
+    'selectolax': parse_with_selectolax,
+    'lxml': parse_with_lxml,
+    'bs4': parse_with_bs4
+}
+
+def parse_text_blocks(content, backend=None):
+    """פרסור HTML לרשימת בלוקי טקסט בסדר המסמך - הורה תמיד לפני צאצאיו"""
+    return PARSERS[resolve_backend(backend)](content)
+
+def iter_postorder(blocks):
+    """אינדקסי הבלוקים כך שכל בלוק בא אחרי כל צאצאיו, והאחים לפי סדר המסמך"""
+    stack = [(block.index, 0) for block in reversed(blocks) if block.parent < 0]
+    while stack:
+        index, position = stack.pop()
+        children = blocks[index].children
+        if position < len(children):
+            stack.append((index, position + 1))
+            stack.append((children[position], 0))
+        else:
+            yield index
+
+def subtree_text(blocks, index):
+    """הטקסט המלא של תת-עץ, בסדר המסמך (מקטעי טקסט משולבים בין הילדים)"""
+    parts = []
+    stack = [(index, 0)]
+    while stack:
+        block_index, position = stack.pop()
+        block = blocks[block_index]
+        if block.segments[position]:
+            parts.append(block.segments[position])
+        if position < len(block.children):
+            stack.append((block_index, position + 1))
+            stack.append((block.children[position], 0))
+    return ' '.join(parts)
+
+def find_href(blocks, index):
+    """הקישור של בלוק - מהבלוק או מאב קדמון (כרטיס עטוף ב-a), אחרת מהצאצא הראשון עם קישור"""
+    def usable(href):
+        return href and not href.startswith(('#', 'javascript:'))
+
+    ancestor = index
+    while ancestor >= 0:
+        if usable(blocks[ancestor].href):
+            return blocks[ancestor].href
+        ancestor = blocks[ancestor].parent
+    stack = list(reversed(blocks[index].children))
+    while stack:
+        block = blocks[stack.pop()]
+        if usable(block.href):
+            return block.href
+        stack.extend(reversed(block.children))
+    return None
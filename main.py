@@ -1,15 +1,24 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 
-import schedule
 import time
 import logging
 import signal
 import sys
-from datetime import datetime
+import cProfile
+import pstats
 from flight_monitor import FlightMonitor
 from email_sender import EmailSender
-from config import CHECK_INTERVAL_MINUTES, FOCUS_ON_NEW_FLIGHTS_ONLY, IGNORE_PRICE_CHANGES
+from driver_pool import DriverPool
+import tracing
+import metrics
+from async_scheduler import AsyncScheduler
+from adaptive_schedule import AdaptiveSchedule
+from notification_outbox import NotificationOutbox
+from config import (
+    CHECK_INTERVAL_MINUTES, FOCUS_ON_NEW_FLIGHTS_ONLY, IGNORE_PRICE_CHANGES, DRIVER_PREWARM, PROFILE_FILE,
+    METRICS_ENABLED, SCHEDULE_MODE, SHUTDOWN_TIMEOUT_SECONDS
+)
 
 # הגדרת לוגים
 logging.basicConfig(
@@ -23,8 +32,19 @@ logging.basicConfig(
 
 class FlightAlertSystem:
     def __init__(self):
-        self.monitor = FlightMonitor()
+        # מאגר סשנים חמים של Chrome שנשמר לאורך כל חיי המערכת
+        self.driver_pool = DriverPool()
+        self.monitor = FlightMonitor(driver_pool=self.driver_pool)
         self.email_sender = EmailSender()
+        # תור התראות עמיד - המחזור רק מוסיף לתור, והשליחה מתבצעת ברקע
+        self.outbox = NotificationOutbox(self.email_sender)
+        self.metrics_server = None
+        self.scheduler = None
+        # תזמון מותאם - נלמד מזמני ההופעה של טיסות חדשות לפי שעה בשבוע
+        self.adaptive = None
+        if SCHEDULE_MODE == 'adaptive':
+            self.adaptive = AdaptiveSchedule()
+            self.adaptive.seed(self.monitor.store.arrival_times())
         self.running = True
         
         # הגדרת טיפול בסיגנלים לסיום נקי
@@ -35,46 +55,117 @@ class FlightAlertSystem:
         """טיפול בסיגנל סיום"""
         logging.info(f"התקבל סיגנל {signum}, מתחיל סיום נקי...")
         self.running = False
+        self.monitor.request_stop()
+        if self.scheduler:
+            self.scheduler.stop()
     
     def check_and_notify(self):
         """פונקציה עיקרית לבדיקה ושליחת התראות - מותאמת לטיסות רגע אחרון"""
+        # מחזור אחד ב-trace: הבדיקה והשליחה נכתבות כרשומה אחת
+        with tracing.cycle('check_and_notify'):
+            self.notify_cycle()
+    
+    def notify_cycle(self):
+        """בדיקה ושליחת מייל אם נמצאו טיסות חדשות או ירידות מחיר"""
         try:
             logging.info("מתחיל בדיקת טיסות רגע אחרון...")
             
             # בדיקת עדכונים
+            metrics.CYCLES.inc()
             result = self.monitor.check_for_updates()
             
             if 'error' in result:
+                metrics.CYCLE_FAILURES.inc()
                 logging.error(f"שגיאה בבדיקת טיסות: {result['error']}")
                 return
             
             new_flights = result.get('new_flights', [])
             price_changes = result.get('price_changes', [])
+            self.record_cycle_metrics(result)
+            if self.adaptive and not result.get('first_run'):
+                self.record_arrivals(len(new_flights))
             
-            # שליחת מייל רק אם יש טיסות חדשות (כי המחירים קבועים)
-            if new_flights:
-                logging.info(f"נמצאו {len(new_flights)} טיסות רגע אחרון חדשות")
+            # שליחת מייל רק אם יש טיסות חדשות או ירידות מחיר
+            if new_flights or price_changes:
+                logging.info(f"נמצאו {len(new_flights)} טיסות רגע אחרון חדשות, {len(price_changes)} ירידות מחיר")
                 
                 # קבלת סטטיסטיקות
                 stats = self.monitor.get_statistics()
                 
-                # שליחת מייל
-                success = self.email_sender.send_update_email(new_flights, price_changes, stats)
-                
-                if success:
-                    logging.info("מייל התראה על טיסות חדשות נשלח בהצלחה")
-                else:
-                    logging.error("שגיאה בשליחת מייל התראה")
+                # הוספה לתור ההתראות - ה-worker שולח ברקע ומנסה שוב אם השליחה נכשלת
+                self.outbox.enqueue(new_flights, price_changes, stats)
             else:
                 logging.info("לא נמצאו טיסות רגע אחרון חדשות")
                 
         except Exception as e:
+            metrics.CYCLE_FAILURES.inc()
             logging.error(f"שגיאה כללית בבדיקת טיסות: {e}")
     
+    def record_cycle_metrics(self, result):
+        """עדכון המונים וההיסטוגרמות מתוצאת בדיקה שהצליחה"""
+        timings = result.get('timings', {})
+        metrics.FLIGHTS_SEEN.inc(result['total_flights'])
+        metrics.NEW_FLIGHTS.inc(len(result.get('new_flights', [])))
+        metrics.PRICE_DROPS.inc(len(result.get('price_changes', [])))
+        metrics.TRACKED_FLIGHTS.set(result['total_flights'])
+        metrics.LAST_CHECK.set(time.time())
+        if timings.get('tier_seconds') is not None:
+            metrics.SCRAPE_SECONDS.observe(timings['tier_seconds'], tier=timings.get('tier'))
+    
+    def record_arrivals(self, count):
+        """עדכון פרופיל ההגעה ודיווח על המרווח הבא וההשהיה הצפויה"""
+        self.adaptive.record(count)
+        report = self.adaptive.report()
+        metrics.EXPECTED_DETECTION_DELAY.set(report['expected_delay_minutes'] * 60)
+        logging.info(f"תזמון מותאם: בדיקה הבאה בעוד {report['next_interval_minutes']:.0f} דקות, "
+                     f"השהיית זיהוי צפויה {report['expected_delay_minutes']:.1f} דקות "
+                     f"(מול {report['fixed_delay_minutes']:.1f} במרווח קבוע, "
+                     f"{report['checks_per_week']} בדיקות בשבוע מול {report['fixed_checks_per_week']})")
+    
+    def scheduled_check(self):
+        """בדיקה מתוזמנת, ואחריה חימום סשן Chrome לקראת הבדיקה הבאה"""
+        self.check_and_notify()
+        if DRIVER_PREWARM and self.running:
+            self.driver_pool.prewarm_async()
+    
+    def shutdown(self):
+        """שחרור משאבים - סגירת סשני Chrome במאגר"""
+        # מחזור שעדיין רץ ב-thread משתמש במאגר, במסד ובתור - מבקשים ממנו לעצור וממתינים לו
+        self.running = False
+        self.monitor.request_stop()
+        if self.scheduler and not self.scheduler.join(SHUTDOWN_TIMEOUT_SECONDS):
+            logging.warning(f"המחזור שרץ לא הסתיים תוך {SHUTDOWN_TIMEOUT_SECONDS} שניות - סוגר את המשאבים בכל זאת")
+        if self.metrics_server:
+            self.metrics_server.close()
+        self.outbox.close()
+        self.monitor.close()
+        self.driver_pool.close()
+    
+    def run_profile(self, limit=30):
+        """הרצת מחזור אחד תחת cProfile והדפסת הפונקציות הכבדות (רק ה-thread הראשי נמדד)"""
+        logging.info("מריץ בדיקה חד-פעמית תחת profiler...")
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            self.check_and_notify()
+        finally:
+            profiler.disable()
+        profiler.dump_stats(PROFILE_FILE)
+        self.outbox.drain()
+        
+        stats = pstats.Stats(profiler).strip_dirs()
+        print(f"\n{'=' * 30} לפי זמן מצטבר {'=' * 30}")
+        stats.sort_stats('cumulative').print_stats(limit)
+        print(f"\n{'=' * 30} לפי זמן עצמי {'=' * 30}")
+        stats.sort_stats('tottime').print_stats(limit)
+        logging.info(f"נתוני ה-profiler נשמרו ל-{PROFILE_FILE} (לצפייה: python -m pstats {PROFILE_FILE})")
+    
     def run_once(self):
         """הרצה חד-פעמית"""
         logging.info("מריץ בדיקה חד-פעמית לטיסות רגע אחרון...")
         self.check_and_notify()
+        # אין worker ברקע בהרצה חד-פעמית - שליחת מה שבתור (כולל התראות שנכשלו בהרצות קודמות והגיע זמנן)
+        self.outbox.drain()
         logging.info("בדיקה חד-פעמית הושלמה")
     
     def run_continuous(self):
@@ -86,25 +177,26 @@ class FlightAlertSystem:
         
         if IGNORE_PRICE_CHANGES:
             logging.info("מצב מחירים: מעקב שינויי מחירים מושבת (מחירים קבועים)")
+        else:
+            logging.info("מצב מחירים: התראה על ירידות מחיר")
         
-        # הגדרת תזמון
-        schedule.every(CHECK_INTERVAL_MINUTES).minutes.do(self.check_and_notify)
+        # מדדים מצטברים לאורך חיי התהליך, לגרידה מקומית
+        if METRICS_ENABLED:
+            self.metrics_server = metrics.MetricsServer()
+            self.metrics_server.start()
         
-        # הרצת בדיקה ראשונית
-        logging.info("מריץ בדיקה ראשונית...")
-        self.check_and_notify()
+        # שליחת ההתראות ברקע, כולל מה שנשאר בתור מהרצה קודמת
+        self.outbox.start()
         
-        # לולאה עיקרית
-        while self.running:
-            try:
-                schedule.run_pending()
-                time.sleep(30)  # בדיקה כל 30 שניות אם יש משימות ממתינות
-            except KeyboardInterrupt:
-                logging.info("התקבל Ctrl+C, יוצא...")
-                break
-            except Exception as e:
-                logging.error(f"שגיאה בלולאה העיקרית: {e}")
-                time.sleep(60)  # המתנה דקה לפני המשך
+        # תזמון על לולאת asyncio - בדיקה ראשונית מיד, ואז כל CHECK_INTERVAL_MINUTES בדיוק
+        # (או במרווח שמשתנה לפי השעה בשבוע, בתזמון המותאם)
+        logging.info("מריץ בדיקה ראשונית...")
+        interval = self.adaptive.next_interval_seconds if self.adaptive else CHECK_INTERVAL_MINUTES * 60
+        self.scheduler = AsyncScheduler(self.scheduled_check, interval)
+        try:
+            self.scheduler.run()
+        except KeyboardInterrupt:
+            logging.info("התקבל Ctrl+C, יוצא...")
         
         logging.info("מערכת ניטור טיסות רגע אחרון נסגרה")
     
@@ -125,10 +217,21 @@ class FlightAlertSystem:
             print(f"🔍 פוקוס ניטור: {stats.get('monitoring_focus', 'כל השינויים')}")
             print(f"💰 מעקב מחירים: {stats.get('price_monitoring', 'פעיל')}")
             print(f"⏱️  תדירות בדיקה: {stats.get('check_interval', f'כל {CHECK_INTERVAL_MINUTES} דקות')}")
+            if self.adaptive:
+                report = self.adaptive.report()
+                print(f"   תזמון מותאם: כעת כל {report['next_interval_minutes']:.0f} דקות, "
+                      f"{report['checks_per_week']} בדיקות בשבוע (קבוע: {report['fixed_checks_per_week']})")
+                print(f"   השהיית זיהוי צפויה: {report['expected_delay_minutes']:.1f} דקות "
+                      f"(קבוע: {report['fixed_delay_minutes']:.1f}), נלמד מ-{report['weeks_observed']} שבועות")
+                if report['busiest_hours']:
+                    print(f"   שעות עמוסות: {', '.join(report['busiest_hours'])}")
             
             print(f"🕒 בדיקה אחרונה: {stats['last_check'] or 'טרם בוצעה'}")
             
             print(f"📧 רשימת תפוצה: {len(self.email_sender.mailing_list)} נמענים")
+            outbox = self.outbox.counts()
+            if outbox.get('pending') or outbox.get('failed'):
+                print(f"   תור התראות: {outbox.get('pending', 0)} ממתינות, {outbox.get('failed', 0)} נכשלו סופית")
             if self.email_sender.mailing_list:
                 for email in self.email_sender.mailing_list:
                     print(f"   • {email}")
@@ -136,7 +239,10 @@ class FlightAlertSystem:
             print("=" * 70)
             print("💡 טיפים:")
             print("   • המערכת מתמקדת בטיסות רגע אחרון לימים הקרובים")
-            print("   • מחירים קבועים - ההתמקדות בטיסות חדשות בלבד")
+            if IGNORE_PRICE_CHANGES:
+                print("   • מחירים קבועים - ההתמקדות בטיסות חדשות בלבד")
+            else:
+                print("   • ירידות מחיר בטיסות קיימות נשלחות גם הן במייל")
             print("   • טיסות רגע אחרון משתנות מהר - בדוק מיד כשמגיע מייל!")
             print("=" * 70)
             
@@ -156,10 +262,11 @@ def main():
   python main.py --continuous        # הרצה רציפה (ברירת מחדל)
   python main.py --status            # הצגת סטטוס
   python main.py --test-email        # בדיקת מייל
+  python main.py --profile           # מחזור אחד תחת profiler
 
 מאפיינים:
 • התמקדות בטיסות רגע אחרון חדשות
-• מחירים קבועים (ללא מעקב שינויי מחירים)
+• התראה על ירידות מחיר (IGNORE_PRICE_CHANGES=true לביטול)
 • בדיקה כל שעה (מתאים לטיסות רגע אחרון)
         """
     )
@@ -172,6 +279,8 @@ def main():
                        help='הצגת סטטוס המערכת')
     parser.add_argument('--test-email', action='store_true',
                        help='שליחת מייל בדיקה')
+    parser.add_argument('--profile', action='store_true',
+                       help='הרצת מחזור אחד תחת profiler והצגת הפונקציות הכבדות')
     
     args = parser.parse_args()
     
@@ -188,6 +297,8 @@ def main():
                 print("✅ מייל בדיקה נשלח בהצלחה!")
             else:
                 print("❌ שגיאה בשליחת מייל בדיקה")
+        elif args.profile:
+            alert_system.run_profile()
         elif args.run_once:
             alert_system.run_once()
         else:
@@ -199,6 +310,8 @@ def main():
     except Exception as e:
         logging.error(f"שגיאה כללית: {e}")
         sys.exit(1)
+    finally:
+        alert_system.shutdown()
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,165 @@
+import logging
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from config import METRICS_HOST, METRICS_PORT
+
+# גבולות ברירת מחדל לדליים (שניות) - ממילישניות ועד דקות
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+
+def format_labels(labels, extra=()):
+    """תוויות בפורמט Prometheus: {name="value",...}"""
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + '}'
+
+def format_value(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+class Metric:
+    """מדד עם סדרה לכל צירוף תוויות; העדכונים מצטברים תחת נעילה"""
+    kind = None
+
+    def __init__(self, name, description):
+        self.name = name
+        self.description = description
+        self.lock = threading.Lock()
+        self.series = {}
+
+    def header(self):
+        return [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + amount
+
+    def render(self):
+        with self.lock:
+            # מונה שעוד לא עלה מוצג כאפס, כדי ש-rate() יתחיל מהגרידה הראשונה
+            series = dict(self.series) or {(): 0}
+        return self.header() + [f"{self.name}{format_labels(k)} {format_value(v)}" for k, v in sorted(series.items())]
+
+class Gauge(Metric):
+    kind = 'gauge'
+
+    def set(self, value, **labels):
+        with self.lock:
+            self.series[tuple(sorted(labels.items()))] = value
+
+    def render(self):
+        with self.lock:
+            series = dict(self.series)
+        return self.header() + [f"{self.name}{format_labels(k)} {format_value(v)}" for k, v in sorted(series.items())]
+
+class Histogram(Metric):
+    """היסטוגרמה - מונה לכל דלי (לא מצטבר), סכום וספירה; ההצטברות מחושבת בהצגה"""
+    kind = 'histogram'
+
+    def __init__(self, name, description, buckets=DEFAULT_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        with self.lock:
+            counts, total = self.series.get(key, ([0] * (len(self.buckets) + 1), 0.0))
+            index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+            counts[index] += 1
+            self.series[key] = (counts, total + value)
+
+    def render(self):
+        with self.lock:
+            series = {k: (list(counts), total) for k, (counts, total) in self.series.items()}
+        lines = self.header()
+        for key, (counts, total) in sorted(series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float('inf'),), counts):
+                cumulative += count
+                le = '+Inf' if bound == float('inf') else format_value(bound)
+                lines.append(f"{self.name}_bucket{format_labels(key, [('le', le)])} {cumulative}")
+            lines.append(f"{self.name}_sum{format_labels(key)} {format_value(round(total, 6))}")
+            lines.append(f"{self.name}_count{format_labels(key)} {cumulative}")
+        return lines
+
+class Registry:
+    def __init__(self):
+        self.metrics = []
+
+    def register(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self):
+        """כל המדדים בפורמט הטקסט של Prometheus"""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+REGISTRY = Registry()
+
+CYCLES = REGISTRY.register(Counter('tustus_cycles_total', 'Check cycles run'))
+CYCLE_FAILURES = REGISTRY.register(Counter('tustus_cycle_failures_total', 'Check cycles that ended with an error'))
+FLIGHTS_SEEN = REGISTRY.register(Counter('tustus_flights_seen_total', 'Relevant flights seen across all cycles'))
+NEW_FLIGHTS = REGISTRY.register(Counter('tustus_new_flights_total', 'New flights detected'))
+PRICE_DROPS = REGISTRY.register(Counter('tustus_price_drops_total', 'Price drops detected'))
+EMAILS = REGISTRY.register(Counter('tustus_emails_total', 'Alert emails by result'))
+HTTP_CACHE_RESULTS = REGISTRY.register(Counter(
+    'tustus_http_cache_total', 'Simple-scraper page fetches by result (requests, not_modified, digest_hits, parses)'))
+HTTP_DOWNLOADED_BYTES = REGISTRY.register(Counter(
+    'tustus_http_downloaded_bytes_total', 'Page bytes downloaded by the simple scraper'))
+TRACKED_FLIGHTS = REGISTRY.register(Gauge('tustus_tracked_flights', 'Flights found in the last cycle'))
+LAST_CHECK = REGISTRY.register(Gauge('tustus_last_check_timestamp_seconds', 'Unix time of the last completed cycle'))
+SCRAPE_SECONDS = REGISTRY.register(Histogram('tustus_scrape_duration_seconds', 'Scrape duration by tier'))
+PAGE_LOAD_SECONDS = REGISTRY.register(Histogram('tustus_page_load_duration_seconds', 'Chrome page load until cards are ready'))
+EXPECTED_DETECTION_DELAY = REGISTRY.register(Gauge(
+    'tustus_expected_detection_delay_seconds', 'Expected detection delay under the adaptive schedule'))
+DETECTION_TO_EMAIL_SECONDS = REGISTRY.register(Histogram(
+    'tustus_detection_to_email_seconds', 'Time from detecting a new flight to sending its alert email'))
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] not in ('/', '/metrics'):
+            self.send_error(404)
+            return
+        body = REGISTRY.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # בלי שורת לוג לכל גרידה
+        pass
+
+class MetricsServer:
+    """שרת HTTP מקומי שמגיש את המדדים ב-/metrics, ב-thread ברקע"""
+    def __init__(self, host=METRICS_HOST, port=METRICS_PORT):
+        self.host = host
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        try:
+            self.server = ThreadingHTTPServer((self.host, self.port), MetricsHandler)
+        except OSError as e:
+            logging.error(f"לא ניתן להפעיל את שרת המדדים על {self.host}:{self.port}: {e}")
+            return False
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server', daemon=True)
+        self.thread.start()
+        logging.info(f"מדדים זמינים ב-http://{self.host}:{self.server.server_port}/metrics")
+        return True
+
+    def close(self):
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
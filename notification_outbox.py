@@ -0,0 +1,237 @@
+import json
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import threading
+from datetime import datetime, timedelta
+from typing import List, Dict
+from config import (
+    OUTBOX_DB_FILE, OUTBOX_RETRY_BASE_SECONDS, OUTBOX_RETRY_MAX_SECONDS, OUTBOX_MAX_ATTEMPTS, OUTBOX_RETENTION_DAYS
+)
+from flight_model import Flight
+from flight_identity import flight_signature, price_identity
+import metrics
+
+def notification_key(new_flights, price_changes):
+    """מפתח idempotency להתראה - התוכן וזמן הזיהוי, כך שדיל שנעלם וחזר מקבל התראה חדשה"""
+    parts = sorted(f"{flight_signature(f)}@{f.detected_at or ''}" for f in new_flights)
+    parts += sorted(f"{price_identity(c['flight'])}:{c['new_price']}@{c.get('detected_at') or ''}"
+                    for c in price_changes)
+    return hashlib.blake2b('\x1f'.join(parts).encode('utf-8'), digest_size=16).hexdigest()
+
+def json_default(value):
+    # הסטטיסטיקות מכילות set של יעדים
+    if isinstance(value, (set, frozenset)):
+        return sorted(value)
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+class NotificationOutbox:
+    """תור התראות עמיד על הדיסק (טבלת SQLite), שנשלח ע"י thread ברקע.
+
+    מחזור הבדיקה רק כותב שורה ל-outbox וממשיך - SMTP איטי או נופל לא מעכב את הסריקה הבאה.
+    שליחה שנכשלה נשארת בתור ומנוסה שוב בהמתנה שמכפילה את עצמה (עד תקרה ומספר ניסיונות מרבי),
+    והתור נטען מחדש אחרי הפעלה מחדש של התהליך.
+    מפתח ה-idempotency (תוכן + זמן הזיהוי) הוא מפתח הטבלה: אותה התראה נכנסת פעם אחת בלבד,
+    ושורה שסומנה כנשלחה לא נשלחת שוב. אם התהליך נפל בין השליחה לסימון, השורה נשלחת שוב עם אותו Message-ID
+    (נגזר מהמפתח) כדי ששרתי הדואר יזהו את הכפילות.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS outbox (
+            idempotency_key TEXT PRIMARY KEY,
+            payload TEXT NOT NULL,
+            status TEXT NOT NULL DEFAULT 'pending',
+            attempts INTEGER NOT NULL DEFAULT 0,
+            next_attempt_at REAL NOT NULL,
+            last_error TEXT,
+            created_at TEXT NOT NULL,
+            sent_at TEXT
+        );
+        CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+    """
+
+    def __init__(self, sender, db_file=OUTBOX_DB_FILE, retry_base_seconds=OUTBOX_RETRY_BASE_SECONDS,
+                 retry_max_seconds=OUTBOX_RETRY_MAX_SECONDS, max_attempts=OUTBOX_MAX_ATTEMPTS):
+        self.sender = sender
+        self.db_file = db_file
+        self.retry_base_seconds = retry_base_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.max_attempts = max_attempts
+        # חיבור אחד משותף ל-thread הראשי ול-worker, מוגן בנעילה; השליחה עצמה מתבצעת מחוץ לנעילה
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_file, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript(self.SCHEMA)
+        self.wake = threading.Event()
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.recover()
+
+    def recover(self):
+        """התראות שנקטעו באמצע שליחה (התהליך נפל) חוזרות לתור, וניקוי התראות ישנות שנשלחו"""
+        cutoff = (datetime.now() - timedelta(days=OUTBOX_RETENTION_DAYS)).isoformat()
+        with self.lock, self.conn:
+            interrupted = self.conn.execute(
+                "UPDATE outbox SET status = 'pending' WHERE status = 'sending'").rowcount
+            self.conn.execute("DELETE FROM outbox WHERE status = 'sent' AND sent_at < ?", (cutoff,))
+            pending = self.conn.execute("SELECT COUNT(*) FROM outbox WHERE status = 'pending'").fetchone()[0]
+        if interrupted:
+            logging.warning(f"{interrupted} התראות נקטעו באמצע שליחה - יישלחו שוב עם אותו Message-ID")
+        if pending:
+            logging.info(f"{pending} התראות ממתינות בתור מהרצה קודמת")
+
+    def enqueue(self, new_flights: List[Flight], price_changes: List[Dict], stats: Dict):
+        """הוספת התראה לתור; מחזיר את המפתח, או None אם התראה זהה כבר קיימת"""
+        key = notification_key(new_flights, price_changes)
+        payload = json.dumps({
+            'new_flights': [f.to_dict() for f in new_flights],
+            'price_changes': [dict(c, flight=c['flight'].to_dict()) for c in price_changes],
+            'stats': stats
+        }, ensure_ascii=False, default=json_default)
+        with self.lock, self.conn:
+            inserted = self.conn.execute(
+                "INSERT OR IGNORE INTO outbox (idempotency_key, payload, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?)", (key, payload, time.time(), datetime.now().isoformat())).rowcount
+        if not inserted:
+            logging.info(f"התראה {key[:8]} כבר נמצאת בתור - לא נוספה שוב")
+            return None
+        logging.info(f"התראה {key[:8]} נוספה לתור השליחה")
+        self.wake.set()
+        return key
+
+    def start(self):
+        """הפעלת ה-worker ששולח את ההתראות ברקע"""
+        if self.thread and self.thread.is_alive():
+            return
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self.worker, name='notification-outbox', daemon=True)
+        self.thread.start()
+
+    def worker(self):
+        while not self.stop_event.is_set():
+            self.wake.clear()
+            try:
+                self.drain()
+            except Exception as e:
+                logging.error(f"שגיאה בתור ההתראות: {e}")
+            self.wake.wait(timeout=self.seconds_until_due())
+
+    def seconds_until_due(self):
+        """זמן ההמתנה עד ההתראה הבאה שמגיע זמנה; בלי התראות ממתינות - עד שתתווסף אחת"""
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT MIN(next_attempt_at) FROM outbox WHERE status = 'pending'").fetchone()
+        if row[0] is None:
+            return None
+        return max(0.0, row[0] - time.time())
+
+    def drain(self):
+        """שליחת כל ההתראות שהגיע זמנן, לפי סדר ההוספה; מחזיר כמה נשלחו"""
+        sent = 0
+        while not self.stop_event.is_set():
+            row = self.claim_next()
+            if row is None:
+                break
+            sent += self.deliver(*row)
+        return sent
+
+    def claim_next(self):
+        """סימון ההתראה הבאה שהגיע זמנה כ"בשליחה" - רק מי שסימן אותה שולח אותה"""
+        with self.lock, self.conn:
+            row = self.conn.execute(
+                "SELECT idempotency_key, payload, attempts FROM outbox WHERE status = 'pending' "
+                "AND next_attempt_at <= ? ORDER BY created_at LIMIT 1", (time.time(),)).fetchone()
+            if row is None:
+                return None
+            claimed = self.conn.execute(
+                "UPDATE outbox SET status = 'sending' WHERE idempotency_key = ? AND status = 'pending'",
+                (row[0],)).rowcount
+        return row if claimed else None
+
+    def deliver(self, key, payload, attempts):
+        data = json.loads(payload)
+        new_flights = [Flight.from_dict(f) for f in data['new_flights']]
+        price_changes = [dict(c, flight=Flight.from_dict(c['flight'])) for c in data['price_changes']]
+        permanent = self.sender.configuration_error()
+        if permanent:
+            # רשימת תפוצה ריקה או נתוני מייל חסרים - ניסיון חוזר לא יעזור
+            self.mark_failed(key, attempts, permanent)
+            return 0
+        try:
+            success = self.sender.send_update_email(new_flights, price_changes, data['stats'],
+                                                    message_id=self.message_id(key))
+            error = None if success else 'send_update_email החזיר כישלון'
+        except Exception as e:
+            success, error = False, str(e)
+
+        if success:
+            with self.lock, self.conn:
+                self.conn.execute(
+                    "UPDATE outbox SET status = 'sent', attempts = ?, sent_at = ?, last_error = NULL "
+                    "WHERE idempotency_key = ?", (attempts + 1, datetime.now().isoformat(), key))
+            logging.info(f"מייל התראה {key[:8]} נשלח בהצלחה")
+            metrics.EMAILS.inc(result='sent')
+            self.record_email_latency(new_flights)
+            return 1
+
+        attempts += 1
+        if attempts >= self.max_attempts:
+            self.mark_failed(key, attempts, f"{attempts} ניסיונות: {error}")
+            return 0
+        delay = self.backoff_seconds(attempts)
+        logging.warning(f"שליחת התראה {key[:8]} נכשלה (ניסיון {attempts}/{self.max_attempts}), "
+                        f"ניסיון נוסף בעוד {delay:.0f} שניות")
+        metrics.EMAILS.inc(result='retry')
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'pending', attempts = ?, next_attempt_at = ?, last_error = ? "
+                "WHERE idempotency_key = ?", (attempts, time.time() + delay, error, key))
+        return 0
+
+    def mark_failed(self, key, attempts, error):
+        """כישלון סופי - ההתראה נשארת בטבלה לבירור ולא מנוסה שוב"""
+        logging.error(f"שליחת התראה {key[:8]} נכשלה סופית - מוותר ({error})")
+        metrics.EMAILS.inc(result='failed')
+        with self.lock, self.conn:
+            self.conn.execute(
+                "UPDATE outbox SET status = 'failed', attempts = ?, last_error = ? WHERE idempotency_key = ?",
+                (attempts, error, key))
+
+    def backoff_seconds(self, attempts):
+        """המתנה שמכפילה את עצמה בכל כישלון, עד התקרה, עם פיזור של עד 10% כדי לא לחזור בדיוק יחד"""
+        delay = min(self.retry_max_seconds, self.retry_base_seconds * 2 ** (attempts - 1))
+        return delay * random.uniform(0.9, 1.0)
+
+    def message_id(self, key):
+        """Message-ID קבוע לכל התראה - שליחה חוזרת של אותה התראה נראית לשרת הדואר כאותה הודעה"""
+        domain = (self.sender.username or '').rpartition('@')[2] or 'localhost'
+        return f"<tustus-{key}@{domain}>"
+
+    @staticmethod
+    def record_email_latency(new_flights):
+        """הזמן מזיהוי כל טיסה חדשה ועד שהמייל עליה נשלח (כולל ההמתנה בתור)"""
+        now = datetime.now()
+        for flight in new_flights:
+            if flight.detected_at:
+                detected = datetime.fromisoformat(flight.detected_at)
+                metrics.DETECTION_TO_EMAIL_SECONDS.observe((now - detected).total_seconds())
+
+    def counts(self):
+        """מספר ההתראות בכל מצב (pending/sending/sent/failed)"""
+        with self.lock:
+            return dict(self.conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status").fetchall())
+
+    def close(self, timeout=30):
+        """עצירת ה-worker (אחרי השליחה שבתהליך, אם יש) וסגירת החיבור; התור נשאר על הדיסק"""
+        self.stop_event.set()
+        self.wake.set()
+        if self.thread:
+            self.thread.join(timeout)
+            if self.thread.is_alive():
+                # SMTP תקוע - השורה נשארת "בשליחה" ותחזור לתור בהפעלה הבאה
+                logging.warning("ה-worker של תור ההתראות עדיין שולח - לא ממתין לו")
+                return
+        with self.lock:
+            self.conn.close()
@@ -0,0 +1,112 @@
+import os
+import time
+import logging
+from datetime import datetime
+from typing import List, Dict
+from flight_identity import price_identity, has_price_identity
+from config import PRICE_HISTORY_FILE, PRICE_DROP_THRESHOLD_PERCENT, STORAGE_RETENTION_DAYS
+
+class PriceHistory:
+    """היסטוריית מחירים לכל טיסה, כסדרת זמן שנכתבת רק כשהמחיר משתנה.
+
+    כל שינוי הוא שורה אחת ביומן ("מפתח זמן מחיר"), והמחיר האחרון של כל טיסה
+    נשמר בזיכרון - כך שההשוואה בכל בדיקה היא מעבר יחיד על הטיסות הנוכחיות.
+    """
+    def __init__(self, path=PRICE_HISTORY_FILE, threshold_percent=PRICE_DROP_THRESHOLD_PERCENT,
+                 retention_days=STORAGE_RETENTION_DAYS):
+        self.path = path
+        self.threshold_percent = threshold_percent
+        self.retention_days = retention_days
+        # מפתח -> (מחיר אחרון, זמן השינוי האחרון)
+        self.last_prices = {}
+        self.log_lines = 0
+        # גודל היומן אחרי הדחיסה האחרונה - הדחיסה הבאה רק כשהוא גדל משמעותית
+        self.compacted_lines = 0
+        self.load()
+
+    def __len__(self):
+        return len(self.last_prices)
+
+    def load(self):
+        """שחזור המחיר האחרון של כל טיסה מהיומן"""
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    parts = line.split()
+                    if len(parts) != 3:
+                        continue
+                    key, changed_at, price = parts
+                    self.last_prices[key] = (int(price), int(changed_at))
+                    self.log_lines += 1
+            self.compacted_lines = self.log_lines
+            logging.info(f"נטענה היסטוריית מחירים: {len(self.last_prices)} טיסות")
+        except Exception as e:
+            logging.error(f"שגיאה בטעינת היסטוריית המחירים: {e}")
+
+    def update(self, flights) -> List[Dict]:
+        """השוואת המחירים הנוכחיים למחיר האחרון של כל טיסה; מחזיר את הירידות שמעל הסף"""
+        now = int(time.time())
+        current = {}
+        for flight in flights:
+            if not isinstance(flight.price, int) or not has_price_identity(flight):
+                continue
+            key = price_identity(flight)
+            # כמה כרטיסים עם אותו מפתח - המחיר הנמוך קובע
+            if key not in current or flight.price < current[key].price:
+                current[key] = flight
+
+        changes = []
+        drops = []
+        for key, flight in current.items():
+            previous = self.last_prices.get(key)
+            if previous and previous[0] == flight.price:
+                continue
+            changes.append(f"{key} {now} {flight.price}\n")
+            self.last_prices[key] = (flight.price, now)
+            if not previous:
+                continue
+            old_price = previous[0]
+            drop_percent = (old_price - flight.price) * 100 / old_price
+            if drop_percent >= self.threshold_percent:
+                drops.append({
+                    'flight': flight,
+                    'destination': flight.destination,
+                    'old_price': old_price,
+                    'new_price': flight.price,
+                    'drop_percent': round(drop_percent, 1),
+                    'previous_change': datetime.fromtimestamp(previous[1]).isoformat(),
+                    'detected_at': datetime.fromtimestamp(now).isoformat()
+                })
+                logging.info(f"ירידת מחיר: {flight.destination} {old_price}₪ -> {flight.price}₪ ({drop_percent:.0f}%)")
+
+        if changes:
+            try:
+                with open(self.path, 'a', encoding='utf-8') as f:
+                    f.writelines(changes)
+                self.log_lines += len(changes)
+            except Exception as e:
+                logging.error(f"שגיאה בעדכון היסטוריית המחירים: {e}")
+            if self.log_lines > 2 * self.compacted_lines + 1000:
+                self.compact()
+        return drops
+
+    def compact(self):
+        """כתיבת היומן מחדש בלי סדרות של טיסות שלא השתנו מעבר לתקופת השמירה, בהחלפה אטומית"""
+        cutoff = time.time() - self.retention_days * 86400 if self.retention_days > 0 else 0
+        keep = {key for key, (_, changed_at) in self.last_prices.items() if changed_at >= cutoff}
+        temp_path = f"{self.path}.tmp"
+        try:
+            lines = 0
+            with open(self.path, 'r', encoding='utf-8') as source, open(temp_path, 'w', encoding='utf-8') as f:
+                for line in source:
+                    parts = line.split()
+                    if len(parts) == 3 and parts[0] in keep:
+                        f.write(line)
+                        lines += 1
+            os.replace(temp_path, self.path)
+            self.last_prices = {key: value for key, value in self.last_prices.items() if key in keep}
+            self.log_lines = self.compacted_lines = lines
+        except Exception as e:
+            logging.error(f"שגיאה בדחיסת היסטוריית המחירים: {e}")
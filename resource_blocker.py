@@ -0,0 +1,92 @@
+import logging
+from collections import Counter
+from config import RESOURCE_BLOCKING_ENABLED, BLOCKED_RESOURCE_TYPES, BLOCKED_DOMAINS, ALLOWED_DOMAINS
+
+# תבניות URL לכל סוג משאב (DevTools חוסם לפי URL ולא לפי סוג)
+RESOURCE_TYPE_PATTERNS = {
+    'image': ['png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'avif'],
+    'font': ['woff', 'woff2', 'ttf', 'otf', 'eot'],
+    'stylesheet': ['css'],
+    'media': ['mp4', 'webm', 'm3u8', 'mp3', 'ogg']
+}
+
+# הערכת גודל ממוצע לבקשה חסומה - DevTools לא מדווח גודל למשאב שלא נטען
+ESTIMATED_BYTES_BY_TYPE = {
+    'Image': 30_000,
+    'Font': 40_000,
+    'Stylesheet': 30_000,
+    'Media': 500_000,
+    'Script': 50_000
+}
+DEFAULT_ESTIMATED_BYTES = 10_000
+
+class ResourceBlocker:
+    """חסימת משאבים כבדים (תמונות, פונטים, וידאו, אנליטיקס) בדפדפן דרך DevTools"""
+    def __init__(self, blocked_types=None, blocked_domains=None, allowed_domains=None):
+        self.blocked_types = BLOCKED_RESOURCE_TYPES if blocked_types is None else blocked_types
+        blocked_domains = BLOCKED_DOMAINS if blocked_domains is None else blocked_domains
+        allowed_domains = ALLOWED_DOMAINS if allowed_domains is None else allowed_domains
+        # דומיין ברשימת ההיתר גובר על רשימת החסימה
+        self.blocked_domains = [d for d in blocked_domains if d not in allowed_domains]
+
+    def build_patterns(self):
+        """בניית רשימת תבניות URL לחסימה"""
+        patterns = []
+        for resource_type in self.blocked_types:
+            for extension in RESOURCE_TYPE_PATTERNS.get(resource_type, []):
+                patterns.append(f'*.{extension}')
+                patterns.append(f'*.{extension}?*')
+        for domain in self.blocked_domains:
+            patterns.append(f'*{domain}/*')
+        return patterns
+
+    def apply(self, driver):
+        """הפעלת החסימה על סשן Chrome"""
+        patterns = self.build_patterns()
+        if not patterns:
+            return
+        try:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd('Network.setBlockedURLs', {'urls': patterns})
+            logging.info(f"חסימת משאבים הופעלה: {', '.join(self.blocked_types) or 'ללא סוגים'}, "
+                         f"{len(self.blocked_domains)} דומיינים")
+        except Exception as e:
+            logging.warning(f"לא ניתן להפעיל חסימת משאבים: {e}")
+
+    def summarize(self, events):
+        """סיכום בקשות ובתים שנחסכו מתוך אירועי הרשת של סריקה אחת"""
+        request_types = {}
+        blocked = Counter()
+        loaded_requests = 0
+        loaded_bytes = 0
+
+        for event in events:
+            method = event.get('method')
+            params = event.get('params', {})
+            if method == 'Network.requestWillBeSent':
+                request_types[params.get('requestId')] = params.get('type', 'Other')
+            elif method == 'Network.loadingFailed' and params.get('blockedReason'):
+                blocked[params.get('type') or request_types.get(params.get('requestId'), 'Other')] += 1
+            elif method == 'Network.loadingFinished':
+                loaded_requests += 1
+                loaded_bytes += int(params.get('encodedDataLength', 0))
+
+        saved_bytes = sum(ESTIMATED_BYTES_BY_TYPE.get(t, DEFAULT_ESTIMATED_BYTES) * n for t, n in blocked.items())
+        return {
+            'blocked_requests': sum(blocked.values()),
+            'blocked_by_type': dict(blocked),
+            'estimated_bytes_saved': saved_bytes,
+            'loaded_requests': loaded_requests,
+            'loaded_bytes': loaded_bytes
+        }
+
+    def log_summary(self, stats):
+        """רישום החיסכון בלוג"""
+        by_type = ', '.join(f'{t}: {n}' for t, n in sorted(stats['blocked_by_type'].items())) or 'אין'
+        logging.info(f"חסימת משאבים: נחסמו {stats['blocked_requests']} בקשות ({by_type}), "
+                     f"~{stats['estimated_bytes_saved'] / 1024:.0f}KB נחסכו (הערכה), "
+                     f"נטענו {stats['loaded_requests']} בקשות / {stats['loaded_bytes'] / 1024:.0f}KB")
+
+def create_resource_blocker():
+    """יצירת חוסם משאבים לפי ההגדרות, או None אם החסימה כבויה"""
+    return ResourceBlocker() if RESOURCE_BLOCKING_ENABLED else None
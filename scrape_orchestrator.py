@@ -0,0 +1,222 @@
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from flight_scraper import FlightScraper, ApiFlightClient
+from source_crawler import SourceCrawler
+from flight_dedup import NearDuplicateIndex
+import tracing
+from config import (
+    TUSTUS_URL, PREFERRED_DESTINATIONS, API_FAST_PATH_ENABLED, SCRAPE_STRATEGY,
+    MAX_DIVERGENT_CYCLES, DIVERGENCE_THRESHOLD, BROWSER_BASELINE_EVERY_CYCLES
+)
+
+class ScrapeFailed(RuntimeError):
+    """הסריקה נכשלה (ולא החזירה אפס טיסות) - הניטור לא שומר תוצאה ריקה ושומר על המצב הקודם"""
+
+def flight_key(flight):
+    """מפתח השוואה בין תוצאות שכבות שונות - יעד ומחיר"""
+    return f"{flight.destination}_{flight.price}"
+
+def is_valid_flight(flight):
+    """אימות רשומת טיסה: יעד מועדף ומחיר מספרי סביר"""
+    price = flight.price
+    return (flight.destination in PREFERRED_DESTINATIONS
+            and isinstance(price, int) and 50 <= price <= 20000)
+
+def validate_flights(flights):
+    """תוצאה תקינה: לא ריקה, ולפחות חצי מהרשומות תקינות; מחזיר את התקינות או None"""
+    if not flights:
+        return None
+    valid = [f for f in flights if is_valid_flight(f)]
+    if len(valid) * 2 < len(flights):
+        return None
+    return valid
+
+class ScrapeOrchestrator:
+    """סריקה בשכבות: API ישיר, סקרפר HTTP פשוט, ו-Chrome רק כשהשכבות הזולות נכשלות"""
+    def __init__(self, driver_pool=None, strategy=SCRAPE_STRATEGY):
+        self.driver_pool = driver_pool
+        self.strategy = strategy
+        self.api_client = ApiFlightClient() if API_FAST_PATH_ENABLED else None
+        self.source_crawler = SourceCrawler()
+        self.last_browser_keys = None
+        self.divergent_cycles = 0
+        # מחזורים מאז תוצאת הדפדפן האחרונה - בסיס ההשוואה מתחדש מדי פעם גם כשהשכבה הזולה תקינה
+        self.cycles_since_browser = 0
+        self.last_timings = {}
+        self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix='scrape-race') if strategy == 'race' else None
+
+    def scrape_with_browser(self):
+        """סריקה עם Chrome - סשן חם מהמאגר אם קיים; מחזיר טיסות וזמני הפעלה/סריקה"""
+        timings = {}
+        flights = list(self.iter_browser_flights(timings))
+        return flights, timings
+
+    def iter_browser_flights(self, timings):
+        """סריקה עם Chrome כזרם; זמני הפעלה/סריקה נכתבים ל-timings"""
+        start = time.perf_counter()
+        scraper = None
+        pooled = None
+        try:
+            # השאלת סשן חם מהמאגר, או הפעלת Chrome חדש אם אין מאגר
+            with tracing.span('browser.startup'):
+                if self.driver_pool:
+                    pooled = self.driver_pool.acquire()
+                    scraper = FlightScraper(driver=pooled.driver)
+                else:
+                    scraper = FlightScraper()
+            timings['startup_seconds'] = round(time.perf_counter() - start, 3)
+            timings['warm_start'] = bool(pooled and pooled.was_warm)
+
+            scrape_start = time.perf_counter()
+            keys = set()
+            for flight in scraper.iter_flights():
+                keys.add(flight_key(flight))
+                yield flight
+            timings['scrape_seconds'] = round(time.perf_counter() - scrape_start, 3)
+            if scraper.last_error is not None:
+                # בלי זה כשלון נראה כמו עמוד ריק, והאינדקס השמור היה מתרוקן
+                raise ScrapeFailed(f"סריקת Chrome נכשלה: {scraper.last_error}")
+            self.last_browser_keys = keys
+            self.cycles_since_browser = 0
+        finally:
+            if pooled:
+                # סשן שנכשל ממוחזר במקום לחזור למאגר
+                failed = scraper is None or scraper.last_error is not None
+                self.driver_pool.release(pooled, failed=failed)
+            elif scraper:
+                scraper.close()
+
+    def scrape_cheap(self):
+        """השכבות הזולות: API ישיר ואז סריקת HTTP מקבילית של המקורות; מחזיר (טיסות, שכבה, זמנים) או (None, ...)"""
+        timings = {}
+        if self.api_client:
+            start = time.perf_counter()
+            with tracing.span('api.fetch'):
+                flights = validate_flights(self.api_client.fetch_flights())
+            timings['api_seconds'] = round(time.perf_counter() - start, 3)
+            if flights is not None:
+                return flights, 'api', timings
+
+        start = time.perf_counter()
+        with tracing.span('simple.crawl'):
+            flights = validate_flights(self.source_crawler.crawl())
+        timings['simple_seconds'] = round(time.perf_counter() - start, 3)
+        if flights is not None:
+            return flights, 'simple', timings
+        return None, None, timings
+
+    def needs_browser_baseline(self):
+        """אין עדיין תוצאת דפדפן להשוואה, או שהיא ישנה מ-BROWSER_BASELINE_EVERY_CYCLES מחזורים"""
+        if self.last_browser_keys is None:
+            return True
+        self.cycles_since_browser += 1
+        return 0 < BROWSER_BASELINE_EVERY_CYCLES <= self.cycles_since_browser
+
+    def check_divergence(self, flights):
+        """האם תוצאות השכבה הזולה שונות מתוצאת הדפדפן האחרונה יותר מדי מחזורים ברציפות"""
+        if self.last_browser_keys is None:
+            return False
+        # Chrome סורק רק את העמוד הראשי - משווים רק טיסות שהגיעו ממנו
+        keys = {flight_key(f) for f in flights if (f.url or TUSTUS_URL) == TUSTUS_URL}
+        union = keys | self.last_browser_keys
+        similarity = len(keys & self.last_browser_keys) / len(union) if union else 1.0
+        if similarity < DIVERGENCE_THRESHOLD:
+            self.divergent_cycles += 1
+            logging.warning(f"השכבה הזולה שונה מתוצאת הדפדפן האחרונה (דמיון {similarity:.0%}, "
+                            f"{self.divergent_cycles} מחזורים ברציפות)")
+        else:
+            self.divergent_cycles = 0
+        return self.divergent_cycles >= MAX_DIVERGENT_CYCLES
+
+    def verify_with_browser(self, flights, tier, timings):
+        """סריקת Chrome כשיש כבר תוצאה זולה תקינה (בסיס השוואה או אימות סטייה); אם Chrome נכשל -
+        ממשיכים עם התוצאה הזולה במקום להכשיל את המחזור"""
+        try:
+            return list(self.iter_browser_flights(timings)), 'browser'
+        except Exception as e:
+            logging.warning(f"סריקת Chrome לאימות נכשלה - ממשיך עם תוצאת שכבת {tier}: {e}")
+            return flights, tier
+
+    def scrape(self):
+        """סריקה לפי האסטרטגיה המוגדרת; מחזיר טיסות ונתוני השכבה והזמנים"""
+        flights = list(self.iter_flights())
+        return flights, self.last_timings
+
+    def iter_flights(self):
+        """סריקה לפי האסטרטגיה המוגדרת כזרם; השכבה והזמנים נשמרים ב-last_timings בסיום.
+
+        השכבות הזולות מהירות ומאומתות כרשימה שלמה; Chrome, השכבה האיטית, נסרק כרטיס-כרטיס, אבל
+        איחוד הכפילויות מוציא כל קבוצה רק בסוף הזרם, אחרי שנבחר הכרטיס הספציפי ביותר שלה.
+        """
+        start = time.perf_counter()
+        count = 0
+        if self.strategy == 'race':
+            flights, tier, timings = self.scrape_race()
+            stream = flights
+        elif self.strategy == 'browser':
+            tier, timings = 'browser', {}
+            stream = self.iter_browser_flights(timings)
+        else:
+            # שכבה זולה קודם; הסלמה ל-Chrome כשאין תוצאה תקינה או כשהתוצאות סוטות לאורך זמן
+            flights, tier, timings = self.scrape_cheap()
+            baseline = flights is not None and self.needs_browser_baseline()
+            if flights is not None and not baseline and not self.check_divergence(flights):
+                stream = flights
+            else:
+                if flights is None:
+                    logging.info("השכבות הזולות לא החזירו תוצאה תקינה - עובר ל-Chrome")
+                elif baseline:
+                    logging.info("סריקת Chrome לבסיס ההשוואה של השכבות הזולות")
+                else:
+                    logging.warning("סטייה מתמשכת מתוצאת הדפדפן - מאמת עם Chrome")
+                    self.divergent_cycles = 0
+                if flights is None:
+                    tier = 'browser'
+                    stream = self.iter_browser_flights(timings)
+                else:
+                    stream, tier = self.verify_with_browser(flights, tier, timings)
+
+        # איחוד כרטיסים כמעט זהים של אותו דיל לפני שהניטור משווה, שומר ומתריע
+        duplicates = NearDuplicateIndex()
+        for flight in duplicates.iter_unique(stream):
+            count += 1
+            yield flight
+
+        timings['near_duplicates'] = duplicates.dropped
+        timings['tier'] = tier
+        timings['tier_seconds'] = round(time.perf_counter() - start, 3)
+        self.last_timings = timings
+        logging.info(f"שכבת סריקה: {tier} ({timings['tier_seconds']:.2f} שניות, {count} טיסות)")
+
+    def scrape_race(self):
+        """הרצת השכבה הזולה ו-Chrome במקביל ולקיחת התוצאה התקינה הראשונה"""
+        cheap_future = self.executor.submit(tracing.bind(self.scrape_cheap))
+        browser_future = self.executor.submit(tracing.bind(self.scrape_with_browser))
+        pending = {cheap_future, browser_future}
+        timings = {}
+
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                try:
+                    if future is cheap_future:
+                        flights, tier, cheap_timings = future.result()
+                        timings.update(cheap_timings)
+                        if flights is not None:
+                            return flights, tier, timings
+                    else:
+                        flights, browser_timings = future.result()
+                        timings.update(browser_timings)
+                        valid = validate_flights(flights)
+                        if valid is not None or not pending:
+                            return valid or flights, 'browser', timings
+                except Exception as e:
+                    logging.error(f"שגיאה באחת השכבות במצב מרוץ: {e}")
+        raise ScrapeFailed("אף שכבה לא החזירה נתונים במצב מרוץ")
+
+    def close(self):
+        """סגירת ה-threads של הסריקה המקבילית ושל מצב המרוץ"""
+        self.source_crawler.close()
+        if self.executor:
+            self.executor.shutdown(wait=False)
@@ -0,0 +1,79 @@
+import json
+import os
+import logging
+from datetime import datetime
+from config import SELECTOR_STATS_FILE, SELECTOR_DEMOTE_AFTER
+
+class SelectorCache:
+    """סטטיסטיקת סלקטורים שנשמרת לדיסק - הסלקטור המנצח האחרון נבדק ראשון"""
+    def __init__(self, stats_file=SELECTOR_STATS_FILE, demote_after=SELECTOR_DEMOTE_AFTER):
+        self.stats_file = stats_file
+        self.demote_after = demote_after
+        data = self.load()
+        self.last_winner = data.get('last_winner')
+        self.selectors = data.get('selectors', {})
+
+    def load(self) -> dict:
+        """טעינת הסטטיסטיקה מהקובץ"""
+        if os.path.exists(self.stats_file):
+            try:
+                with open(self.stats_file, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.error(f"שגיאה בטעינת סטטיסטיקת סלקטורים: {e}")
+        return {}
+
+    def save(self):
+        """שמירת הסטטיסטיקה לקובץ"""
+        try:
+            with open(self.stats_file, 'w', encoding='utf-8') as f:
+                json.dump({'last_winner': self.last_winner, 'selectors': self.selectors}, f, ensure_ascii=False, indent=2)
+        except Exception as e:
+            logging.error(f"שגיאה בשמירת סטטיסטיקת סלקטורים: {e}")
+
+    def entry(self, selector: str) -> dict:
+        """רשומת הסטטיסטיקה של סלקטור (נוצרת אם אינה קיימת)"""
+        return self.selectors.setdefault(selector, {
+            'attempts': 0, 'hits': 0, 'cards': 0, 'valid_flights': 0,
+            'consecutive_failures': 0, 'last_hit': None
+        })
+
+    def is_demoted(self, selector: str) -> bool:
+        """סלקטור שנכשל שוב ושוב יורד לסוף התור"""
+        return self.selectors.get(selector, {}).get('consecutive_failures', 0) >= self.demote_after
+
+    def ordered(self, selectors: list) -> list:
+        """סדר הניסיון: המנצח האחרון, אחריו לפי הסדר המקורי, וסלקטורים מודחים בסוף"""
+        order = {selector: index for index, selector in enumerate(selectors)}
+        return sorted(selectors, key=lambda s: (s != self.last_winner, self.is_demoted(s), order[s]))
+
+    def record_attempts(self, attempts: list):
+        """רישום הניסיונות של סריקה אחת - רשימת (סלקטור, מספר אלמנטים)"""
+        for selector, count in attempts:
+            stats = self.entry(selector)
+            stats['attempts'] += 1
+            if count:
+                stats['hits'] += 1
+                stats['cards'] += count
+            else:
+                stats['consecutive_failures'] += 1
+
+    def record_result(self, selector: str, valid_flights: int):
+        """רישום כמה טיסות תקינות הניב הסלקטור שנבחר, ועדכון המנצח"""
+        if not selector:
+            return
+        stats = self.entry(selector)
+        stats['valid_flights'] += valid_flights
+        if valid_flights:
+            stats['consecutive_failures'] = 0
+            stats['last_hit'] = datetime.now().isoformat()
+            if self.last_winner and self.last_winner != selector:
+                logging.warning(f"ייתכן שמבנה האתר השתנה: הסלקטור המנצח התחלף מ-{self.last_winner} ל-{selector}")
+            self.last_winner = selector
+        else:
+            # סלקטור שמצא אלמנטים אך לא טיסות נחשב כישלון
+            stats['consecutive_failures'] += 1
+            if self.last_winner == selector:
+                logging.warning(f"הסלקטור המנצח {selector} לא הניב טיסות - ייתכן שמבנה האתר השתנה")
+                self.last_winner = None
+        self.save()
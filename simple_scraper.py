@@ -8,100 +8,301 @@ import requests
 from bs4 import BeautifulSoup
 import time
 import json
+import os
+import re
+import hashlib
 import logging
+import threading
 from datetime import datetime
-from config import TUSTUS_URL, PREFERRED_DESTINATIONS, EXCLUDED_DESTINATIONS
+from urllib.parse import urljoin
+from config import (
+    TUSTUS_URL, PREFERRED_DESTINATIONS, EXCLUDED_DESTINATIONS, HTTP_CACHE_ENABLED, HTTP_CACHE_FILE,
+    EXTRACTION_PROFILES
+)
+from html_blocks import parse_text_blocks, subtree_text, find_href, iter_postorder
+from flight_extraction import (
+    find_destination, find_price, find_dates, extract_flight_tuples,
+    STRICT_PRICE_PATTERNS, SIMPLE_DATE_PATTERNS
+)
+from flight_model import Flight
+import metrics
+
+# טוקנים שמשתנים בכל טעינה (אנטי-זיוף, nonce) ואינם משקפים שינוי בתוכן
+VOLATILE_PATTERNS = [
+    re.compile(r'<input[^>]*type=["\']hidden["\'][^>]*>', re.IGNORECASE),
+    re.compile(r'\snonce=["\'][^"\']*["\']', re.IGNORECASE),
+    re.compile(r'<meta[^>]*name=["\']csrf[^>]*>', re.IGNORECASE)
+]
+WHITESPACE_PATTERN = re.compile(r'\s+')
+
+# מטמון ה-HTTP משותף לכל הסקרפרים בסריקה מקבילית - שינוי הדף ושמירה לקובץ תחת נעילה
+HTTP_CACHE_LOCK = threading.Lock()
 
 class SimpleFlightScraper:
-    def __init__(self):
-        self.session = requests.Session()
-        self.session.headers.update({
+    def __init__(self, url=TUSTUS_URL, profile='default', http_cache=None, timeout=30):
+        self.url = url
+        self.profile = profile
+        profile_settings = EXTRACTION_PROFILES.get(profile, EXTRACTION_PROFILES['default'])
+        self.price_range = tuple(profile_settings['price_range'])
+        self.parser_mode = profile_settings['parser_mode']
+        self.timeout = timeout
+        self.http_cache = http_cache if http_cache is not None else self.load_http_cache()
+        self.http_cache.setdefault('pages', {})
+        self.cache_stats = self.http_cache.setdefault('stats', {
+            'requests': 0, 'not_modified': 0, 'digest_hits': 0, 'parses': 0, 'bytes_downloaded': 0
+        })
+        self.session = self.create_session()
+    
+    def create_session(self):
+        """סשן HTTP עם כותרות של דפדפן רגיל"""
+        session = requests.Session()
+        session.headers.update({
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36',
             'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
             'Accept-Language': 'he-IL,he;q=0.8,en-US;q=0.5,en;q=0.3',
             'Accept-Encoding': 'gzip, deflate',
             'Connection': 'keep-alive'
         })
+        return session
+    
+    def reset_session(self):
+        """סשן חדש לסריקות הבאות - סריקה שחרגה מהזמן ממשיכה ב-thread שלה עם הסשן הישן"""
+        self.session = self.create_session()
+    
+    def load_http_cache(self):
+        """טעינת ה-validators, תקציר הדף והטיסות מהסריקה הקודמת"""
+        if HTTP_CACHE_ENABLED and os.path.exists(HTTP_CACHE_FILE):
+            try:
+                with open(HTTP_CACHE_FILE, 'r', encoding='utf-8') as f:
+                    return json.load(f)
+            except Exception as e:
+                logging.error(f"שגיאה בטעינת מטמון HTTP: {e}")
+        return {}
+    
+    def save_http_cache(self):
+        """שמירת מטמון ה-HTTP לקובץ"""
+        if not HTTP_CACHE_ENABLED:
+            return
+        try:
+            with HTTP_CACHE_LOCK:
+                with open(HTTP_CACHE_FILE, 'w', encoding='utf-8') as f:
+                    json.dump(self.http_cache, f, ensure_ascii=False)
+        except Exception as e:
+            logging.error(f"שגיאה בשמירת מטמון HTTP: {e}")
+    
+    def get_cache_stats(self):
+        """מוני דילוגים ופגיעות במטמון - מצטברים בין הרצות"""
+        with HTTP_CACHE_LOCK:
+            return dict(self.cache_stats)
+    
+    def count(self, name, amount=1):
+        """עדכון מונה המטמון (משותף לסקרפרים שרצים במקביל) ומדד ה-Prometheus שלו"""
+        with HTTP_CACHE_LOCK:
+            self.cache_stats[name] += amount
+        if name == 'bytes_downloaded':
+            metrics.HTTP_DOWNLOADED_BYTES.inc(amount)
+        else:
+            metrics.HTTP_CACHE_RESULTS.inc(amount, result=name)
     
-    def scrape_flights(self):
+    def log_cache_stats(self):
+        stats = self.get_cache_stats()
+        logging.info(f"מטמון HTTP (מצטבר): {stats['requests']} בקשות, {stats['not_modified']} לא השתנו (304), "
+                     f"{stats['digest_hits']} תוכן זהה, {stats['parses']} פרסורים, "
+                     f"{stats['bytes_downloaded'] / 1024:.0f}KB הורדו")
+    
+    def normalize_body(self, html):
+        """נרמול גוף הדף לתקציר - הסרת טוקנים שמשתנים בכל בקשה ורווחים"""
+        for pattern in VOLATILE_PATTERNS:
+            html = pattern.sub('', html)
+        return WHITESPACE_PATTERN.sub(' ', html).strip()
+    
+    def cached_flights(self, entry):
+        """הטיסות מהסריקה הקודמת, עם זמן סריקה מעודכן"""
+        now = datetime.now().isoformat()
+        return [Flight.from_dict(dict(flight, scraped_at=now)) for flight in entry.get('flights', [])]
+    
+    def scrape_flights(self, session=None):
         """סריקת טיסות באמצעות requests + BeautifulSoup בלבד"""
+        return list(self.iter_flights(session))
+    
+    def iter_flights(self, session=None):
+        """סריקת טיסות כזרם - כל טיסה מוחזרת מיד כשהכרטיס שלה חולץ (בסשן שהתקבל, או בסשן של הסקרפר)"""
+        session = session or self.session
         try:
-            logging.info(f"מתחיל סריקה פשוטה של {TUSTUS_URL}")
+            logging.info(f"מתחיל סריקה פשוטה של {self.url}")
+            entry = dict(self.http_cache['pages'].get(self.url, {})) if HTTP_CACHE_ENABLED else {}
             
-            # שליחת בקשה לאתר
-            response = self.session.get(TUSTUS_URL, timeout=30)
-            response.raise_for_status()
+            # בקשה מותנית - השרת יכול להחזיר 304 אם הדף לא השתנה
+            headers = {}
+            if 'flights' in entry:
+                if entry.get('etag'):
+                    headers['If-None-Match'] = entry['etag']
+                if entry.get('last_modified'):
+                    headers['If-Modified-Since'] = entry['last_modified']
             
-            # פרסור HTML
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # שליחת בקשה לאתר
+            response = session.get(self.url, headers=headers, timeout=self.timeout)
+            self.count('requests')
             
-            flights = []
+            if response.status_code == 304:
+                self.count('not_modified')
+                self.save_http_cache()
+                logging.info("הדף לא השתנה (304) - מדלג על פרסור")
+                self.log_cache_stats()
+                yield from self.cached_flights(entry)
+                return
             
-            # חיפוש טקסטים שמכילים מילות מפתח
-            text_elements = soup.find_all(text=True)
-            combined_text = ' '.join([str(elem).strip() for elem in text_elements if str(elem).strip()])
+            response.raise_for_status()
+            self.count('bytes_downloaded', len(response.content))
             
-            # חיפוש בטקסט המקובץ
-            flight_data = self.extract_flights_from_text(combined_text)
+            # תקציר הגוף המנורמל - אם השרת מתעלם מהבקשה המותנית
+            digest = hashlib.sha256(self.normalize_body(response.text).encode('utf-8')).hexdigest()
+            entry.update({
+                'etag': response.headers.get('ETag'),
+                'last_modified': response.headers.get('Last-Modified')
+            })
             
-            # חיפוש באלמנטים ספציפיים
-            selectors = [
-                'div', 'span', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
-                '.flight', '.trip', '.offer', '.deal', '.card', '.product'
-            ]
+            if HTTP_CACHE_ENABLED and 'flights' in entry and entry.get('digest') == digest:
+                self.count('digest_hits')
+                with HTTP_CACHE_LOCK:
+                    self.http_cache['pages'][self.url] = entry
+                self.save_http_cache()
+                logging.info("תוכן הדף זהה לסריקה הקודמת - מדלג על פרסור")
+                self.log_cache_stats()
+                yield from self.cached_flights(entry)
+                return
             
-            for selector in selectors:
-                elements = soup.select(selector)
-                for element in elements:
-                    text = element.get_text(strip=True)
-                    if text and any(dest in text for dest in PREFERRED_DESTINATIONS):
-                        flight_info = self.extract_flight_info(text)
-                        if flight_info:
-                            flights.append(flight_info)
+            unique_flights = []
+            for flight in self.iter_parsed_flights(response.content):
+                unique_flights.append(flight)
+                yield flight
+            self.count('parses')
             
-            # הסרת כפילויות
-            unique_flights = self.remove_duplicates(flights)
-
-            # סינון יעדים מוחרגים
-            unique_flights = [f for f in unique_flights if f.get('destination') not in EXCLUDED_DESTINATIONS]
+            entry.update({
+                'digest': digest,
+                'flights': [flight.to_dict() for flight in unique_flights],
+                'updated_at': datetime.now().isoformat()
+            })
+            with HTTP_CACHE_LOCK:
+                self.http_cache['pages'][self.url] = entry
+            self.save_http_cache()
             
             logging.info(f"נמצאו {len(unique_flights)} טיסות רלוונטיות (סקרפר פשוט)")
-            return unique_flights
+            self.log_cache_stats()
             
         except Exception as e:
-            logging.error(f"שגיאה בסריקה פשוטה: {e}")
-            return []
+            logging.error(f"שגיאה בסריקה פשוטה של {self.url}: {e}")
+    
+    def parse_flights(self, content):
+        """פרסור HTML וחילוץ טיסות"""
+        return list(self.iter_parsed_flights(content))
+    
+    def iter_parsed_flights(self, content):
+        """פרסור HTML וחילוץ טיסות כזרם, בסדר המסמך"""
+        if self.parser_mode == 'legacy':
+            yield from self.parse_flights_legacy(content)
+            return
+        
+        # הסרת כפילויות וסינון יעדים מוחרגים תוך כדי הזרם
+        seen = set()
+        for flight in self.iter_flights_from_blocks(parse_text_blocks(content)):
+            key = f"{flight.destination}_{flight.price}"
+            if key in seen or flight.destination in EXCLUDED_DESTINATIONS:
+                continue
+            seen.add(key)
+            yield flight
+    
+    def extract_flights_from_blocks(self, blocks):
+        """חילוץ כל הטיסות מבלוקי טקסט, בסדר המסמך"""
+        return list(self.iter_flights_from_blocks(blocks))
+    
+    def iter_flights_from_blocks(self, blocks):
+        """חילוץ טיסות מבלוקי טקסט במעבר יחיד מהעלים כלפי מעלה.
+
+        כל בלוק נסרק פעם אחת; סימוני יעד/מחיר ואורך הטקסט מצטברים מהצאצאים להורה.
+        טיסה נוצרת בקונטיינר הנמוך ביותר שמכיל גם יעד וגם מחיר, והטקסט המלא שלו
+        נבנה רק עבורו - קונטיינרים שמעליו לא מחולצים שוב.
+        """
+        count = len(blocks)
+        has_dest = [False] * count
+        has_price = [False] * count
+        has_digits = [False] * count
+        has_currency = [False] * count
+        length = [0] * count
+        done = [False] * count
+        
+        # postorder: כל בלוק אחרי צאצאיו, והכרטיסים יוצאים בסדר המסמך
+        for index in iter_postorder(blocks):
+            text = blocks[index].text
+            if text:
+                has_dest[index] = has_dest[index] or find_destination(text) in PREFERRED_DESTINATIONS
+                has_price[index] = has_price[index] or find_price(text, STRICT_PRICE_PATTERNS, self.price_range) is not None
+                has_digits[index] = has_digits[index] or any(c.isdigit() for c in text)
+                has_currency[index] = has_currency[index] or '₪' in text or 'שח' in text
+                length[index] += len(text) + 1
+            
+            # מחיר יכול להתפצל בין בלוקים ("299" ו-"₪" באלמנטים שונים)
+            price_candidate = has_price[index] or (has_digits[index] and has_currency[index])
+            if not done[index] and has_dest[index] and price_candidate and 10 <= length[index] <= 501:
+                flight_info = self.extract_flight_info(subtree_text(blocks, index))
+                if flight_info:
+                    href = find_href(blocks, index)
+                    if href:
+                        flight_info.link = urljoin(self.url, href)
+                    done[index] = True
+                    yield flight_info
+            
+            # הצטברות להורה
+            parent = blocks[index].parent
+            if parent >= 0:
+                has_dest[parent] = has_dest[parent] or has_dest[index]
+                has_price[parent] = has_price[parent] or has_price[index]
+                has_digits[parent] = has_digits[parent] or has_digits[index]
+                has_currency[parent] = has_currency[parent] or has_currency[index]
+                length[parent] += length[index]
+                done[parent] = done[parent] or done[index]
+    
+    def parse_flights_legacy(self, content):
+        """פרסור HTML וחילוץ טיסות - המסלול הישן (select לכל סלקטור ו-get_text לכל אלמנט)"""
+        soup = BeautifulSoup(content, 'html.parser')
+        
+        flights = []
+        
+        # חיפוש טקסטים שמכילים מילות מפתח
+        text_elements = soup.find_all(text=True)
+        combined_text = ' '.join([str(elem).strip() for elem in text_elements if str(elem).strip()])
+        
+        # חיפוש בטקסט המקובץ
+        flight_data = self.extract_flights_from_text(combined_text)
+        
+        # חיפוש באלמנטים ספציפיים
+        selectors = [
+            'div', 'span', 'p', 'h1', 'h2', 'h3', 'h4', 'h5', 'h6',
+            '.flight', '.trip', '.offer', '.deal', '.card', '.product'
+        ]
+        
+        for selector in selectors:
+            elements = soup.select(selector)
+            for element in elements:
+                text = element.get_text(strip=True)
+                if text and any(dest in text for dest in PREFERRED_DESTINATIONS):
+                    flight_info = self.extract_flight_info(text)
+                    if flight_info:
+                        flights.append(flight_info)
+        
+        # הסרת כפילויות
+        unique_flights = self.remove_duplicates(flights)
+
+        # סינון יעדים מוחרגים
+        return [f for f in unique_flights if f.destination not in EXCLUDED_DESTINATIONS]
     
     def extract_flights_from_text(self, text):
-        """חילוץ טיסות מטקסט מקובץ"""
+        """חילוץ טיסות מטקסט מקובץ - מעבר יחיד על הטקסט"""
         flights = []
         
-        # חיפוש יעדים בטקסט
-        for dest in PREFERRED_DESTINATIONS:
-            if dest in text:
-                # חיפוש מחיר ליד היעד
-                import re
-                
-                # חיפוש מחיר ליד היעד
-                pattern = f"{dest}.*?(\d{{1,4}})\s*(₪|שח)"
-                matches = re.finditer(pattern, text, re.IGNORECASE)
-                
-                for match in matches:
-                    price_str = match.group(1)
-                    try:
-                        price = int(price_str)
-                        if 100 <= price <= 3000:  # מחיר סביר
-                            flights.append({
-                                'destination': dest,
-                                'price': price,
-                                'dates': [],
-                                'full_text': match.group(0),
-                                'scraped_at': datetime.now().isoformat(),
-                                'url': TUSTUS_URL,
-                                'method': 'simple_scraper'
-                            })
-                    except ValueError:
-                        continue
+        for match in extract_flight_tuples(text, price_range=self.price_range):
+            flights.append(Flight(match.destination, match.price, match.dates[:3], text[match.start:match.end],
+                                  datetime.now().isoformat(), self.url, method='simple_scraper'))
         
         return flights
     
@@ -112,63 +313,31 @@ class SimpleFlightScraper:
                 return None
             
             # חיפוש יעד
-            destination = None
-            for dest in PREFERRED_DESTINATIONS:
-                if dest in text:
-                    destination = dest
-                    break
-            
-            if not destination:
+            destination = find_destination(text)
+            if not destination or destination not in PREFERRED_DESTINATIONS:
                 return None
 
             # דילוג על יעדים מוחרגים
             if destination in EXCLUDED_DESTINATIONS:
                 return None
             
-            # חיפוש מחיר
-            import re
-            price_patterns = [
-                r'(\d{1,4})\s*₪',
-                r'(\d{1,4})\s*שח',
-                r'₪\s*(\d{1,4})',
-                r'שח\s*(\d{1,4})'
-            ]
-            
-            price = None
-            for pattern in price_patterns:
-                match = re.search(pattern, text)
-                if match:
-                    try:
-                        price_val = int(match.group(1))
-                        if 100 <= price_val <= 3000:
-                            price = price_val
-                            break
-                    except ValueError:
-                        continue
-            
+            # חיפוש מחיר (סימן מטבע בלבד, בטווח סביר)
+            price = find_price(text, STRICT_PRICE_PATTERNS, price_range=self.price_range)
             if not price:
                 return None
             
             # חיפוש תאריכים
-            date_patterns = [
-                r'(\d{1,2}[./]\d{1,2}[./]\d{2,4})',
-                r'(ינואר|פברואר|מרץ|אפריל|מאי|יוני|יולי|אוגוסט|ספטמבר|אוקטובר|נובמבר|דצמבר)'
-            ]
-            
-            dates = []
-            for pattern in date_patterns:
-                matches = re.findall(pattern, text)
-                dates.extend(matches)
-            
-            return {
-                'destination': destination,
-                'price': price,
-                'dates': dates[:3],  # מקסימום 3 תאריכים
-                'full_text': text[:200],  # מגביל אורך
-                'scraped_at': datetime.now().isoformat(),
-                'url': TUSTUS_URL,
-                'method': 'simple_scraper'
-            }
+            dates = find_dates(text, SIMPLE_DATE_PATTERNS)
+            
+            return Flight(
+                destination,
+                price,
+                dates[:3],  # מקסימום 3 תאריכים
+                text[:200],  # מגביל אורך
+                datetime.now().isoformat(),
+                self.url,
+                method='simple_scraper'
+            )
             
         except Exception as e:
             logging.warning(f"שגיאה בחילוץ מידע: {e}")
@@ -181,7 +350,7 @@ class SimpleFlightScraper:
         
         for flight in flights:
             # יצירת מפתח ייחודי
-            key = f"{flight['destination']}_{flight['price']}"
+            key = f"{flight.destination}_{flight.price}"
             if key not in seen:
                 seen.add(key)
                 unique_flights.append(flight)
@@ -195,9 +364,9 @@ def test_simple_scraper():
     
     print(f"נמצאו {len(flights)} טיסות (סקרפר פשוט):")
     for flight in flights:
-        print(f"- {flight['destination']}: {flight['price']}₪")
-        print(f"  תאריכים: {flight['dates']}")
-        print(f"  טקסט: {flight['full_text'][:100]}...")
+        print(f"- {flight.destination}: {flight.price}₪")
+        print(f"  תאריכים: {list(flight.dates)}")
+        print(f"  טקסט: {flight.full_text[:100]}...")
         print("-" * 50)
     
     return flights
@@ -0,0 +1,88 @@
+import asyncio
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from simple_scraper import SimpleFlightScraper
+from config import (
+    SCRAPE_SOURCES, EXCLUDED_DESTINATIONS, MAX_CONCURRENT_SOURCES, MAX_CONNECTIONS_PER_HOST,
+    SOURCE_TIMEOUT_SECONDS
+)
+
+class SourceCrawler:
+    """סריקה מקבילית של כל המקורות - זמן המחזור הוא של המקור האיטי ולא סכום כולם"""
+    def __init__(self, sources=SCRAPE_SOURCES, max_concurrency=MAX_CONCURRENT_SOURCES,
+                 per_host=MAX_CONNECTIONS_PER_HOST, timeout=SOURCE_TIMEOUT_SECONDS):
+        self.max_concurrency = max(1, max_concurrency)
+        self.per_host = max(1, per_host)
+        self.timeout = timeout
+        self.last_timings = {}
+
+        # כל הסקרפרים חולקים מטמון HTTP אחד (וקובץ אחד)
+        self.scrapers = []
+        http_cache = None
+        for source in sources:
+            scraper = SimpleFlightScraper(url=source['url'], profile=source['profile'],
+                                          http_cache=http_cache, timeout=timeout)
+            http_cache = scraper.http_cache
+            self.scrapers.append(scraper)
+
+        # requests חוסם - כל סריקה רצה ב-thread משלה, asyncio מנהל מגבלות ותקרות זמן
+        self.executor = ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix='source')
+
+    async def crawl_source(self, scraper, global_limit, host_limits):
+        """סריקת מקור אחד בתוך מגבלת המקביליות הכללית ומגבלת השרת שלו"""
+        host = urlparse(scraper.url).netloc
+        async with global_limit, host_limits[host]:
+            start = time.perf_counter()
+            loop = asyncio.get_running_loop()
+            try:
+                # הסשן נקבע כבר בהגשה, כך שסריקה שממתינה ל-thread פנוי לא תקבל את הסשן של המחזור הבא
+                flights = await asyncio.wait_for(
+                    loop.run_in_executor(self.executor, scraper.scrape_flights, scraper.session), self.timeout)
+            except asyncio.TimeoutError:
+                # אי אפשר לעצור את ה-thread; הוא ממשיך עם הסשן הישן, והמחזור הבא מקבל סשן משלו
+                # במקום לחלוק requests.Session עם סריקה שעדיין רצה
+                scraper.reset_session()
+                logging.error(f"תם הזמן לסריקת {scraper.url} ({self.timeout:.0f} שניות)")
+                flights = []
+            self.last_timings[scraper.url] = round(time.perf_counter() - start, 3)
+            return flights
+
+    async def crawl_all(self):
+        """סריקת כל המקורות במקביל"""
+        # הסמפורים נוצרים בתוך הלולאה הרצה (ב-Python 3.7 הם נקשרים ללולאה ביצירתם)
+        global_limit = asyncio.Semaphore(self.max_concurrency)
+        host_limits = {urlparse(s.url).netloc: asyncio.Semaphore(self.per_host) for s in self.scrapers}
+        return await asyncio.gather(*(self.crawl_source(s, global_limit, host_limits) for s in self.scrapers))
+
+    def crawl(self):
+        """סריקת כל המקורות ומיזוג התוצאות לרשימת טיסות אחת"""
+        if not self.scrapers:
+            return []
+        start = time.perf_counter()
+        self.last_timings = {}
+        results = asyncio.run(self.crawl_all())
+
+        flights = self.merge_results(results)
+        wall_seconds = time.perf_counter() - start
+        logging.info(f"סריקת {len(self.scrapers)} מקורות: {len(flights)} טיסות ב-{wall_seconds:.2f} שניות "
+                     f"(סכום זמני המקורות {sum(self.last_timings.values()):.2f} שניות)")
+        return flights
+
+    def merge_results(self, results):
+        """מיזוג תוצאות המקורות - אותה טיסה (יעד ומחיר) שמופיעה בכמה מקורות נשמרת פעם אחת"""
+        seen = set()
+        merged = []
+        for flights in results:
+            for flight in flights:
+                key = f"{flight.destination}_{flight.price}"
+                if key in seen or flight.destination in EXCLUDED_DESTINATIONS:
+                    continue
+                seen.add(key)
+                merged.append(flight)
+        return merged
+
+    def close(self):
+        """סגירת ה-threads של הסריקה"""
+        self.executor.shutdown(wait=False)
@@ -0,0 +1,107 @@
+import json
+import time
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from datetime import datetime
+from config import TRACE_ENABLED, TRACE_FILE
+
+class CycleTrace:
+    """מדידות הזמן של מחזור בדיקה אחד - כל span נרשם עם זמן ההתחלה היחסי ומשכו"""
+    def __init__(self, name):
+        self.name = name
+        self.started_at = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.spans = []
+        self.fields = {}
+        self.lock = threading.Lock()
+        self.closed = False
+
+    def record(self, name, start, seconds):
+        span = {
+            'name': name,
+            'start': round(start - self.start, 4),
+            'seconds': round(seconds, 4),
+            'thread': threading.current_thread().name
+        }
+        with self.lock:
+            # עבודה שנמשכה אחרי סוף המחזור (למשל Chrome שהפסיד במרוץ) לא נרשמת למחזור שכבר נכתב
+            if not self.closed:
+                self.spans.append(span)
+
+    def to_dict(self):
+        """רשומת המחזור לקובץ - ה-spans לפי סדר ההתחלה, וסיכום זמן לכל שם"""
+        spans = sorted(self.spans, key=lambda s: s['start'])
+        totals = {}
+        for span in spans:
+            totals[span['name']] = round(totals.get(span['name'], 0) + span['seconds'], 4)
+        return dict(self.fields, cycle=self.name, started_at=self.started_at,
+                    total_seconds=round(time.perf_counter() - self.start, 4), totals=totals, spans=spans)
+
+# המחזור הפעיל שייך להקשר (contextvars) של ה-thread שפתח אותו: thread אחר (למשל ה-worker של תור ההתראות)
+# לא רואה אותו, ו-thread שעובד בשביל המחזור מקבל אותו דרך bind(). מחסנית ה-spans לשמות מקוננים - לכל thread
+current_trace = contextvars.ContextVar('current_trace', default=None)
+local = threading.local()
+
+@contextmanager
+def cycle(name):
+    """מחזור בדיקה; מחזור מקונן מצטרף לחיצוני, והחיצוני כותב שורה אחת לקובץ בסיום"""
+    trace = current_trace.get()
+    if not TRACE_ENABLED or trace is not None:
+        yield trace
+        return
+    trace = CycleTrace(name)
+    token = current_trace.set(trace)
+    try:
+        yield trace
+    finally:
+        current_trace.reset(token)
+        with trace.lock:
+            trace.closed = True
+        write_trace(trace)
+
+def bind(func):
+    """עטיפת פונקציה שתרוץ ב-thread אחר בהקשר הנוכחי - ה-spans שלה נרשמים למחזור הפעיל"""
+    context = contextvars.copy_context()
+    return lambda *args, **kwargs: context.run(func, *args, **kwargs)
+
+@contextmanager
+def span(name):
+    """מדידת שלב בתוך המחזור הפעיל; בלי מחזור פעיל - לא עושה כלום"""
+    trace = current_trace.get()
+    if trace is None:
+        yield
+        return
+    stack = getattr(local, 'stack', None)
+    if stack is None:
+        stack = local.stack = []
+    full_name = f"{stack[-1]}/{name}" if stack else name
+    stack.append(full_name)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.record(full_name, start, time.perf_counter() - start)
+        stack.pop()
+
+def add_span(name, start, seconds):
+    """רישום זמן שנמדד ידנית (למשל סכום של שלב שמתבצע לסירוגין בתוך לולאה)"""
+    trace = current_trace.get()
+    if trace is not None:
+        trace.record(name, start, seconds)
+
+def annotate(**fields):
+    """הוספת שדות לרשומת המחזור הפעיל"""
+    trace = current_trace.get()
+    if trace is not None:
+        with trace.lock:
+            trace.fields.update(fields)
+
+def write_trace(trace):
+    """הוספת רשומת המחזור לקובץ ה-trace"""
+    try:
+        with open(TRACE_FILE, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(trace.to_dict(), ensure_ascii=False, separators=(',', ':')) + '\n')
+    except Exception as e:
+        logging.error(f"שגיאה בכתיבת ה-trace: {e}")